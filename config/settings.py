@@ -48,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.middleware.FormulaMemoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -159,3 +160,58 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes
 CELERY_RESULT_EXPIRES = 3600  # 1 hour
+
+# ======================
+# DATA INGESTION
+# ======================
+# Jumlah baris per batch COPY saat upload LW321
+LW321_COPY_BATCH_SIZE = config('LW321_COPY_BATCH_SIZE', default=5000, cast=int)
+# Jumlah baris per chunk saat membaca file upload (CSV chunksize / openpyxl read_only)
+LW321_READ_CHUNK_SIZE = config('LW321_READ_CHUNK_SIZE', default=20000, cast=int)
+# Jumlah worker Celery untuk ingestion paralel (1 = sekuensial per chunk)
+LW321_PARALLEL_WORKERS = config('LW321_PARALLEL_WORKERS', default=1, cast=int)
+
+# ======================
+# CACHE
+# ======================
+# Cache tabel dashboard (dashboard.table_cache). Pilihan backend:
+#   file   - default, dipakai bersama proses web dan Celery worker di server yang sama
+#   locmem - per proses (development); invalidasi dari Celery worker tidak sampai ke web
+#   redis  - untuk deployment multi-server
+DASHBOARD_CACHE_BACKEND = config('DASHBOARD_CACHE_BACKEND', default='file')
+
+if DASHBOARD_CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': config('CACHE_REDIS_URL', default='redis://localhost:6379/1'),
+        }
+    }
+elif DASHBOARD_CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 2000},
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+
+# Umur maksimum tabel di cache (detik); entry juga tidak terpakai lagi begitu datanya berubah
+DASHBOARD_TABLE_CACHE_TIMEOUT = config('DASHBOARD_TABLE_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+# Jumlah tanggal terbaru dari satu upload yang tabelnya di-precompute ke ProcessedData
+DASHBOARD_WARM_MAX_DATES = config('DASHBOARD_WARM_MAX_DATES', default=5, cast=int)
+# Interval (detik) setiap proses mengecek versi tabel uker_master (hierarki UKER -> KANCA)
+UKER_MASTER_REFRESH_SECONDS = config('UKER_MASTER_REFRESH_SECONDS', default=60, cast=int)
+# Folder file upload komitmen yang menunggu konfirmasi (beserta cache hasil parse-nya);
+# kosong = <tmp>/sme-komitmen. Isinya dihapus otomatis setelah SESSION_COOKIE_AGE.
+KOMITMEN_UPLOAD_DIR = config('KOMITMEN_UPLOAD_DIR', default='')
+# Folder cache hasil parse file upload LW321 (pickle yang dibaca worker Celery); harus
+# bisa diakses web dan worker, dan TIDAK boleh di bawah MEDIA_ROOT. Kosong = BASE_DIR/upload_cache
+UPLOAD_CACHE_DIR = config('UPLOAD_CACHE_DIR', default='')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import LW321, ProcessedData, KomitmenUpload, KomitmenData
+from .models import LW321, ProcessedData, KomitmenUpload, KomitmenData, UkerMaster
 
 
 @admin.register(LW321)
@@ -29,6 +29,17 @@ class LW321Admin(admin.ModelAdmin):
     # date_hierarchy dihapus karena next_pmt_date sudah jadi CharField
     list_per_page = 50
 
+    # Read-only: data LW321 hanya masuk lewat upload (partisi, agregat harian dan
+    # cache tabel dashboard ikut diperbarui di sana), edit manual di admin tidak.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(ProcessedData)
 class ProcessedDataAdmin(admin.ModelAdmin):
@@ -59,3 +70,11 @@ class KomitmenDataAdmin(admin.ModelAdmin):
     search_fields = ('nama_uker', 'kode_uker', 'nama_kanca', 'kode_kanca')
     date_hierarchy = 'periode'
     list_per_page = 50
+
+
+@admin.register(UkerMaster)
+class UkerMasterAdmin(admin.ModelAdmin):
+    list_display = ('kode_uker', 'nama_uker', 'kode_kanca', 'urutan', 'updated_at')
+    list_filter = ('kode_kanca',)
+    search_fields = ('kode_uker', 'nama_uker')
+    ordering = ('urutan', 'kode_kanca', 'kode_uker')
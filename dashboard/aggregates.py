@@ -0,0 +1,243 @@
+"""
+Fact table harian LW321 per uker (LW321DailyAggregate).
+
+Hampir semua halaman dashboard hanya butuh SUM(os/sml/npl/lr/lar/nasabah)
+per kode_uker untuk beberapa tanggal. Agregat itu disimpan per
+(periode_date, kode_uker, kanca, segment, kol_adk, flag_restruk, dub_nasabah)
+sehingga query halaman tidak lagi bergantung pada jumlah rekening.
+
+Fact table dibangun ulang per tanggal (DELETE + INSERT ... SELECT ... GROUP BY
+dalam satu transaksi) setiap kali upload selesai atau data LW321 dihapus.
+Setiap perubahan fact table juga meng-invalidasi cache tabel dashboard
+untuk tanggal yang sama (dashboard.table_cache).
+
+Rollup akhir bulan (LW321MonthlyAggregate) dibangun dari fact table harian
+untuk bulan-bulan yang tanggalnya berubah, sehingga grafik timeseries bulanan
+cukup membaca satu baris per (bulan, segment, kanca).
+"""
+import logging
+from datetime import date
+
+from django.db import connection, transaction
+from django.db.models import Sum
+
+from .models import LW321, LW321DailyAggregate, LW321MonthlyAggregate
+from .table_cache import invalidate_all_tables, invalidate_lw321_dates, invalidate_lw321_range
+
+logger = logging.getLogger(__name__)
+
+# Kolom grup (kunci fact table), sama namanya di LW321
+GROUP_FIELDS = ['periode_date', 'kode_uker', 'kanca', 'segment', 'kol_adk', 'flag_restruk', 'dub_nasabah']
+
+# Kolom metrics yang di-SUM dari LW321
+SUM_FIELDS = ['os', 'outstanding', 'sml', 'npl', 'lr', 'lar', 'nasabah']
+
+# Kolom metrics rollup akhir bulan
+MONTHLY_SUM_FIELDS = ['os', 'sml', 'npl', 'lar']
+
+
+def _insert_select_sql(where_sql):
+    quote = connection.ops.quote_name
+    group_sql = ', '.join(quote(name) for name in GROUP_FIELDS)
+    sum_sql = ', '.join(f'COALESCE(SUM({quote(name)}), 0)' for name in SUM_FIELDS)
+    target_columns = ', '.join(quote(name) for name in GROUP_FIELDS + SUM_FIELDS + ['row_count'])
+    return (
+        f'INSERT INTO {quote(LW321DailyAggregate._meta.db_table)} ({target_columns}) '
+        f'SELECT {group_sql}, {sum_sql}, COUNT(*) '
+        f'FROM {quote(LW321._meta.db_table)} WHERE {where_sql} '
+        f'GROUP BY {group_sql}'
+    )
+
+
+def rebuild_daily_aggregates(dates):
+    """
+    Bangun ulang fact table untuk setiap tanggal di dates (satu transaksi per tanggal).
+    Tanggal yang sudah tidak ada di LW321 hanya dihapus dari fact table.
+
+    Args:
+        dates: iterable of date (None diabaikan)
+
+    Returns:
+        int: jumlah baris fact table yang ditulis
+    """
+    quote = connection.ops.quote_name
+    sql = _insert_select_sql(f'{quote("periode_date")} = %s')
+    written = 0
+    dates = sorted({value for value in dates if value is not None})
+    for value in dates:
+        with transaction.atomic():
+            LW321DailyAggregate.objects.filter(periode_date=value).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [value])
+                written += cursor.rowcount
+    rebuild_monthly_aggregates(dates)
+    invalidate_lw321_dates(dates)
+    return written
+
+
+def rebuild_all_daily_aggregates(date_from=None, date_to=None):
+    """
+    Bangun ulang fact table untuk semua tanggal LW321 (opsional dibatasi range).
+
+    Returns:
+        tuple: (jumlah tanggal, jumlah baris fact table)
+    """
+    qs = LW321.objects.order_by()
+    stale = LW321DailyAggregate.objects.all()
+    if date_from:
+        qs = qs.filter(periode_date__gte=date_from)
+        stale = stale.filter(periode_date__gte=date_from)
+    if date_to:
+        qs = qs.filter(periode_date__lte=date_to)
+        stale = stale.filter(periode_date__lte=date_to)
+
+    dates = set(qs.values_list('periode_date', flat=True).distinct())
+    # Tanggal yang masih ada di fact table tapi sudah tidak ada di LW321
+    dates |= set(stale.order_by().values_list('periode_date', flat=True).distinct())
+    return len(dates), rebuild_daily_aggregates(dates)
+
+
+def delete_daily_aggregates(date_from, date_to):
+    """
+    Hapus fact table untuk periode_date di antara date_from dan date_to (inklusif).
+
+    Cache tabel baru di-invalidasi setelah commit, supaya pemanggil bisa menjalankan
+    ini dalam transaksi yang sama dengan DELETE LW321 (lihat delete_lw321_range).
+    """
+    deleted = LW321DailyAggregate.objects.filter(periode_date__range=(date_from, date_to)).delete()[0]
+    rebuild_monthly_aggregates(_months_between(date_from, date_to))
+    transaction.on_commit(lambda: invalidate_lw321_range(date_from, date_to))
+    return deleted
+
+
+def truncate_daily_aggregates():
+    """Kosongkan seluruh fact table (dipanggil bersama truncate_lw321)."""
+    if connection.vendor != 'postgresql':
+        LW321DailyAggregate.objects.all().delete()
+        LW321MonthlyAggregate.objects.all().delete()
+    else:
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'TRUNCATE TABLE {quote(LW321DailyAggregate._meta.db_table)}, '
+                f'{quote(LW321MonthlyAggregate._meta.db_table)}'
+            )
+    invalidate_all_tables()
+
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value):
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def _months_between(date_from, date_to):
+    months = []
+    value = _month_start(date_from)
+    while value <= date_to:
+        months.append(value)
+        value = _next_month(value)
+    return months
+
+
+def _monthly_insert_select_sql():
+    """
+    INSERT rollup satu bulan: untuk setiap (segment, kanca), SUM metrics pada tanggal
+    terakhir grup tersebut di bulan itu. Parameter: bulan, awal bulan, awal bulan berikutnya.
+    """
+    quote = connection.ops.quote_name
+    daily = quote(LW321DailyAggregate._meta.db_table)
+    sum_sql = ', '.join(f'COALESCE(SUM(d.{quote(name)}), 0)' for name in MONTHLY_SUM_FIELDS)
+    target_columns = ', '.join(quote(name) for name in ['month', 'segment', 'kanca', 'eom_date'] + MONTHLY_SUM_FIELDS)
+    return (
+        f'INSERT INTO {quote(LW321MonthlyAggregate._meta.db_table)} ({target_columns}) '
+        f'SELECT %s, d.{quote("segment")}, d.{quote("kanca")}, d.{quote("periode_date")}, {sum_sql} '
+        f'FROM {daily} d JOIN ('
+        f'SELECT {quote("segment")}, {quote("kanca")}, MAX({quote("periode_date")}) AS eom_date '
+        f'FROM {daily} WHERE {quote("periode_date")} >= %s AND {quote("periode_date")} < %s '
+        f'GROUP BY {quote("segment")}, {quote("kanca")}'
+        f') last ON d.{quote("segment")} = last.{quote("segment")} '
+        f'AND d.{quote("kanca")} = last.{quote("kanca")} AND d.{quote("periode_date")} = last.eom_date '
+        f'GROUP BY d.{quote("segment")}, d.{quote("kanca")}, d.{quote("periode_date")}'
+    )
+
+
+def rebuild_monthly_aggregates(dates):
+    """
+    Bangun ulang rollup akhir bulan untuk bulan-bulan dari dates (satu transaksi per bulan).
+
+    Args:
+        dates: iterable of date (bulan yang sama cukup sekali, None diabaikan)
+
+    Returns:
+        int: jumlah baris rollup yang ditulis
+    """
+    sql = _monthly_insert_select_sql()
+    written = 0
+    for month in sorted({_month_start(value) for value in dates if value is not None}):
+        with transaction.atomic():
+            LW321MonthlyAggregate.objects.filter(month=month).delete()
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [month, month, _next_month(month)])
+                written += cursor.rowcount
+    return written
+
+
+def get_end_of_month_totals(segments=None, kancas=None, years=None, months=None):
+    """
+    SUM metrics akhir bulan (os, sml, npl, lar) dari rollup, satu query untuk seluruh histori.
+
+    Tanggal akhir bulan = tanggal terakhir yang ada untuk grup (segment, kanca) terpilih;
+    grup yang datanya berhenti lebih awal di bulan itu tidak ikut dijumlahkan (sama
+    seperti MAX(periode_date) lalu SUM pada tanggal tersebut di fact table harian).
+
+    Args:
+        segments / kancas: list filter (None = semua)
+        years / months: list int filter tahun / bulan (None = semua)
+
+    Returns:
+        list of (eom_date, {'os', 'sml', 'npl', 'lar': Decimal}), urut dari bulan terlama
+    """
+    qs = LW321MonthlyAggregate.objects.all()
+    if segments is not None:
+        qs = qs.filter(segment__in=segments)
+    if kancas is not None:
+        qs = qs.filter(kanca__in=kancas)
+    if years is not None:
+        qs = qs.filter(month__year__in=years)
+    if months is not None:
+        qs = qs.filter(month__month__in=months)
+
+    rows = qs.values('month', 'eom_date').annotate(
+        **{name: Sum(name) for name in MONTHLY_SUM_FIELDS}
+    ).order_by('month', 'eom_date')
+
+    totals_by_month = {}
+    for row in rows:
+        # Urut eom_date naik: tanggal terakhir per bulan menimpa yang lebih awal
+        totals_by_month[row['month']] = (row['eom_date'], {name: row[name] for name in MONTHLY_SUM_FIELDS})
+    return [totals_by_month[month] for month in sorted(totals_by_month)]
+
+
+def refresh_daily_aggregates_safely(dates):
+    """
+    Dipanggil setelah upload selesai: kegagalan rebuild tidak menggagalkan upload
+    (data LW321 sudah tersimpan), tetapi pemanggil menandai upload dengan
+    aggregates_pending supaya terlihat di history dan bisa dijalankan ulang dengan
+    ``python manage.py rebuild_lw321_aggregates``.
+
+    Returns:
+        int jumlah baris agregat, atau None jika rebuild gagal
+    """
+    dates = list(dates)
+    try:
+        written = rebuild_daily_aggregates(dates)
+    except Exception:
+        logger.exception(f"Gagal membangun ulang agregat harian LW321 untuk {len(dates)} tanggal")
+        return None
+    logger.info(f"Agregat harian LW321 dibangun ulang: {len(dates)} tanggal, {written} baris")
+    return written
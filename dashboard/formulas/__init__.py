@@ -1,5 +1,5 @@
 from .segmentation import get_segment_annotation, SEGMENT_MAPPING
-from .calculations import annotate_metrics
+from .calculations import get_metric_expressions, recompute_derived_columns
 from .filters import filter_by_period, filter_by_uker
 from .utils import extract_period_from_filename, cast_to_decimal
 from .cleaning import standardize_uker
@@ -8,6 +8,8 @@ from .uker_mapping import (
     UKER_MASTER,
     KANCA_CODES,
     KCP_CODES,
+    UKER_HIERARCHY,
+    get_uker_hierarchy,
     is_kanca,
     is_kcp,
     get_kanca_induk,
@@ -29,3 +31,4 @@ from .table_calculations import (
     get_os_for_date,
     calculate_table_data,
 )
+from .memo import request_memoized, memoization_scope, get_memo_stats, clear_memo
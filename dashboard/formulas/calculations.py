@@ -1,73 +1,91 @@
-from django.db.models import Sum, F, Case, When, Value, DecimalField, ExpressionWrapper, Count
+from django.db.models import Sum, Case, When, Value, DecimalField, ExpressionWrapper, Count
+from django.db.models.lookups import Exact, GreaterThan
 from .utils import cast_to_decimal, safe_decimal_field
 
-def annotate_metrics(queryset):
+# Kolom turunan LW321 yang dihitung saat ingestion (lihat data_management.parsers.derive_lw321_columns)
+DERIVED_FIELDS = ['segment', 'outstanding', 'sml', 'npl', 'lr', 'lar']
+
+
+def _decimal(expression):
+    return ExpressionWrapper(expression, output_field=DecimalField(max_digits=20, decimal_places=2))
+
+
+def get_metric_expressions():
     """
-    Annotates queryset with outstanding, SML, NPL, LR, LAR fields.
+    SQL expressions untuk outstanding, SML, NPL, LR, LAR per baris.
     - OS column from database (DecimalField)
-    - Outstanding calculated, named 'outstanding' to avoid conflict
-    - DPK/SML = SUM(OS) WHERE KOL_ADK = '2'
-    - NPL = SUM(OS) WHERE KOL_ADK IN ('3', '4', '5')
+    - Outstanding = OS, atau jumlah kolektibilitas_* jika OS kosong/0
+    - DPK/SML = OS WHERE KOL_ADK = '2'
+    - NPL = OS WHERE KOL_ADK IN ('3', '4', '5')
+    - LR = kolektibilitas_lancar WHERE KOL_ADK = '1' AND FLAG_RESTRUK = 'Y'
+    - LAR = SML + NPL + LR
+
+    Hanya dipakai untuk menghitung ulang kolom turunan di database
+    (recompute_derived_columns); dashboard meng-aggregate kolom yang sudah tersimpan.
     """
-    qs = queryset.annotate(
-        val_lancar=cast_to_decimal('kolektibilitas_lancar'),
-        val_dpk=cast_to_decimal('kolektibilitas_dpk'),
-        val_kl=cast_to_decimal('kolektibilitas_kurang_lancar'),
-        val_d=cast_to_decimal('kolektibilitas_diragukan'),
-        val_m=cast_to_decimal('kolektibilitas_macet'),
-    )
-    
-    qs = qs.annotate(val_os=safe_decimal_field('os'))
+    val_lancar = cast_to_decimal('kolektibilitas_lancar')
+    val_dpk = cast_to_decimal('kolektibilitas_dpk')
+    val_kl = cast_to_decimal('kolektibilitas_kurang_lancar')
+    val_d = cast_to_decimal('kolektibilitas_diragukan')
+    val_m = cast_to_decimal('kolektibilitas_macet')
+    val_os = safe_decimal_field('os')
+    zero = Value(0, output_field=DecimalField(max_digits=20, decimal_places=2))
 
-    qs = qs.annotate(
-        os_from_legacy=ExpressionWrapper(
-            F('val_lancar') + F('val_dpk') + F('val_kl') + F('val_d') + F('val_m'),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
-    )
-    
-    qs = qs.annotate(
-        outstanding=Case(
-            When(val_os__gt=0, then=F('val_os')),
-            default=F('os_from_legacy'),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
+    outstanding = Case(
+        When(GreaterThan(val_os, 0), then=val_os),
+        default=_decimal(val_lancar + val_dpk + val_kl + val_d + val_m),
+        output_field=DecimalField(max_digits=20, decimal_places=2)
     )
 
-    qs = qs.annotate(
-        npl=Case(
-            When(kol_adk__in=['3', '4', '5'], val_os__gt=0, then=F('val_os')),
-            When(kol_adk__in=['3', '4', '5'], val_os=0, then=F('val_kl') + F('val_d') + F('val_m')),
-            default=Value(0),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
+    npl = Case(
+        When(kol_adk__in=['3', '4', '5'], then=Case(
+            When(GreaterThan(val_os, 0), then=val_os),
+            When(Exact(val_os, 0), then=_decimal(val_kl + val_d + val_m)),
+            default=zero,
+        )),
+        default=zero,
+        output_field=DecimalField(max_digits=20, decimal_places=2)
     )
 
-    qs = qs.annotate(
-        sml=Case(
-            When(kol_adk='2', val_os__gt=0, then=F('val_os')),
-            When(kol_adk='2', val_os=0, then=F('val_dpk')),
-            default=Value(0),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
+    sml = Case(
+        When(kol_adk='2', then=Case(
+            When(GreaterThan(val_os, 0), then=val_os),
+            When(Exact(val_os, 0), then=val_dpk),
+            default=zero,
+        )),
+        default=zero,
+        output_field=DecimalField(max_digits=20, decimal_places=2)
     )
 
-    qs = qs.annotate(
-        lr=Case(
-            When(kol_adk='1', flag_restruk='Y', then=F('val_lancar')),
-            default=Value(0),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
+    lr = Case(
+        When(kol_adk='1', flag_restruk='Y', then=val_lancar),
+        default=zero,
+        output_field=DecimalField(max_digits=20, decimal_places=2)
     )
 
-    qs = qs.annotate(
-        lar=ExpressionWrapper(
-            F('sml') + F('npl') + F('lr'),
-            output_field=DecimalField(max_digits=20, decimal_places=2)
-        )
-    )
+    return {
+        'outstanding': outstanding,
+        'sml': sml,
+        'npl': npl,
+        'lr': lr,
+        'lar': _decimal(sml + npl + lr),
+    }
 
-    return qs
+
+def recompute_derived_columns(queryset, segment_only=False):
+    """
+    Hitung ulang kolom turunan (segment dan metrics) langsung di database
+    dengan satu UPDATE, mis. setelah SEGMENT_MAPPING_BY_CODE berubah.
+
+    Returns:
+        int: jumlah baris yang di-update
+    """
+    from .segmentation import get_segment_annotation
+
+    values = {'segment': get_segment_annotation()}
+    if not segment_only:
+        values.update(get_metric_expressions())
+    return queryset.update(**values)
 
 
 def count_unique_customers(queryset, segment='SMALL'):
@@ -84,14 +102,10 @@ def count_unique_customers(queryset, segment='SMALL'):
     Returns:
         Sum of NASABAH field for unique customers (DUB_NASABAH='TRUE' or 'True')
     """
-    from .segmentation import get_segment_annotation
     from django.db.models import Q
     
-    # Annotate with segment
-    qs = queryset.annotate(segment=get_segment_annotation())
-    
-    # Filter by segment and DUB_NASABAH = 'TRUE' (case-insensitive: 'TRUE', 'True', 'true')
-    qs = qs.filter(
+    # Filter by segment (kolom segment tersimpan) and DUB_NASABAH = 'TRUE' (case-insensitive: 'TRUE', 'True', 'true')
+    qs = queryset.filter(
         segment=segment
     ).filter(
         Q(dub_nasabah__iexact='TRUE')  # Case-insensitive exact match
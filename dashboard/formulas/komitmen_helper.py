@@ -2,262 +2,190 @@
 Komitmen Helper Module - Functions to fetch and integrate komitmen data efficiently
 """
 
-from datetime import datetime
 from decimal import Decimal
-from django.db.models import Q
+
+import numpy as np
+
 from ..models import KomitmenData
+from .memo import request_memoized
+
+
+# Segment komitmen -> prefix kolom di KomitmenData
+KOMITMEN_SEGMENT_FIELDS = {
+    'kur': 'kur',
+    'small': 'small',
+    'ncc': 'kecil_ncc',
+    'cc': 'kecil_cc',
+}
+KOMITMEN_METRICS = ('deb', 'os', 'pl', 'npl', 'dpk')
+
+# Segment turunan yang dihitung sekali saat snapshot dibangun:
+# Small (Summary Konsol) = SMALL NCC + CC, Small + KUR = SMALL NCC + CC + KUR
+KOMITMEN_DERIVED_SEGMENTS = {
+    'ncc+cc': ('ncc', 'cc'),
+    'ncc+cc+kur': ('ncc', 'cc', 'kur'),
+}
 
 
-def get_komitmen_for_month(year, month):
+class KomitmenSnapshot:
     """
-    Ambil semua data komitmen untuk bulan tertentu.
-    Return dictionary dengan key (kode_uker) untuk akses cepat.
-    
-    Args:
-        year: int - Tahun
-        month: int - Bulan (1-12)
-    
-    Returns:
-        dict: {
-            kode_uker: {
-                'kode_kanca': str,
-                'nama_kanca': str,
-                'nama_uker': str,
-                'kur': {
-                    'deb': Decimal, 'os': Decimal, 'pl': Decimal, 
-                    'npl': Decimal, 'dpk': Decimal
-                },
-                'small': {
-                    'deb': Decimal, 'os': Decimal, 'pl': Decimal, 
-                    'npl': Decimal, 'dpk': Decimal
-                },
-                'ncc': {
-                    'deb': Decimal, 'os': Decimal, 'pl': Decimal, 
-                    'npl': Decimal, 'dpk': Decimal
-                },
-                'cc': {
-                    'deb': Decimal, 'os': Decimal, 'pl': Decimal, 
-                    'npl': Decimal, 'dpk': Decimal
-                }
-            }
-        }
+    Komitmen satu bulan dalam bentuk kolom: array (baris x kolom) berisi Decimal
+    untuk level uker, KANCA dan regional (RO BANDUNG). Kolom = segment x metric,
+    termasuk segment turunan KOMITMEN_DERIVED_SEGMENTS.
+
+    Dibangun sekali per periode (build_komitmen_snapshot) dan di-cache sampai
+    KomitmenData periode tersebut berubah (dashboard.table_cache). Lookup nilai
+    adalah index dict + indexing array, tanpa dict bersarang per uker.
+
+    Nilai 0 / tidak ada dikembalikan sebagai None (tampil "-" di template).
     """
-    # Filter by periode (year-month)
-    komitmen_qs = KomitmenData.objects.filter(
-        periode__year=year,
-        periode__month=month
-    ).select_related('upload')
-    
-    # Build dictionary untuk akses O(1)
-    komitmen_dict = {}
-    
-    # Return nilai asli tanpa pembagian (dalam ribuan)
-    # Display formatting akan dilakukan di template
-    
-    for data in komitmen_qs:
-        komitmen_dict[data.kode_uker] = {
-            'kode_kanca': data.kode_kanca,
-            'nama_kanca': data.nama_kanca,
-            'nama_uker': data.nama_uker,
-            'kur': {
-                'deb': data.kur_deb or Decimal('0'),
-                'os': data.kur_os or Decimal('0'),
-                'pl': data.kur_pl or Decimal('0'),
-                'npl': data.kur_npl or Decimal('0'),
-                'dpk': data.kur_dpk or Decimal('0'),
-            },
-            'small': {
-                'deb': data.small_deb or Decimal('0'),
-                'os': data.small_os or Decimal('0'),
-                'pl': data.small_pl or Decimal('0'),
-                'npl': data.small_npl or Decimal('0'),
-                'dpk': data.small_dpk or Decimal('0'),
-            },
-            'ncc': {
-                'deb': data.kecil_ncc_deb or Decimal('0'),
-                'os': data.kecil_ncc_os or Decimal('0'),
-                'pl': data.kecil_ncc_pl or Decimal('0'),
-                'npl': data.kecil_ncc_npl or Decimal('0'),
-                'dpk': data.kecil_ncc_dpk or Decimal('0'),
-            },
-            'cc': {
-                'deb': data.kecil_cc_deb or Decimal('0'),
-                'os': data.kecil_cc_os or Decimal('0'),
-                'pl': data.kecil_cc_pl or Decimal('0'),
-                'npl': data.kecil_cc_npl or Decimal('0'),
-                'dpk': data.kecil_cc_dpk or Decimal('0'),
-            }
+
+    def __init__(self, year, month, uker_codes, kanca_codes, kanca_names, uker_values, kanca_values,
+                 regional_values):
+        self.year = year
+        self.month = month
+        self.uker_codes = list(uker_codes)
+        self.kanca_codes = list(kanca_codes)
+        self.kanca_names = list(kanca_names)
+        self.uker_values = uker_values
+        self.kanca_values = kanca_values
+        self.regional_values = regional_values
+
+        self.segments = tuple(KOMITMEN_SEGMENT_FIELDS) + tuple(KOMITMEN_DERIVED_SEGMENTS)
+        self.columns = {
+            (segment, metric): index
+            for index, (segment, metric) in enumerate(
+                (segment, metric) for segment in self.segments for metric in KOMITMEN_METRICS
+            )
         }
-    
-    return komitmen_dict
+        # Baris terakhir menang untuk kode_uker ganda
+        self._uker_index = {kode_uker: row for row, kode_uker in enumerate(self.uker_codes)}
+        self._kanca_index = {kode_kanca: row for row, kode_kanca in enumerate(self.kanca_codes)}
+
+    def __len__(self):
+        return len(self.uker_codes)
+
+    def segment_key(self, segments):
+        """
+        Nama kolom segment untuk gabungan beberapa segment (mis. ['ncc', 'cc'] -> 'ncc+cc').
+        None jika gabungan tersebut tidak dihitung di snapshot.
+        """
+        segments = frozenset(segments)
+        if len(segments) == 1:
+            return next(iter(segments))
+        for key, parts in KOMITMEN_DERIVED_SEGMENTS.items():
+            if frozenset(parts) == segments:
+                return key
+        return None
 
+    def _value(self, values, row, segment, metric):
+        if row is None:
+            return None
+        column = self.columns.get((segment, metric))
+        if column is None:
+            return None
+        value = values[row][column]
+        # Return None untuk 0 agar di template tampil sebagai "-"
+        if value == 0 or value is None:
+            return None
+        return value
 
+    def uker_value(self, kode_uker, segment, metric):
+        """Komitmen satu uker (kode_uker string, seperti di LW321)."""
+        return self._value(self.uker_values, self._uker_index.get(kode_uker), segment, metric)
 
-def get_komitmen_for_kanca_list(year, month):
+    def kanca_value(self, kode_kanca, segment, metric):
+        """Komitmen agregat semua uker dalam satu KANCA (kode_kanca integer)."""
+        return self._value(self.kanca_values, self._kanca_index.get(kode_kanca), segment, metric)
+
+    def regional_value(self, segment, metric):
+        """Komitmen agregat semua KANCA di hierarki (RO BANDUNG)."""
+        return self._value([self.regional_values], 0, segment, metric)
+
+
+def build_komitmen_snapshot(year, month):
     """
-    Ambil data komitmen agregat per kanca untuk bulan tertentu.
-    Aggregate semua uker dalam satu kanca.
-    
-    Args:
-        year: int - Tahun
-        month: int - Bulan (1-12)
-    
-    Returns:
-        dict: {
-            kode_kanca: {
-                'nama_kanca': str,
-                'kur': {'deb': Decimal, 'os': Decimal, ...},
-                'small': {...},
-                'ncc': {...},
-                'cc': {...}
-            }
-        }
+    Bangun KomitmenSnapshot untuk bulan tertentu (satu query).
+
+    Sum KANCA = jumlah semua uker dengan kode_kanca tersebut; sum regional =
+    jumlah KANCA yang ada di hierarki uker_master (get_uker_hierarchy).
     """
-    from django.db.models import Sum
-    
-    # Aggregate by kode_kanca
-    komitmen_qs = KomitmenData.objects.filter(
-        periode__year=year,
-        periode__month=month
-    ).values('kode_kanca', 'nama_kanca').annotate(
-        # KUR
-        kur_deb=Sum('kur_deb'),
-        kur_os=Sum('kur_os'),
-        kur_pl=Sum('kur_pl'),
-        kur_npl=Sum('kur_npl'),
-        kur_dpk=Sum('kur_dpk'),
-        # SMALL
-        small_deb=Sum('small_deb'),
-        small_os=Sum('small_os'),
-        small_pl=Sum('small_pl'),
-        small_npl=Sum('small_npl'),
-        small_dpk=Sum('small_dpk'),
-        # NCC
-        ncc_deb=Sum('kecil_ncc_deb'),
-        ncc_os=Sum('kecil_ncc_os'),
-        ncc_pl=Sum('kecil_ncc_pl'),
-        ncc_npl=Sum('kecil_ncc_npl'),
-        ncc_dpk=Sum('kecil_ncc_dpk'),
-        # CC
-        cc_deb=Sum('kecil_cc_deb'),
-        cc_os=Sum('kecil_cc_os'),
-        cc_pl=Sum('kecil_cc_pl'),
-        cc_npl=Sum('kecil_cc_npl'),
-        cc_dpk=Sum('kecil_cc_dpk'),
+    from .uker_mapping import get_uker_hierarchy
+
+    fields = [
+        f'{prefix}_{metric}'
+        for prefix in KOMITMEN_SEGMENT_FIELDS.values()
+        for metric in KOMITMEN_METRICS
+    ]
+    rows = list(
+        KomitmenData.objects.filter(periode__year=year, periode__month=month)
+        .order_by('kode_kanca', 'id')
+        .values_list('kode_uker', 'kode_kanca', 'nama_kanca', *fields)
     )
-    
-    # Return nilai asli tanpa pembagian (dalam ribuan)
-    # Display formatting akan dilakukan di template
-    
-    komitmen_dict = {}
-    
-    for data in komitmen_qs:
-        komitmen_dict[data['kode_kanca']] = {
-            'nama_kanca': data['nama_kanca'],
-            'kur': {
-                'deb': data['kur_deb'] or Decimal('0'),
-                'os': data['kur_os'] or Decimal('0'),
-                'pl': data['kur_pl'] or Decimal('0'),
-                'npl': data['kur_npl'] or Decimal('0'),
-                'dpk': data['kur_dpk'] or Decimal('0'),
-            },
-            'small': {
-                'deb': data['small_deb'] or Decimal('0'),
-                'os': data['small_os'] or Decimal('0'),
-                'pl': data['small_pl'] or Decimal('0'),
-                'npl': data['small_npl'] or Decimal('0'),
-                'dpk': data['small_dpk'] or Decimal('0'),
-            },
-            'ncc': {
-                'deb': data['ncc_deb'] or Decimal('0'),
-                'os': data['ncc_os'] or Decimal('0'),
-                'pl': data['ncc_pl'] or Decimal('0'),
-                'npl': data['ncc_npl'] or Decimal('0'),
-                'dpk': data['ncc_dpk'] or Decimal('0'),
-            },
-            'cc': {
-                'deb': data['cc_deb'] or Decimal('0'),
-                'os': data['cc_os'] or Decimal('0'),
-                'pl': data['cc_pl'] or Decimal('0'),
-                'npl': data['cc_npl'] or Decimal('0'),
-                'dpk': data['cc_dpk'] or Decimal('0'),
-            }
-        }
-    
-    return komitmen_dict
+    hierarchy = get_uker_hierarchy()
 
+    zero = Decimal('0')
+    # Kolom dasar (segment x metric), null -> 0; lalu kolom segment turunan
+    base = np.array([[value or zero for value in row[3:]] for row in rows], dtype=object)
+    base = base.reshape(len(rows), len(fields))
+    n_metrics = len(KOMITMEN_METRICS)
+    base_segments = list(KOMITMEN_SEGMENT_FIELDS)
+    blocks = [base]
+    for parts in KOMITMEN_DERIVED_SEGMENTS.values():
+        derived = np.full((len(rows), n_metrics), zero, dtype=object)
+        for segment in parts:
+            start = base_segments.index(segment) * n_metrics
+            derived = derived + base[:, start:start + n_metrics]
+        blocks.append(derived)
+    uker_values = np.concatenate(blocks, axis=1)
 
+    # Sum per KANCA
+    kanca_codes, kanca_rows = np.unique(np.array([row[1] for row in rows], dtype=np.int64), return_inverse=True)
+    kanca_values = np.full((len(kanca_codes), uker_values.shape[1]), zero, dtype=object)
+    np.add.at(kanca_values, kanca_rows, uker_values)
+    kanca_names = {}
+    for row in rows:
+        kanca_names.setdefault(row[1], row[2])
+    kanca_codes = kanca_codes.tolist()
 
-def get_komitmen_value(komitmen_dict, kode_identifier, segment, metric):
-    """
-    Get komitmen value dari dictionary.
-    Helper function untuk mengambil nilai dengan handling None/missing.
-    
-    Args:
-        komitmen_dict: Dictionary hasil dari get_komitmen_for_month() atau get_komitmen_for_kanca_list()
-        kode_identifier: kode_uker atau kode_kanca (string)
-        segment: 'kur', 'small', 'ncc', atau 'cc'
-        metric: 'deb', 'os', 'pl', 'npl', atau 'dpk'
-    
-    Returns:
-        Decimal or None: Nilai komitmen, atau None jika tidak ada
-    """
-    if not komitmen_dict or kode_identifier not in komitmen_dict:
-        return None
-    
-    data = komitmen_dict[kode_identifier]
-    
-    if segment not in data:
-        return None
-    
-    if metric not in data[segment]:
-        return None
-    
-    value = data[segment][metric]
-    
-    # Return None untuk 0 agar di template tampil sebagai "-"
-    if value == 0 or value is None:
-        return None
-    
-    return value
+    # Sum regional (KANCA di hierarki)
+    kanca_index = {kode_kanca: row for row, kode_kanca in enumerate(kanca_codes)}
+    regional_rows = [kanca_index[kode_kanca] for kode_kanca in hierarchy.kanca_codes if kode_kanca in kanca_index]
+    regional_values = np.full(uker_values.shape[1], zero, dtype=object)
+    if regional_rows:
+        regional_values = regional_values + kanca_values[regional_rows].sum(axis=0)
+
+    return KomitmenSnapshot(
+        year,
+        month,
+        uker_codes=[row[0] for row in rows],
+        kanca_codes=kanca_codes,
+        kanca_names=[kanca_names[kode_kanca] for kode_kanca in kanca_codes],
+        uker_values=uker_values,
+        kanca_values=kanca_values,
+        regional_values=regional_values,
+    )
 
 
-def aggregate_komitmen_regional(komitmen_dict, kode_kanca_list):
+@request_memoized
+def get_komitmen_snapshot(year, month):
     """
-    Aggregate komitmen untuk beberapa kanca (untuk regional/konsol).
-    
+    KomitmenSnapshot bulan tertentu, dari cache lintas request (dashboard.table_cache)
+    dan satu objek yang sama selama satu request.
+
     Args:
-        komitmen_dict: Dictionary dari get_komitmen_for_kanca_list()
-        kode_kanca_list: List of kode_kanca yang akan diaggregate
-    
+        year: int - Tahun
+        month: int - Bulan (1-12)
+
     Returns:
-        dict: Aggregated komitmen {
-            'kur': {'deb': Decimal, ...},
-            'small': {...},
-            'ncc': {...},
-            'cc': {...}
-        }
+        KomitmenSnapshot (kosong / len 0 jika tidak ada komitmen bulan tersebut)
     """
-    result = {
-        'kur': {'deb': Decimal('0'), 'os': Decimal('0'), 'pl': Decimal('0'), 'npl': Decimal('0'), 'dpk': Decimal('0')},
-        'small': {'deb': Decimal('0'), 'os': Decimal('0'), 'pl': Decimal('0'), 'npl': Decimal('0'), 'dpk': Decimal('0')},
-        'ncc': {'deb': Decimal('0'), 'os': Decimal('0'), 'pl': Decimal('0'), 'npl': Decimal('0'), 'dpk': Decimal('0')},
-        'cc': {'deb': Decimal('0'), 'os': Decimal('0'), 'pl': Decimal('0'), 'npl': Decimal('0'), 'dpk': Decimal('0')},
-    }
-    
-    for kode_kanca in kode_kanca_list:
-        if kode_kanca not in komitmen_dict:
-            continue
-        
-        data = komitmen_dict[kode_kanca]
-        
-        for segment in ['kur', 'small', 'ncc', 'cc']:
-            for metric in ['deb', 'os', 'pl', 'npl', 'dpk']:
-                result[segment][metric] += data[segment][metric]
-    
-    return result
+    from ..table_cache import get_cached_komitmen_snapshot
+
+    return get_cached_komitmen_snapshot(year, month)
 
 
+@request_memoized
 def check_komitmen_exists(year, month):
     """
     Check apakah ada data komitmen untuk bulan tertentu.
@@ -269,7 +197,4 @@ def check_komitmen_exists(year, month):
     Returns:
         bool: True jika ada data komitmen, False jika tidak
     """
-    return KomitmenData.objects.filter(
-        periode__year=year,
-        periode__month=month
-    ).exists()
+    return len(get_komitmen_snapshot(year, month)) > 0
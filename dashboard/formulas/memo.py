@@ -0,0 +1,123 @@
+"""
+Memoization per request untuk fungsi query di dashboard.formulas.
+
+Satu halaman bisa memanggil get_metric_by_uker / get_komitmen_snapshot /
+check_komitmen_exists berkali-kali dengan argumen yang sama (tabel konsol,
+kanca-only, kcp-only, summary). Dengan ``@request_memoized``, panggilan
+identik di dalam satu ``memoization_scope()`` hanya menyentuh database sekali.
+
+Di luar scope (shell, management command, Celery) fungsi dipanggil langsung
+tanpa cache, sehingga tidak ada data basi antar request.
+
+Hasil yang di-cache dipakai bersama oleh semua pemanggil dalam request yang
+sama, jadi pemanggil tidak boleh memodifikasi dict/list hasilnya.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_active_memo = ContextVar('formula_memo', default=None)
+
+
+class _MemoStore:
+    def __init__(self):
+        self.cache = {}
+        self.hits = 0
+        self.misses = 0
+        self.per_function = {}
+
+    def record(self, name, hit):
+        stats = self.per_function.setdefault(name, {'hits': 0, 'misses': 0})
+        if hit:
+            self.hits += 1
+            stats['hits'] += 1
+        else:
+            self.misses += 1
+            stats['misses'] += 1
+
+
+def _freeze(value):
+    """Ubah argumen menjadi bentuk hashable (dict/list/set ikut dibekukan)."""
+    if isinstance(value, dict):
+        return ('__dict__', tuple(sorted((key, _freeze(item)) for key, item in value.items())))
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(item) for item in value))
+    if isinstance(value, (set, frozenset)):
+        return ('__set__', frozenset(_freeze(item) for item in value))
+    hash(value)
+    return value
+
+
+def request_memoized(func):
+    """Decorator: cache hasil func per argumen selama memoization_scope aktif."""
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = _active_memo.get()
+        if store is None:
+            return func(*args, **kwargs)
+        try:
+            key = (name, _freeze(args), _freeze(kwargs))
+        except TypeError:
+            # Argumen tidak hashable, lewati cache
+            return func(*args, **kwargs)
+
+        if key in store.cache:
+            store.record(name, hit=True)
+            return store.cache[key]
+
+        store.record(name, hit=False)
+        result = func(*args, **kwargs)
+        store.cache[key] = result
+        return result
+
+    return wrapper
+
+
+@contextmanager
+def memoization_scope():
+    """
+    Aktifkan cache memo (dipakai oleh FormulaMemoMiddleware per request).
+    Scope bersarang memakai store yang sama dengan scope terluar.
+
+    Yields:
+        _MemoStore aktif
+    """
+    store = _active_memo.get()
+    if store is not None:
+        yield store
+        return
+
+    store = _MemoStore()
+    token = _active_memo.set(store)
+    try:
+        yield store
+    finally:
+        _active_memo.reset(token)
+
+
+def get_memo_stats():
+    """
+    Statistik hit/miss scope yang sedang aktif (untuk debugging).
+
+    Returns:
+        dict: {'hits', 'misses', 'entries', 'functions': {nama: {'hits', 'misses'}}}
+              atau None jika tidak ada scope aktif
+    """
+    store = _active_memo.get()
+    if store is None:
+        return None
+    return {
+        'hits': store.hits,
+        'misses': store.misses,
+        'entries': len(store.cache),
+        'functions': {name: dict(stats) for name, stats in store.per_function.items()},
+    }
+
+
+def clear_memo():
+    """Kosongkan cache scope aktif (mis. setelah data diubah di tengah request)."""
+    store = _active_memo.get()
+    if store is not None:
+        store.cache.clear()
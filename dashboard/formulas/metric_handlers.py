@@ -4,7 +4,7 @@ Separate handlers for each metric type (OS, DPK, NPL, etc.)
 """
 
 from datetime import datetime
-from .table_builder import build_metric_tables
+from ..table_cache import get_cached_metric_tables
 
 
 # ============================================================================
@@ -20,6 +20,14 @@ def get_komitmen_label(selected_date):
     return f"{month_names[selected_date.month]}'{str(selected_date.year)[2:]}"
 
 
+def get_page_slug(request):
+    """Slug halaman dari URL (/page/<slug>/), dipakai sebagai bagian key cache tabel."""
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match:
+        return resolver_match.kwargs.get('slug')
+    return None
+
+
 # ============================================================================
 # OS (Outstanding) Handler
 # ============================================================================
@@ -43,7 +51,8 @@ def handle_os_view(request, segment_filter='SMALL'):
         selected_date = datetime.now().date()
     
     # Build tables using the generic builder
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='os'
@@ -92,7 +101,8 @@ def handle_dpk_view(request, segment_filter='SMALL'):
     # Build tables for DPK metric (uses 'sml' field from calculations.py)
     # SML = val_dpk + (val_lancar if kol_adk='2')
     # Table structure same as OS SMALL, only metric_field='dpk' maps to 'sml'
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='dpk'  # Will be mapped to 'sml' field in table_builder
@@ -146,7 +156,8 @@ def handle_dpk_pct_view(request, segment_filter='SMALL'):
     
     # Build tables for %DPK metric (special calculation)
     # This will need custom logic in table_builder to calculate percentage
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='dpk_pct'  # Special field for percentage
@@ -201,7 +212,8 @@ def handle_npl_view(request, segment_filter='SMALL'):
     # Build tables for NPL metric (uses 'npl' field from calculations.py)
     # NPL = val_kl + val_d + val_m
     # Table structure same as OS SMALL, only metric_field='npl'
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='npl'
@@ -245,7 +257,8 @@ def handle_npl_pct_view(request, segment_filter='SMALL'):
     except ValueError:
         selected_date = datetime.now().date()
     
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='npl_pct'
@@ -293,7 +306,8 @@ def handle_lar_view(request, segment_filter='SMALL'):
     # Build tables for LAR metric (uses 'lar' field from calculations.py)
     # LAR = sml + npl + lr
     # Table structure same as OS SMALL, only metric_field='lar'
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='lar'
@@ -337,7 +351,8 @@ def handle_nsb_view(request, segment_filter='SMALL'):
         selected_date = datetime.now().date()
     
     # NSB uses count instead of sum
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='nsb'  # Special handling for count
@@ -384,7 +399,8 @@ def handle_lr_view(request, segment_filter='SMALL'):
     # Build tables for LR metric (uses 'lr' field from calculations.py)
     # LR = val_lancar if (kol_adk='1' AND flag_restruk='Y')
     # Table structure same as OS SMALL, only metric_field='lr'
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='lr'
@@ -432,7 +448,8 @@ def handle_nsb_view(request, segment_filter='SMALL'):
     
     # Build tables for NSB metric (counts distinct CIFNO)
     # Uses 'nsb' as metric_field which will trigger customer counting in table_builder
-    table_data = build_metric_tables(
+    table_data = get_cached_metric_tables(
+        slug=get_page_slug(request),
         selected_date=selected_date,
         segment_filter=segment_filter,
         metric_field='nsb'  # Special field for customer counting
@@ -470,6 +487,39 @@ METRIC_HANDLERS = {
 }
 
 
+# Halaman tabel metric: slug -> (segment_filter, metric_field), sesuai dispatch di
+# dashboard.views.metric_page_view. Dipakai untuk precompute tabel setelah upload.
+METRIC_TABLE_PAGES = {
+    'small-os': ('SMALL', 'os'),
+    'small-ncc-os': ('SMALL NCC', 'os'),
+    'small-dpk': ('SMALL', 'dpk'),
+    'small-ncc-dpk': ('SMALL NCC', 'dpk'),
+    'small-dpk-pct': ('SMALL', 'dpk_pct'),
+    'small-npl': ('SMALL', 'npl'),
+    'small-ncc-npl': ('SMALL NCC', 'npl'),
+    'small-npl-pct': ('SMALL', 'npl_pct'),
+    'small-lr': ('SMALL', 'lr'),
+    'small-ncc-lr': ('SMALL NCC', 'lr'),
+    'small-lar': ('SMALL', 'lar'),
+    'small-nsb': ('SMALL', 'nsb'),
+    'small-ncc-nsb': ('SMALL NCC', 'nsb'),
+    'cc-os': ('CC', 'os'),
+    'cc-dpk': ('CC', 'dpk'),
+    'cc-npl': ('CC', 'npl'),
+    'cc-nsb': ('CC', 'nsb'),
+    'kur-os': ('KUR', 'os'),
+    'kur-dpk': ('KUR', 'dpk'),
+    'kur-npl': ('KUR', 'npl'),
+    'kur-nsb': ('KUR', 'nsb'),
+    'kur-lr': ('KUR', 'lr'),
+    'medium-os': ('MEDIUM', 'os'),
+    'medium-dpk': ('MEDIUM', 'dpk'),
+    'medium-npl': ('MEDIUM', 'npl'),
+    'medium-nsb': ('MEDIUM', 'nsb'),
+    'medium-lr': ('MEDIUM', 'lr'),
+}
+
+
 def get_metric_handler(metric_type):
     """
     Get the appropriate handler for a metric type.
@@ -2,20 +2,14 @@
 
 from decimal import Decimal
 from datetime import datetime, timedelta
+import numpy as np
 from django.db.models import Sum, Q, F, Count
-from ..models import LW321
-from .segmentation import get_segment_annotation
-from .calculations import annotate_metrics
+from ..models import LW321DailyAggregate
+from .memo import request_memoized
 from .uker_mapping import (
-    KANCA_MASTER, UKER_MASTER, KANCA_CODES, KCP_CODES,
-    get_kanca_induk, get_uker_name, get_kcp_by_kanca
-)
-from .komitmen_helper import (
-    get_komitmen_for_month,
-    get_komitmen_for_kanca_list,
-    get_komitmen_value,
-    check_komitmen_exists
+    UKER_HIERARCHY, get_uker_hierarchy, get_uker_name
 )
+from .komitmen_helper import get_komitmen_snapshot
 
 def get_date_columns(selected_date):
     """
@@ -132,10 +126,10 @@ def map_segment_and_metric_to_komitmen(segment_filter, metric_field):
 
 def get_base_queryset(target_date, segment_filter, metric_field='os', kol_adk_filter=None):
     """
-    Get base queryset with filters and annotations.
+    Get base queryset on the daily per-uker fact table (LW321DailyAggregate).
     
     Args:
-        target_date: Date to filter data
+        target_date: Date to filter data (None = tanpa filter tanggal, mis. untuk periode_date IN (...))
         segment_filter: Segment to filter (e.g., 'SMALL', 'MEDIUM', 'CC', 'KUR')
                        - 'SMALL' = Aggregate of SMALL NCC + CC + KUR (all non-MEDIUM)
                        - 'MEDIUM' = Only MEDIUM segment
@@ -144,11 +138,12 @@ def get_base_queryset(target_date, segment_filter, metric_field='os', kol_adk_fi
         kol_adk_filter: Optional filter for kol_adk field (e.g., '2' for DPK)
     
     Returns:
-        QuerySet: Annotated and filtered queryset
+        QuerySet: Filtered LW321DailyAggregate queryset (sudah di-SUM per grup,
+                  jadi Sum() di atasnya sama dengan Sum() di baris LW321)
     """
-    qs = LW321.objects.filter(periode=target_date.strftime('%d/%m/%Y'))
-    qs = qs.annotate(segment=get_segment_annotation())
-    qs = annotate_metrics(qs)
+    qs = LW321DailyAggregate.objects.all()
+    if target_date is not None:
+        qs = qs.filter(periode_date=target_date)
     
     if segment_filter:
         # SMALL is an aggregate segment = SMALL NCC + CC + KUR (all non-MEDIUM)
@@ -183,116 +178,166 @@ def calculate_percentage_metric(metric_value, base_value):
     return (metric_value / base_value) * 100
 
 
-def get_metric_by_uker(target_date, segment_filter, metric_field='os', kol_adk_filter=None):
+def get_metric_components(metric_field='os', kol_adk_filter=None):
     """
-    Get metric sum grouped by UKER.
-    Handles special percentage metrics (dpk_pct, npl_pct) and NSB (customer count).
+    Komponen SUM per UKER yang dibutuhkan sebuah metric, untuk conditional aggregation.
     
     DPK Logic:
-    - DPK = SUM(kolektibilitas_dpk) 
-    - No kol_adk filter needed, DPK is already its own column
+    - DPK = SUM(sml) (sml sudah berisi OS WHERE kol_adk='2')
     
     NSB Logic:
-    - NSB = SUM(NASABAH) WHERE DUB_NASABAH='TRUE'
-    - Filter: segment and dub_nasabah='TRUE'
+    - NSB = SUM(NASABAH) WHERE DUB_NASABAH='TRUE' (case-insensitive)
+    
+    Percentage metrics (dpk_pct, npl_pct):
+    - 'metric' / 'base': pembilang dan penyebut %DPK/%NPL per UKER
+      (%DPK = OS WHERE kol_adk='2' / OS all kol_adk)
+    - 'metric_raw': pembilang untuk baris total dan KONSOL per KANCA
+      (SUM(sml) WHERE kol_adk='2' untuk DPK, SUM(npl) untuk NPL)
     
     Args:
-        kol_adk_filter: Optional filter for kol_adk field (not used for DPK)
+        kol_adk_filter: Optional filter for kol_adk field (tidak dipakai untuk metric persentase)
     
     Returns:
-        dict: {kode_uker: metric_value}
+        dict: {nama komponen: (field, Q filter atau None)}
     """
-    qs = get_base_queryset(target_date, segment_filter, metric_field, kol_adk_filter)
+    if metric_field == 'dpk_pct':
+        return {
+            'metric': ('os', Q(kol_adk='2')),
+            'base': ('os', None),
+            'metric_raw': ('sml', Q(kol_adk='2')),
+        }
+    if metric_field == 'npl_pct':
+        return {
+            'metric': ('npl', None),
+            'base': ('os', None),
+            'metric_raw': ('npl', None),
+        }
     
-    # Handle NSB (customer count) specially
+    condition = Q(kol_adk=kol_adk_filter) if kol_adk_filter is not None else None
     if metric_field == 'nsb':
-        # Sum NASABAH column per UKER where DUB_NASABAH='TRUE' (case-insensitive)
-        from django.db.models import Q
-        result = qs.filter(
-            Q(dub_nasabah__iexact='TRUE')  # Case-insensitive: 'TRUE', 'True', 'true'
-        ).values('kode_uker').annotate(
-            total=Sum('nasabah')
-        ).order_by('kode_uker')
-        
-        # Convert to Decimal for consistency with other metrics
-        return {item['kode_uker']: Decimal(str(item['total'] or 0)) for item in result}
-    
-    # Handle percentage metrics specially
-    elif metric_field == 'dpk_pct':
-        # %DPK = (DPK where kol_adk='2' / OS all kol_adk) * 100
-        # IMPORTANT: DPK uses kol_adk='2', but OS uses all kol_adk
-        # This measures what % of total portfolio is DPK
-        
-        # Get DPK values (with kol_adk='2' filter)
-        qs_dpk = get_base_queryset(target_date, segment_filter, 'sml', kol_adk_filter='2')
-        dpk_by_uker = qs_dpk.values('kode_uker').annotate(
-            dpk_sum=Sum('os')  # Use OS field directly with kol_adk='2' filter
-        ).order_by('kode_uker')
-        
-        # Get OS values (without kol_adk filter - all portfolio)
-        qs_os = get_base_queryset(target_date, segment_filter, 'os', kol_adk_filter=None)
-        os_by_uker = qs_os.values('kode_uker').annotate(
-            os_sum=Sum('os')
-        ).order_by('kode_uker')
-        
-        # Build dictionaries
-        dpk_dict = {item['kode_uker']: item['dpk_sum'] or Decimal('0') for item in dpk_by_uker}
-        os_dict = {item['kode_uker']: item['os_sum'] or Decimal('0') for item in os_by_uker}
-        
-        # Calculate percentage for each UKER
-        result = {}
-        all_uker_codes = set(dpk_dict.keys()) | set(os_dict.keys())
-        for kode_uker in all_uker_codes:
-            dpk_val = dpk_dict.get(kode_uker, Decimal('0'))
-            os_val = os_dict.get(kode_uker, Decimal('0'))
-            result[kode_uker] = calculate_percentage_metric(dpk_val, os_val)
-        
-        return result
+        dub_condition = Q(dub_nasabah__iexact='TRUE')
+        return {'value': ('nasabah', dub_condition & condition if condition else dub_condition)}
     
-    elif metric_field == 'npl_pct':
-        # %NPL = (NPL where kol_adk IN ('3','4','5') / OS all kol_adk) * 100
-        # IMPORTANT: NPL uses kol_adk IN ('3','4','5'), but OS uses all kol_adk
-        # This measures what % of total portfolio is NPL
-        
-        # Get NPL values (npl annotation already filters kol_adk IN ('3','4','5'))
-        # But for clarity, we'll use explicit filter
-        qs_npl = get_base_queryset(target_date, segment_filter, 'npl', kol_adk_filter=None)
-        # Filter for NPL kol_adk manually since annotation handles it
-        npl_by_uker = qs_npl.values('kode_uker').annotate(
-            npl_sum=Sum('npl')  # npl annotation already has the filter
-        ).order_by('kode_uker')
-        
-        # Get OS values (without kol_adk filter - all portfolio)
-        qs_os = get_base_queryset(target_date, segment_filter, 'os', kol_adk_filter=None)
-        os_by_uker = qs_os.values('kode_uker').annotate(
-            os_sum=Sum('os')
-        ).order_by('kode_uker')
-        
-        # Build dictionaries
-        npl_dict = {item['kode_uker']: item['npl_sum'] or Decimal('0') for item in npl_by_uker}
-        os_dict = {item['kode_uker']: item['os_sum'] or Decimal('0') for item in os_by_uker}
-        
-        # Calculate percentage for each UKER
-        result = {}
-        all_uker_codes = set(npl_dict.keys()) | set(os_dict.keys())
-        for kode_uker in all_uker_codes:
-            npl_val = npl_dict.get(kode_uker, Decimal('0'))
-            os_val = os_dict.get(kode_uker, Decimal('0'))
-            result[kode_uker] = calculate_percentage_metric(npl_val, os_val)
-        
-        return result
+    # Regular metrics (os, npl, lar, lr, sml/dpk, etc.) - DPK memakai kolom sml
+    actual_field = 'sml' if metric_field == 'dpk' else metric_field
+    return {'value': (actual_field, condition)}
+
+
+def _fetch_grouped_components(date_columns, segment_filter, metric_field, kol_adk_filter, key, **key_expression):
+    """
+    Satu grouped query untuk kelima kolom tanggal: GROUP BY periode_date + key,
+    dengan conditional aggregation per komponen (get_metric_components).
+    key_expression: ekspresi untuk key jika bukan kolom LW321DailyAggregate langsung.
     
-    else:
-        # Regular metrics (os, npl, lar, lr, sml/dpk, etc.)
-        # For DPK, use 'sml' field which is already annotated in calculations.py
-        # SML = DPK + (Lancar if kol_adk == '2')
-        actual_field = 'sml' if metric_field == 'dpk' else metric_field
-        
-        result = qs.values('kode_uker').annotate(
-            total=Sum(actual_field)
-        ).order_by('kode_uker')
-        
-        return {item['kode_uker']: item['total'] or Decimal('0') for item in result}
+    Returns:
+        dict: {col_name: {komponen: {key: Decimal}}}
+    """
+    components = get_metric_components(metric_field, kol_adk_filter)
+    columns_by_date = {}
+    for col_name, col_info in date_columns.items():
+        columns_by_date.setdefault(col_info['date'], []).append(col_name)
+    
+    result = {
+        col_name: {name: {} for name in components}
+        for col_name in date_columns
+    }
+    
+    qs = get_base_queryset(None, segment_filter).filter(periode_date__in=list(columns_by_date))
+    group_fields = ('periode_date',) if key_expression else ('periode_date', key)
+    rows = qs.values(*group_fields, **key_expression).annotate(**{
+        name: Sum(field, filter=condition)
+        for name, (field, condition) in components.items()
+    }).order_by(key)
+    
+    for row in rows:
+        if row[key] is None:
+            continue
+        for col_name in columns_by_date[row['periode_date']]:
+            for name in components:
+                if row[name] is not None:
+                    result[col_name][name][row[key]] = row[name]
+    
+    return result
+
+
+@request_memoized
+def fetch_metric_by_uker(date_columns, segment_filter, metric_field='os', kol_adk_filter=None):
+    """
+    Ambil semua nilai (tanggal, kode_uker) untuk kelima kolom tanggal (A-E) dalam
+    SATU grouped query: periode_date IN (...) dengan conditional aggregation per komponen.
+    
+    Returns:
+        dict: {col_name: {komponen: {kode_uker: Decimal}}}
+              UKER tanpa baris yang cocok dengan filter komponen tidak dimasukkan
+              (sama seperti query per tanggal sebelumnya)
+    """
+    return _fetch_grouped_components(date_columns, segment_filter, metric_field, kol_adk_filter, 'kode_uker')
+
+
+@request_memoized
+def fetch_metric_by_kanca(date_columns, segment_filter, metric_field='os', kol_adk_filter=None):
+    """
+    Seperti fetch_metric_by_uker, tetapi di-roll-up ke KANCA induk di PostgreSQL
+    (JOIN uker_master, GROUP BY periode_date, kode_kanca). UKER yang tidak ada di
+    uker_master tidak dihitung.
+    
+    Jika uker_master belum terisi, roll-up dilakukan di Python dari hasil per UKER
+    memakai hierarki statis.
+    
+    Returns:
+        dict: {col_name: {komponen: {kode_kanca (int): Decimal}}}
+    """
+    hierarchy = get_uker_hierarchy()
+    if hierarchy is UKER_HIERARCHY:
+        uker_data = fetch_metric_by_uker(date_columns, segment_filter, metric_field, kol_adk_filter)
+        return {
+            col_name: {name: hierarchy.sum_by_kanca(values) for name, values in components.items()}
+            for col_name, components in uker_data.items()
+        }
+    return _fetch_grouped_components(
+        date_columns, segment_filter, metric_field, kol_adk_filter,
+        'kode_kanca', kode_kanca=F('uker_master__kode_kanca'),
+    )
+
+
+def get_metric_values(metric_field, components):
+    """
+    Nilai metric per UKER untuk satu tanggal dari hasil fetch_metric_by_uker.
+    Untuk dpk_pct / npl_pct: persentase (metric / base * 100) per UKER.
+    
+    Returns:
+        dict: {kode_uker: metric_value}
+    """
+    if metric_field not in ['dpk_pct', 'npl_pct']:
+        return components['value']
+    
+    metric_dict = components['metric']
+    base_dict = components['base']
+    result = {}
+    for kode_uker in set(metric_dict) | set(base_dict):
+        result[kode_uker] = calculate_percentage_metric(
+            metric_dict.get(kode_uker, Decimal('0')),
+            base_dict.get(kode_uker, Decimal('0')),
+        )
+    return result
+
+
+@request_memoized
+def get_metric_by_uker(target_date, segment_filter, metric_field='os', kol_adk_filter=None):
+    """
+    Get metric sum grouped by UKER for a single date.
+    Handles special percentage metrics (dpk_pct, npl_pct) and NSB (customer count),
+    lihat get_metric_components.
+    
+    Args:
+        kol_adk_filter: Optional filter for kol_adk field (not used for DPK)
+    
+    Returns:
+        dict: {kode_uker: metric_value}
+    """
+    date_columns = {'E': {'date': target_date}}
+    uker_data = fetch_metric_by_uker(date_columns, segment_filter, metric_field, kol_adk_filter)
+    return get_metric_values(metric_field, uker_data['E'])
 
 
 def get_kode_kanca_from_uker(kode_uker_str):
@@ -300,34 +345,27 @@ def get_kode_kanca_from_uker(kode_uker_str):
     Determine the parent KANCA code from a given UKER code.
     Returns integer kode_kanca or None.
     """
-    try:
-        kode_uker_int = int(kode_uker_str)
-    except (ValueError, TypeError):
-        # If string code, check directly in KANCA_CODES
-        if kode_uker_str in [str(k) for k in KANCA_CODES]:
-            return kode_uker_str
-        return None
-    
-    # Check if it's a KANCA
-    if kode_uker_int in KANCA_CODES:
-        return kode_uker_int
-    
-    # Check if it's in UKER_MASTER (could be KCP)
-    if kode_uker_int in UKER_MASTER:
-        _, kode_kanca_induk = UKER_MASTER[kode_uker_int]
-        return kode_kanca_induk
+    return get_uker_hierarchy().kanca_of(kode_uker_str)
+
+
+def sum_by_kanca(metric_by_uker):
+    """
+    Sum metric values per UKER into their parent KANCA.
     
-    # Try with get_kanca_induk helper from uker_mapping
-    return get_kanca_induk(kode_uker_int)
+    Returns:
+        dict: {kode_kanca: metric_value}
+    """
+    return get_uker_hierarchy().sum_by_kanca(metric_by_uker)
 
 
 def get_metric_by_kanca(target_date, segment_filter, metric_field='os', kol_adk_filter=None):
     """
-    Get metric sum grouped by parent KANCA (dynamically calculated).
+    Get metric sum grouped by parent KANCA.
     
-    This sums values from all UKERs under each KANCA.
-    For all metrics (OS, DPK, NPL, LAR, LR, NSB), we sum the values from each UKER
-    that belongs to the KANCA induk.
+    Roll-up UKER -> KANCA induk dilakukan di PostgreSQL (fetch_metric_by_kanca).
+    For all metrics (OS, DPK, NPL, LAR, LR, NSB), the KANCA value is the sum of
+    each UKER that belongs to the KANCA induk; %DPK/%NPL dihitung dari jumlah
+    pembilang/penyebut per KANCA (sama seperti tabel KONSOL).
     
     Formula: KONSOL = KANCA ONLY + KCP ONLY (must be valid for all metrics)
     
@@ -337,17 +375,9 @@ def get_metric_by_kanca(target_date, segment_filter, metric_field='os', kol_adk_
     Returns:
         dict: {kode_kanca: metric_value}
     """
-    metric_by_uker = get_metric_by_uker(target_date, segment_filter, metric_field, kol_adk_filter)
-    metric_by_kanca = {}
-    
-    for kode_uker_str, value in metric_by_uker.items():
-        kode_kanca = get_kode_kanca_from_uker(kode_uker_str)
-        if kode_kanca:
-            if kode_kanca not in metric_by_kanca:
-                metric_by_kanca[kode_kanca] = Decimal('0')
-            metric_by_kanca[kode_kanca] += value
-    
-    return metric_by_kanca
+    date_columns = {'E': {'date': target_date}}
+    kanca_data = fetch_metric_by_kanca(date_columns, segment_filter, metric_field, kol_adk_filter)
+    return get_metric_values(metric_field, kanca_data['E'])
 
 
 # ============================================================================
@@ -399,7 +429,151 @@ def calculate_changes(A, B, C, D, E):
     }
 
 
-def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None):
+# ============================================================================
+# Batched Change Calculation (NumPy)
+# ============================================================================
+
+# Nilai rupiah di-skala ke int64 (sen) supaya selisih DtD/MoM/MtD/YtD tetap persis
+VALUE_SCALE = 100
+# Realisasi (rupiah penuh) vs komitmen (juta rupiah, 10 desimal) dalam satuan 1e-10 juta
+KOMITMEN_SCALE = 10 ** 10
+RUPIAH_TO_KOMITMEN_SCALE = KOMITMEN_SCALE // 10 ** 6
+
+# Pasangan (kolom perubahan, kolom pembanding terhadap E)
+CHANGE_COLUMNS = (('DtD', 'D'), ('MoM', 'B'), ('MtD', 'C'), ('YtD', 'A'))
+
+
+def _to_array(values, scale=None):
+    """
+    Decimal/None per baris -> ndarray.
+    scale=None: float64 (untuk nilai persentase); scale=int: int64 ter-skala (persis,
+    kolom DecimalField punya paling banyak log10(scale) desimal).
+    """
+    if scale is None:
+        return np.array([float(value) if value is not None else 0.0 for value in values], dtype=np.float64)
+    scaled = [int(value * scale) if value is not None else 0 for value in values]
+    # Jumlah kolom (baris total) dan selisih antar kolom harus muat di int64;
+    # di luar itu tetap persis dengan integer Python
+    if sum(abs(value) for value in scaled) >= 2 ** 62:
+        return np.array(scaled, dtype=object)
+    return np.array(scaled, dtype=np.int64)
+
+
+def _from_array(array, scale):
+    """Kebalikan _to_array untuk nilai ter-skala: ndarray -> list Decimal."""
+    exponent = -len(str(scale)) + 1
+    return [Decimal(value).scaleb(exponent) for value in array.tolist()]
+
+
+def calculate_changes_batch(values, totals=None, scale=VALUE_SCALE):
+    """
+    Versi vektor calculate_changes untuk semua baris tabel sekaligus.
+
+    Kolom A-E ditumpuk menjadi satu matriks (baris terakhir = total) sehingga
+    selisih dan persentase keempat perubahan dihitung dengan satu operasi.
+    Selisih dikembalikan sebagai Decimal, persentase sebagai float.
+
+    Args:
+        values: dict kolom 'A'-'E' -> list nilai per baris (Decimal/None)
+        totals: dict 'A'-'E' untuk baris total jika dihitung terpisah (metric persentase);
+                None = jumlah kolom dari array yang sama
+        scale: VALUE_SCALE untuk nilai rupiah (int64 persis), None untuk persentase (float64)
+
+    Returns:
+        tuple: (list dict perubahan per baris, dict totals 'A'-'E' + perubahan)
+    """
+    base_names = [base_name for _, base_name in CHANGE_COLUMNS]
+    columns = [values['E']] + [values[base_name] for base_name in base_names]
+    if totals is not None:
+        columns = [list(column) + [totals[col_name]] for column, col_name in zip(columns, ['E'] + base_names)]
+    matrix = np.vstack([_to_array(column, scale) for column in columns]) if columns[0] else None
+
+    if matrix is None:
+        matrix = np.zeros((5, 1 if totals is not None else 0), dtype=np.int64)
+    if totals is None:
+        matrix = np.hstack([matrix, matrix.sum(axis=1, keepdims=True)])
+
+    diff = matrix[0] - matrix[1:]
+    base = matrix[1:].astype(np.float64)
+    pct = np.zeros(base.shape, dtype=np.float64)
+    np.divide(diff.astype(np.float64), base, out=pct, where=base != 0)
+    pct *= 100
+
+    diff_lists = [_from_array(row, scale) for row in diff] if scale else diff.tolist()
+    pct_lists = pct.tolist()
+    names = []
+    items = []
+    for idx, (change_name, _) in enumerate(CHANGE_COLUMNS):
+        names += [change_name, f'{change_name}_pct']
+        items += [diff_lists[idx], pct_lists[idx]]
+    row_changes = [dict(zip(names, row)) for row in zip(*items)]
+
+    total_row = row_changes.pop()
+    if totals is None:
+        sums = matrix[:, -1:]
+        sums = [_from_array(row, scale)[0] for row in sums] if scale else [Decimal(repr(row[0])) for row in sums.tolist()]
+        totals = dict(zip(['E'] + base_names, sums))
+    else:
+        totals = {col_name: totals[col_name] for col_name in 'ABCDE'}
+    totals.update(total_row)
+    return row_changes, totals
+
+
+def calculate_komitmen_batch(E_values, komitmen_values, reverse=False, in_millions=True, missing_as_iferror=False):
+    """
+    Versi vektor % Ach dan Gap thd Realisasi untuk semua baris.
+
+    % Ach = IFERROR(IF(r>1.1,110%,IF(r<0,0%,r)),110%) dengan r = E/Komitmen
+    (r = Komitmen/E untuk DPK/NPL, reverse=True). Gap = E - Komitmen.
+
+    Args:
+        in_millions: E dalam rupiah penuh dan komitmen dalam juta (False: keduanya persentase)
+        missing_as_iferror: baris tanpa komitmen diisi 110% dan Gap = E (tabel KCP ONLY)
+
+    Returns:
+        tuple: (list komitmen_pct_ach, list komitmen_gab_real), None untuk baris tanpa komitmen
+    """
+    if in_millions:
+        E_array = _to_array(E_values, RUPIAH_TO_KOMITMEN_SCALE)
+        komitmen_array = _to_array(komitmen_values, KOMITMEN_SCALE)
+        scale = KOMITMEN_SCALE
+    else:
+        E_array = _to_array(E_values)
+        komitmen_array = _to_array(komitmen_values)
+        scale = None
+
+    E_float = E_array.astype(np.float64)
+    komitmen_float = komitmen_array.astype(np.float64)
+    ratio = np.full(len(E_float), 11.0)  # Pembagi nol -> 110%
+    if reverse:
+        np.divide(komitmen_float, E_float, out=ratio, where=E_float != 0)
+    else:
+        np.divide(E_float, komitmen_float, out=ratio, where=komitmen_float != 0)
+    pct_ach = np.where(ratio > 1.1, 110.0, np.where(ratio < 0, 0.0, ratio * 100))
+
+    has_komitmen = [value is not None and value != 0 for value in komitmen_values]
+    # Baris tanpa komitmen: Gap = realisasi (KCP ONLY) atau kosong
+    gap_array = np.where(has_komitmen, E_array - komitmen_array, E_array) if len(E_array) else E_array
+    gap_list = _from_array(gap_array, scale) if scale else gap_array.tolist()
+    pct_list = pct_ach.tolist()
+
+    pct_result = []
+    gap_result = []
+    for idx, komitmen_found in enumerate(has_komitmen):
+        if komitmen_found:
+            pct_result.append(pct_list[idx])
+            gap_result.append(gap_list[idx])
+        elif missing_as_iferror:
+            # IFERROR: jika error (pembagi nol), anggap 110%; Gap = realisasi
+            pct_result.append(110.0)
+            gap_result.append(gap_list[idx])
+        else:
+            pct_result.append(None)
+            gap_result.append(None)
+    return pct_result, gap_result
+
+
+def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None, kanca_data=None):
     """
     Build KONSOL table (grouped by KANCA - includes both KANCA and their KCPs).
     
@@ -409,9 +583,14 @@ def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os',
     
     Args:
         kol_adk_filter: Optional filter for kol_adk field (e.g., '2' for DPK)
+        kanca_data: Optional hasil fetch_metric_by_kanca (roll-up per KANCA di database)
     """
     rows = []
     
+    if kanca_data is None:
+        kanca_data = fetch_metric_by_kanca(date_columns, segment_filter, metric_field, kol_adk_filter)
+    hierarchy = get_uker_hierarchy()
+    
     # Get selected date for komitmen lookup (date E)
     selected_date = date_columns['E']['date']
     year = selected_date.year
@@ -422,254 +601,112 @@ def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os',
     komitmen_data = None
     
     if komitmen_segment and komitmen_metric:
-        # Check if komitmen exists for this month
-        if check_komitmen_exists(year, month):
-            komitmen_data = get_komitmen_for_kanca_list(year, month)
+        # Snapshot kosong (tidak ada komitmen bulan ini) -> None
+        komitmen_data = get_komitmen_snapshot(year, month) or None
     
     # For percentage metrics, we need raw data (DPK/NPL and OS) instead of pre-calculated percentages
-    if metric_field in ['dpk_pct', 'npl_pct']:
-        # Determine which raw metrics to use and their filters
-        if metric_field == 'dpk_pct':
-            metric_raw = 'sml'  # DPK
-            base_raw = 'os'     # OS
-            # IMPORTANT: For %DPK calculation:
-            # - DPK uses kol_adk='2' filter
-            # - OS uses ALL kol_adk (no filter)
-            # This measures what % of TOTAL portfolio is DPK
-            metric_filter = '2'
-            base_filter = None   # OS includes all kol_adk
-        elif metric_field == 'npl_pct':
-            metric_raw = 'npl'  # NPL
-            base_raw = 'os'     # OS
-            metric_filter = None  # NPL uses kol_adk 3,4,5 (handled in annotation)
-            base_filter = None    # OS for NPL uses all kol_adk
-        
-        # Get raw data for each date
+    is_percentage = metric_field in ['dpk_pct', 'npl_pct']
+    values = {col_name: [] for col_name in date_columns}
+    komitmen_values = []
+    if is_percentage:
+        # Raw data per KANCA untuk setiap tanggal (komponen dari get_metric_components):
+        # - metric_raw: DPK (sml WHERE kol_adk='2') atau NPL
+        # - base: OS untuk ALL kol_adk (mengukur % dari TOTAL portfolio)
         metric_data_by_date = {}
         os_data_by_date = {}
-        for col_name, col_info in date_columns.items():
-            metric_data_by_date[col_name] = get_metric_by_kanca(
-                col_info['date'], segment_filter, metric_raw, metric_filter
-            )
-            os_data_by_date[col_name] = get_metric_by_kanca(
-                col_info['date'], segment_filter, base_raw, base_filter
-            )
+        for col_name in date_columns:
+            metric_data_by_date[col_name] = kanca_data[col_name]['metric_raw']
+            os_data_by_date[col_name] = kanca_data[col_name]['base']
         
-        # Build rows for each KANCA
-        for idx, kode_kanca in enumerate(KANCA_CODES, start=1):
-            kanca_name = KANCA_MASTER.get(kode_kanca, f"KANCA {kode_kanca}")
-            
-            # Get raw metric (DPK or NPL) for each date
-            metric_A = metric_data_by_date['A'].get(kode_kanca, Decimal('0'))
-            metric_B = metric_data_by_date['B'].get(kode_kanca, Decimal('0'))
-            metric_C = metric_data_by_date['C'].get(kode_kanca, Decimal('0'))
-            metric_D = metric_data_by_date['D'].get(kode_kanca, Decimal('0'))
-            metric_E = metric_data_by_date['E'].get(kode_kanca, Decimal('0'))
-            
-            # Get OS for each date
-            os_A = os_data_by_date['A'].get(kode_kanca, Decimal('0'))
-            os_B = os_data_by_date['B'].get(kode_kanca, Decimal('0'))
-            os_C = os_data_by_date['C'].get(kode_kanca, Decimal('0'))
-            os_D = os_data_by_date['D'].get(kode_kanca, Decimal('0'))
-            os_E = os_data_by_date['E'].get(kode_kanca, Decimal('0'))
-            
-            # Calculate percentage for each date
-            A = calculate_percentage_metric(metric_A, os_A)
-            B = calculate_percentage_metric(metric_B, os_B)
-            C = calculate_percentage_metric(metric_C, os_C)
-            D = calculate_percentage_metric(metric_D, os_D)
-            E = calculate_percentage_metric(metric_E, os_E)
-            
-            changes = calculate_changes(A, B, C, D, E)
+        for kode_kanca in hierarchy.kanca_codes:
+            # Percentage per tanggal dari raw metric (DPK or NPL) dan OS
+            for col_name in date_columns:
+                values[col_name].append(calculate_percentage_metric(
+                    metric_data_by_date[col_name].get(kode_kanca, Decimal('0')),
+                    os_data_by_date[col_name].get(kode_kanca, Decimal('0')),
+                ))
             
             # Get komitmen value untuk kanca ini
             # kode_kanca di komitmen_data sekarang integer (IntegerField), tidak perlu str()
             komitmen_value = None
             if komitmen_data and komitmen_segment and komitmen_metric:
                 # SPECIAL CASE for %DPK/%NPL: Calculate komitmen as percentage
-                if metric_field in ['dpk_pct', 'npl_pct']:
-                    # Get raw komitmen for numerator (DPK or NPL)
-                    komitmen_raw = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, komitmen_metric)
-                    # Get komitmen OS for denominator
-                    komitmen_os = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, 'os')
-                    
-                    # Calculate percentage: (DPK/NPL / OS) Ã— 100
-                    if komitmen_raw is not None and komitmen_os is not None and komitmen_os != 0:
-                        komitmen_value = calculate_percentage_metric(komitmen_raw, komitmen_os)
-                    else:
-                        komitmen_value = None
-                else:
-                    # For other metrics: Use raw komitmen value
-                    komitmen_value = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, komitmen_metric)
-            
-            # Calculate komitmen % Achievement and Gap
-            # % Ach Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
-            # Gap Formula: E - Komitmen
-            # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
-            komitmen_pct_ach = None
-            komitmen_gab_real = None
-            if komitmen_value is not None and komitmen_value != 0:
-                # For DPK/NPL and %DPK/%NPL pages: Use reversed formula (Komitmen / E) Ã— 100
-                if metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct']:
-                    if E != 0:
-                        ratio = komitmen_value / E  # REVERSED: Komitmen / E
-                    else:
-                        ratio = Decimal('11')  # Will result in 110% cap
-                else:
-                    # For OS and other metrics: Normal formula (E / Komitmen)
-                    ratio = E / komitmen_value
-                
-                if ratio > Decimal('1.1'):
-                    komitmen_pct_ach = Decimal('110')
-                elif ratio < 0:
-                    komitmen_pct_ach = Decimal('0')
-                else:
-                    komitmen_pct_ach = ratio * Decimal('100')
+                # Get raw komitmen for numerator (DPK or NPL)
+                komitmen_raw = komitmen_data.kanca_value(kode_kanca, komitmen_segment, komitmen_metric)
+                # Get komitmen OS for denominator
+                komitmen_os = komitmen_data.kanca_value(kode_kanca, komitmen_segment, 'os')
                 
-                # Gap = E - Komitmen (positive = surplus, negative = shortfall)
-                komitmen_gab_real = E - komitmen_value
-            
-            rows.append({
-                'no': idx,
-                'kode_kanca': kode_kanca,
-                'kanca': kanca_name,
-                'A': A,
-                'B': B,
-                'C': C,
-                'D': D,
-                'E': E,
-                **changes,
-                # Komitmen columns
-                'komitmen': komitmen_value,
-                'komitmen_pct_ach': komitmen_pct_ach,
-                'komitmen_gab_real': komitmen_gab_real,
-            })
+                # Calculate percentage: (DPK/NPL / OS) Ã— 100
+                if komitmen_raw is not None and komitmen_os is not None and komitmen_os != 0:
+                    komitmen_value = calculate_percentage_metric(komitmen_raw, komitmen_os)
+            komitmen_values.append(komitmen_value)
     else:
         # For non-percentage metrics, use existing logic
         # Get data for each date
         data_by_date = {}
-        for col_name, col_info in date_columns.items():
-            data_by_date[col_name] = get_metric_by_kanca(
-                col_info['date'], 
-                segment_filter, 
-                metric_field,
-                kol_adk_filter
-            )
+        for col_name in date_columns:
+            data_by_date[col_name] = get_metric_values(metric_field, kanca_data[col_name])
         
-        # Build rows for each KANCA
-        for idx, kode_kanca in enumerate(KANCA_CODES, start=1):
-            kanca_name = KANCA_MASTER.get(kode_kanca, f"KANCA {kode_kanca}")
-            
-            A = data_by_date['A'].get(kode_kanca, Decimal('0'))
-            B = data_by_date['B'].get(kode_kanca, Decimal('0'))
-            C = data_by_date['C'].get(kode_kanca, Decimal('0'))
-            D = data_by_date['D'].get(kode_kanca, Decimal('0'))
-            E = data_by_date['E'].get(kode_kanca, Decimal('0'))
-            
-            changes = calculate_changes(A, B, C, D, E)
+        for kode_kanca in hierarchy.kanca_codes:
+            for col_name in date_columns:
+                values[col_name].append(data_by_date[col_name].get(kode_kanca, Decimal('0')))
             
             # Get komitmen value untuk kanca ini
             # kode_kanca di komitmen_data sekarang integer (IntegerField), tidak perlu str()
             komitmen_value = None
             if komitmen_data and komitmen_segment and komitmen_metric:
-                komitmen_value = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, komitmen_metric)
-            
-            # Calculate komitmen % Achievement and Gap
-            # % Ach Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
-            # Gap Formula: E - Komitmen (positive = surplus, negative = shortfall)
-            # NOTE: E dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
-            # Konversi E ke RIBUAN (juta) terlebih dahulu untuk consistency
-            # SPECIAL CASE for DPK/NPL: Reversed formula (Komitmen / E) instead of (E / Komitmen)
-            komitmen_pct_ach = None
-            komitmen_gab_real = None
-            if komitmen_value is not None and komitmen_value != 0:
-                E_in_millions = E / Decimal('1000000')  # Convert E from rupiah to millions (thousands)
-                
-                # For DPK/NPL pages: Use reversed formula (Komitmen / E) Ã— 100
-                if metric_field in ['dpk', 'npl']:
-                    if E_in_millions != 0:
-                        ratio = komitmen_value / E_in_millions  # REVERSED: Komitmen / E
-                    else:
-                        ratio = Decimal('11')  # Will result in 110% cap
-                else:
-                    # For OS and other metrics: Normal formula (E / Komitmen)
-                    ratio = E_in_millions / komitmen_value
-                
-                if ratio > Decimal('1.1'):
-                    # Cap at 110%
-                    komitmen_pct_ach = Decimal('110')
-                elif ratio < 0:
-                    # Floor at 0%
-                    komitmen_pct_ach = Decimal('0')
-                else:
-                    # Normal calculation
-                    komitmen_pct_ach = ratio * Decimal('100')
-                
-                # Gap = E - Komitmen (both in millions/thousands)
-                # Positive = surplus (realisasi > komitmen) â†’ hitam
-                # Negative = shortfall (realisasi < komitmen) â†’ merah
-                komitmen_gab_real = E_in_millions - komitmen_value
-            
-            rows.append({
-                'no': idx,
-                'kode_kanca': kode_kanca,
-                'kanca': kanca_name,
-                'A': A,
-                'B': B,
-                'C': C,
-                'D': D,
-                'E': E,
-                **changes,
-                # Komitmen value
-                'komitmen': komitmen_value,
-                'komitmen_pct_ach': komitmen_pct_ach,
-                'komitmen_gab_real': komitmen_gab_real,
-            })
+                komitmen_value = komitmen_data.kanca_value(kode_kanca, komitmen_segment, komitmen_metric)
+            komitmen_values.append(komitmen_value)
     
     # Calculate totals
     # For percentage metrics (dpk_pct, npl_pct), we need to recalculate from raw data
     # Total %DPK = (Total DPK / Total OS) Ã— 100, NOT sum of individual percentages
-    if metric_field in ['dpk_pct', 'npl_pct']:
-        # Get raw metric and base (OS) data for each date
-        if metric_field == 'dpk_pct':
-            # Need DPK (sml) and OS
-            metric_raw = 'sml'
-            base_raw = 'os'
-            metric_filter = '2'   # DPK uses kol_adk='2'
-            base_filter = None    # OS uses all kol_adk
-        elif metric_field == 'npl_pct':
-            # Need NPL and OS
-            metric_raw = 'npl'
-            base_raw = 'os'
-            metric_filter = None
-            base_filter = None
-        
-        # Get totals for each date
+    # For non-percentage metrics, totals = jumlah kolom dari array yang sama
+    totals = None
+    if is_percentage:
         totals = {}
-        for col_name, col_info in date_columns.items():
-            # Get metric sum (DPK or NPL)
-            metric_data = get_metric_by_kanca(col_info['date'], segment_filter, metric_raw, metric_filter)
-            metric_sum = sum(metric_data.values())
-            
-            # Get OS sum (all kol_adk)
-            os_data = get_metric_by_kanca(col_info['date'], segment_filter, base_raw, base_filter)
-            os_sum = sum(os_data.values())
-            
-            # Calculate percentage
+        for col_name in date_columns:
+            # Get metric sum (DPK or NPL) and OS sum (all kol_adk)
+            metric_sum = sum(metric_data_by_date[col_name].values())
+            os_sum = sum(os_data_by_date[col_name].values())
             totals[col_name] = calculate_percentage_metric(metric_sum, os_sum)
-    else:
-        # For non-percentage metrics, simple sum works
-        totals = {
-            'A': sum(row['A'] for row in rows),
-            'B': sum(row['B'] for row in rows),
-            'C': sum(row['C'] for row in rows),
-            'D': sum(row['D'] for row in rows),
-            'E': sum(row['E'] for row in rows),
-        }
     
-    totals.update(calculate_changes(
-        totals['A'], totals['B'], totals['C'], totals['D'], totals['E']
-    ))
+    # DtD/MoM/MtD/YtD untuk semua baris + total dalam satu pass vektor
+    row_changes, totals = calculate_changes_batch(
+        values, totals, scale=None if is_percentage else VALUE_SCALE
+    )
+    
+    # Calculate komitmen % Achievement and Gap
+    # % Ach Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
+    # Gap Formula: E - Komitmen (positive = surplus, negative = shortfall)
+    # NOTE: E dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
+    # (untuk %DPK/%NPL keduanya sudah persentase)
+    # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
+    komitmen_pct_ach_values, komitmen_gab_real_values = calculate_komitmen_batch(
+        values['E'],
+        komitmen_values,
+        reverse=metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct'],
+        in_millions=not is_percentage,
+    )
+    
+    # Build rows for each KANCA
+    for idx, kode_kanca in enumerate(hierarchy.kanca_codes, start=1):
+        position = idx - 1
+        rows.append({
+            'no': idx,
+            'kode_kanca': kode_kanca,
+            'kanca': hierarchy.kanca_names.get(kode_kanca, f"KANCA {kode_kanca}"),
+            'A': values['A'][position],
+            'B': values['B'][position],
+            'C': values['C'][position],
+            'D': values['D'][position],
+            'E': values['E'][position],
+            **row_changes[position],
+            # Komitmen columns
+            'komitmen': komitmen_values[position],
+            'komitmen_pct_ach': komitmen_pct_ach_values[position],
+            'komitmen_gab_real': komitmen_gab_real_values[position],
+        })
     
     # Calculate komitmen total
     komitmen_total = None
@@ -685,14 +722,14 @@ def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os',
             # Sum raw komitmen for numerator (DPK or NPL)
             komitmen_raw_sum = Decimal('0')
             for kode_kanca in kanca_codes:
-                komitmen_raw = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, komitmen_metric)
+                komitmen_raw = komitmen_data.kanca_value(kode_kanca, komitmen_segment, komitmen_metric)
                 if komitmen_raw:
                     komitmen_raw_sum += komitmen_raw
             
             # Sum komitmen OS for denominator
             komitmen_os_sum = Decimal('0')
             for kode_kanca in kanca_codes:
-                komitmen_os = get_komitmen_value(komitmen_data, kode_kanca, komitmen_segment, 'os')
+                komitmen_os = komitmen_data.kanca_value(kode_kanca, komitmen_segment, 'os')
                 if komitmen_os:
                     komitmen_os_sum += komitmen_os
             
@@ -754,16 +791,21 @@ def build_konsol_table(date_columns, segment_filter='SMALL', metric_field='os',
     }
 
 
-def build_kanca_only_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None):
+def build_kanca_only_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None, uker_data=None):
     """
     Build KANCA ONLY table (only KANCA, excluding KCPs).
     Only includes actual KANCA codes, not KCP contributions.
     
     Args:
         kol_adk_filter: Optional filter for kol_adk field (e.g., '2' for DPK)
+        uker_data: Optional hasil fetch_metric_by_uker (dibagi dengan tabel lain di halaman yang sama)
     """
     rows = []
     
+    if uker_data is None:
+        uker_data = fetch_metric_by_uker(date_columns, segment_filter, metric_field, kol_adk_filter)
+    hierarchy = get_uker_hierarchy()
+    
     # Get selected date for komitmen lookup (date E)
     selected_date = date_columns['E']['date']
     year = selected_date.year
@@ -774,173 +816,101 @@ def build_kanca_only_table(date_columns, segment_filter='SMALL', metric_field='o
     komitmen_data = None
     
     if komitmen_segment and komitmen_metric:
-        # Check if komitmen exists for this month
-        if check_komitmen_exists(year, month):
-            komitmen_data = get_komitmen_for_month(year, month)  # Per uker data
-    
-    # Initialize totals
-    totals = {
-        'A': 0, 'B': 0, 'C': 0, 'D': 0, 'E': 0,
-        'DtD': 0, 'MoM': 0, 'MtD': 0, 'YtD': 0,
-        'DtD_pct': 0, 'MoM_pct': 0, 'MtD_pct': 0, 'YtD_pct': 0
-    }
+        # Snapshot kosong (tidak ada komitmen bulan ini) -> None
+        komitmen_data = get_komitmen_snapshot(year, month) or None
+    
+    is_percentage = metric_field in ['dpk_pct', 'npl_pct']
     
-    # Pre-fetch all metrics for all dates (optimization)
-    # This avoids calling get_metric_by_uker() inside the loop
+    # Metrics for all dates from the single grouped query (fetch_metric_by_uker)
     metrics_by_date = {}
-    for col_name, col_info in date_columns.items():
-        metrics_by_date[col_name] = get_metric_by_uker(
-            col_info['date'],
-            segment_filter,
-            metric_field,
-            kol_adk_filter
-        )
+    for col_name in date_columns:
+        metrics_by_date[col_name] = get_metric_values(metric_field, uker_data[col_name])
     
-    for idx, kode_kanca in enumerate(KANCA_CODES, start=1):
+    values = {col_name: [] for col_name in date_columns}
+    komitmen_values = []
+    for kode_kanca in hierarchy.kanca_codes:
         # Get metrics for each date column - only for KANCA code itself
         # Convert kode_kanca to string because kode_uker in database is CharField
         kode_kanca_str = str(kode_kanca)
-        
-        A_val = metrics_by_date['A'].get(kode_kanca_str, 0)
-        B_val = metrics_by_date['B'].get(kode_kanca_str, 0)
-        C_val = metrics_by_date['C'].get(kode_kanca_str, 0)
-        D_val = metrics_by_date['D'].get(kode_kanca_str, 0)
-        E_val = metrics_by_date['E'].get(kode_kanca_str, 0)
-        
-        # Calculate changes
-        changes = calculate_changes(A_val, B_val, C_val, D_val, E_val)
+        for col_name in date_columns:
+            values[col_name].append(metrics_by_date[col_name].get(kode_kanca_str, 0))
         
         # Get komitmen value untuk kanca ini (using kode_uker = kode_kanca untuk KANCA ONLY)
         komitmen_value = None
         if komitmen_data and komitmen_segment and komitmen_metric:
             # SPECIAL CASE for %DPK/%NPL: Calculate komitmen as percentage
-            if metric_field in ['dpk_pct', 'npl_pct']:
+            if is_percentage:
                 # Get raw komitmen for numerator (DPK or NPL)
-                komitmen_raw = get_komitmen_value(komitmen_data, kode_kanca_str, komitmen_segment, komitmen_metric)
+                komitmen_raw = komitmen_data.uker_value(kode_kanca_str, komitmen_segment, komitmen_metric)
                 # Get komitmen OS for denominator
-                komitmen_os = get_komitmen_value(komitmen_data, kode_kanca_str, komitmen_segment, 'os')
+                komitmen_os = komitmen_data.uker_value(kode_kanca_str, komitmen_segment, 'os')
                 
                 # Calculate percentage: (DPK/NPL / OS) Ã— 100
                 if komitmen_raw is not None and komitmen_os is not None and komitmen_os != 0:
                     komitmen_value = calculate_percentage_metric(komitmen_raw, komitmen_os)
-                else:
-                    komitmen_value = None
             else:
                 # For other metrics: Use raw komitmen value
-                komitmen_value = get_komitmen_value(komitmen_data, kode_kanca_str, komitmen_segment, komitmen_metric)
-        
-        # Calculate komitmen % Achievement and Gap
-        # % Ach Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
-        # Gap Formula: E - Komitmen (positive = surplus, negative = shortfall)
-        # NOTE: E_val dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
-        # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
-        komitmen_pct_ach = None
-        komitmen_gab_real = None
-        if komitmen_value is not None and komitmen_value != 0:
-            # For percentage metrics (dpk_pct, npl_pct), E_val is already a percentage
-            # For other metrics, E_val is in RUPIAH PENUH, need conversion to millions
-            if metric_field in ['dpk_pct', 'npl_pct']:
-                E_value = E_val  # Already a percentage
-            else:
-                E_value = E_val / Decimal('1000000')  # Convert to millions
-            
-            # For DPK/NPL and %DPK/%NPL pages: Use reversed formula (Komitmen / E) Ã— 100
-            if metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct']:
-                if E_value != 0:
-                    ratio = komitmen_value / E_value  # REVERSED: Komitmen / E
-                else:
-                    ratio = Decimal('11')  # Will result in 110% cap
-            else:
-                # For OS and other metrics: Normal formula (E / Komitmen)
-                ratio = E_value / komitmen_value
-            
-            if ratio > Decimal('1.1'):
-                komitmen_pct_ach = Decimal('110')
-            elif ratio < 0:
-                komitmen_pct_ach = Decimal('0')
-            else:
-                komitmen_pct_ach = ratio * Decimal('100')
-            
-            # Gap = E - Komitmen (both in same unit)
-            # Positive = surplus (realisasi > komitmen) â†’ hitam (for DPK/NPL reversed to red)
-            # Negative = shortfall (realisasi < komitmen) â†’ merah (for DPK/NPL reversed to black)
-            komitmen_gab_real = E_value - komitmen_value
-        
-        # Build row
-        kanca_name = KANCA_MASTER.get(kode_kanca, f"KANCA {kode_kanca}")
-        row = {
-            'no': idx,
-            'kode_kanca': kode_kanca,
-            'kanca': kanca_name,
-            'kode_uker': kode_kanca,  # For KANCA ONLY, kode_uker = kode_kanca
-            'uker': kanca_name,        # For KANCA ONLY, uker name = kanca name
-            'A': A_val,
-            'B': B_val,
-            'C': C_val,
-            'D': D_val,
-            'E': E_val,
-            'DtD': changes['DtD'],
-            'DtD_pct': changes['DtD_pct'],
-            'MoM': changes['MoM'],
-            'MoM_pct': changes['MoM_pct'],
-            'MtD': changes['MtD'],
-            'MtD_pct': changes['MtD_pct'],
-            'YtD': changes['YtD'],
-            'YtD_pct': changes['YtD_pct'],
-            # Komitmen value
-            'komitmen': komitmen_value,
-            'komitmen_pct_ach': komitmen_pct_ach,
-            'komitmen_gab_real': komitmen_gab_real,
-        }
-        rows.append(row)
-        
-        # Add to totals
-        totals['A'] += A_val
-        totals['B'] += B_val
-        totals['C'] += C_val
-        totals['D'] += D_val
-        totals['E'] += E_val
-    
-    # Calculate totals changes
+                komitmen_value = komitmen_data.uker_value(kode_kanca_str, komitmen_segment, komitmen_metric)
+        komitmen_values.append(komitmen_value)
+    
+    # Calculate totals
     # For percentage metrics, recalculate from raw data instead of summing percentages
-    if metric_field in ['dpk_pct', 'npl_pct']:
-        # Determine which raw metrics to use
-        if metric_field == 'dpk_pct':
-            metric_raw = 'sml'
-            base_raw = 'os'
-            metric_filter = '2'   # DPK uses kol_adk='2'
-            base_filter = None    # OS uses all kol_adk
-        elif metric_field == 'npl_pct':
-            metric_raw = 'npl'
-            base_raw = 'os'
-            metric_filter = None
-            base_filter = None
-        
+    # For other metrics, totals = jumlah kolom dari array yang sama
+    totals = None
+    if is_percentage:
         # Recalculate totals for each date from raw data
-        totals_recalc = {}
-        for col_name, col_info in date_columns.items():
+        # (metric_raw: DPK = sml WHERE kol_adk='2' / NPL, base: OS all kol_adk)
+        kanca_codes = hierarchy.kanca_code_strs
+        totals = {}
+        for col_name in date_columns:
             # Get metric sum (DPK or NPL) - only KANCA codes
-            metric_data = get_metric_by_uker(col_info['date'], segment_filter, metric_raw, metric_filter)
-            metric_sum = sum(v for k, v in metric_data.items() if str(k) in [str(kc) for kc in KANCA_CODES])
+            metric_data = uker_data[col_name]['metric_raw']
+            metric_sum = sum(v for k, v in metric_data.items() if k in kanca_codes)
             
             # Get OS sum - only KANCA codes, all kol_adk
-            os_data = get_metric_by_uker(col_info['date'], segment_filter, base_raw, base_filter)
-            os_sum = sum(v for k, v in os_data.items() if str(k) in [str(kc) for kc in KANCA_CODES])
+            os_data = uker_data[col_name]['base']
+            os_sum = sum(v for k, v in os_data.items() if k in kanca_codes)
             
             # Calculate percentage
-            totals_recalc[col_name] = calculate_percentage_metric(metric_sum, os_sum)
-        
-        # Replace totals with recalculated values
-        totals['A'] = totals_recalc['A']
-        totals['B'] = totals_recalc['B']
-        totals['C'] = totals_recalc['C']
-        totals['D'] = totals_recalc['D']
-        totals['E'] = totals_recalc['E']
-    
-    totals_changes = calculate_changes(
-        totals['A'], totals['B'], totals['C'], totals['D'], totals['E']
+            totals[col_name] = calculate_percentage_metric(metric_sum, os_sum)
+    
+    # DtD/MoM/MtD/YtD untuk semua baris + total dalam satu pass vektor
+    row_changes, totals = calculate_changes_batch(
+        values, totals, scale=None if is_percentage else VALUE_SCALE
+    )
+    
+    # Calculate komitmen % Achievement and Gap
+    # % Ach Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
+    # Gap Formula: E - Komitmen (positive = surplus, negative = shortfall)
+    # NOTE: E_val dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
+    # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
+    komitmen_pct_ach_values, komitmen_gab_real_values = calculate_komitmen_batch(
+        values['E'],
+        komitmen_values,
+        reverse=metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct'],
+        in_millions=not is_percentage,
     )
-    totals.update(totals_changes)
+    
+    for idx, kode_kanca in enumerate(hierarchy.kanca_codes, start=1):
+        position = idx - 1
+        kanca_name = hierarchy.kanca_names.get(kode_kanca, f"KANCA {kode_kanca}")
+        rows.append({
+            'no': idx,
+            'kode_kanca': kode_kanca,
+            'kanca': kanca_name,
+            'kode_uker': kode_kanca,  # For KANCA ONLY, kode_uker = kode_kanca
+            'uker': kanca_name,        # For KANCA ONLY, uker name = kanca name
+            'A': values['A'][position],
+            'B': values['B'][position],
+            'C': values['C'][position],
+            'D': values['D'][position],
+            'E': values['E'][position],
+            **row_changes[position],
+            # Komitmen value
+            'komitmen': komitmen_values[position],
+            'komitmen_pct_ach': komitmen_pct_ach_values[position],
+            'komitmen_gab_real': komitmen_gab_real_values[position],
+        })
     
     # Calculate komitmen total
     komitmen_total = None
@@ -951,20 +921,20 @@ def build_kanca_only_table(date_columns, segment_filter='SMALL', metric_field='o
         # SPECIAL CASE for %DPK/%NPL: Calculate komitmen total as percentage
         if metric_field in ['dpk_pct', 'npl_pct']:
             # Get all uker codes from rows (KANCA codes only)
-            # Convert to string because komitmen_dict keys are strings (kode_uker is CharField)
+            # Convert to string because snapshot kode_uker keys are strings (kode_uker is CharField)
             uker_codes = [str(row['kode_uker']) for row in rows]
             
             # Sum raw komitmen for numerator (DPK or NPL)
             komitmen_raw_sum = Decimal('0')
             for kode_uker in uker_codes:
-                komitmen_raw = get_komitmen_value(komitmen_data, kode_uker, komitmen_segment, komitmen_metric)
+                komitmen_raw = komitmen_data.uker_value(kode_uker, komitmen_segment, komitmen_metric)
                 if komitmen_raw:
                     komitmen_raw_sum += komitmen_raw
             
             # Sum komitmen OS for denominator
             komitmen_os_sum = Decimal('0')
             for kode_uker in uker_codes:
-                komitmen_os = get_komitmen_value(komitmen_data, kode_uker, komitmen_segment, 'os')
+                komitmen_os = komitmen_data.uker_value(kode_uker, komitmen_segment, 'os')
                 if komitmen_os:
                     komitmen_os_sum += komitmen_os
             
@@ -1026,16 +996,21 @@ def build_kanca_only_table(date_columns, segment_filter='SMALL', metric_field='o
     }
 
 
-def build_kcp_only_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None):
+def build_kcp_only_table(date_columns, segment_filter='SMALL', metric_field='os', kol_adk_filter=None, uker_data=None):
     """
     Build KCP ONLY table (only KCPs, sorted by parent KANCA).
     Groups KCP codes under their parent KANCA for better organization.
     
     Args:
         kol_adk_filter: Optional filter for kol_adk field (e.g., '2' for DPK)
+        uker_data: Optional hasil fetch_metric_by_uker (dibagi dengan tabel lain di halaman yang sama)
     """
     rows = []
     
+    if uker_data is None:
+        uker_data = fetch_metric_by_uker(date_columns, segment_filter, metric_field, kol_adk_filter)
+    hierarchy = get_uker_hierarchy()
+    
     # Get selected date for komitmen lookup (date E)
     selected_date = date_columns['E']['date']
     year = selected_date.year
@@ -1046,197 +1021,118 @@ def build_kcp_only_table(date_columns, segment_filter='SMALL', metric_field='os'
     komitmen_data = None
     
     if komitmen_segment and komitmen_metric:
-        # Check if komitmen exists for this month
-        if check_komitmen_exists(year, month):
-            komitmen_data = get_komitmen_for_month(year, month)  # Per uker data
-    
-    # Initialize totals
-    totals = {
-        'A': 0, 'B': 0, 'C': 0, 'D': 0, 'E': 0,
-        'DtD': 0, 'MoM': 0, 'MtD': 0, 'YtD': 0,
-        'DtD_pct': 0, 'MoM_pct': 0, 'MtD_pct': 0, 'YtD_pct': 0
-    }
+        # Snapshot kosong (tidak ada komitmen bulan ini) -> None
+        komitmen_data = get_komitmen_snapshot(year, month) or None
     
-    # Get all KCP codes from UKER_MASTER, sorted by parent KANCA
+    is_percentage = metric_field in ['dpk_pct', 'npl_pct']
+    
+    # Get all KCP codes from the hierarchy index, sorted by parent KANCA
     kcp_list = []
-    for kode_kanca in KANCA_CODES:
-        # Get KCP list for this KANCA using helper function
-        kcp_data = get_kcp_by_kanca(kode_kanca)
-        for kcp_code, kcp_name in kcp_data:
+    for kode_kanca in hierarchy.kanca_codes:
+        for kcp_code, kcp_name in hierarchy.kcp_by_kanca[kode_kanca]:
             kcp_list.append({
                 'kode_kanca': kode_kanca,
                 'kcp_code': kcp_code,
                 'kcp_name': kcp_name,  # Store KCP name
-                'kanca_name': KANCA_MASTER.get(kode_kanca, f"KANCA {kode_kanca}")
+                'kanca_name': hierarchy.kanca_names.get(kode_kanca, f"KANCA {kode_kanca}")
             })
     
     # Sort by parent KANCA code, then by KCP code (both are integers now)
     kcp_list.sort(key=lambda x: (x['kode_kanca'], x['kcp_code']))
     
-    # Pre-fetch all metrics for all dates (optimization)
-    # This avoids calling get_metric_by_uker() inside the loop
+    # Metrics for all dates from the single grouped query (fetch_metric_by_uker)
     metrics_by_date = {}
-    for col_name, col_info in date_columns.items():
-        metrics_by_date[col_name] = get_metric_by_uker(
-            col_info['date'],
-            segment_filter,
-            metric_field,
-            kol_adk_filter
-        )
+    for col_name in date_columns:
+        metrics_by_date[col_name] = get_metric_values(metric_field, uker_data[col_name])
     
-    # Build rows for each KCP
-    for idx, kcp_info in enumerate(kcp_list, start=1):
-        kcp_code = kcp_info['kcp_code']
+    values = {col_name: [] for col_name in date_columns}
+    komitmen_values = []
+    for kcp_info in kcp_list:
         # Convert kcp_code to string because kode_uker in database is CharField
-        kcp_code_str = str(kcp_code)
+        kcp_code_str = str(kcp_info['kcp_code'])
         
         # Get metrics for each date column from pre-fetched data
-        A_val = metrics_by_date['A'].get(kcp_code_str, 0)
-        B_val = metrics_by_date['B'].get(kcp_code_str, 0)
-        C_val = metrics_by_date['C'].get(kcp_code_str, 0)
-        D_val = metrics_by_date['D'].get(kcp_code_str, 0)
-        E_val = metrics_by_date['E'].get(kcp_code_str, 0)
-        
-        # Calculate changes
-        changes = calculate_changes(A_val, B_val, C_val, D_val, E_val)
+        for col_name in date_columns:
+            values[col_name].append(metrics_by_date[col_name].get(kcp_code_str, 0))
         
         # Get komitmen value untuk KCP ini
         komitmen_value = None
         if komitmen_data and komitmen_segment and komitmen_metric:
             # SPECIAL CASE for %DPK/%NPL: Calculate komitmen as percentage
-            if metric_field in ['dpk_pct', 'npl_pct']:
+            if is_percentage:
                 # Get raw komitmen for numerator (DPK or NPL)
-                komitmen_raw = get_komitmen_value(komitmen_data, kcp_code_str, komitmen_segment, komitmen_metric)
+                komitmen_raw = komitmen_data.uker_value(kcp_code_str, komitmen_segment, komitmen_metric)
                 # Get komitmen OS for denominator
-                komitmen_os = get_komitmen_value(komitmen_data, kcp_code_str, komitmen_segment, 'os')
+                komitmen_os = komitmen_data.uker_value(kcp_code_str, komitmen_segment, 'os')
                 
                 # Calculate percentage: (DPK/NPL / OS) Ã— 100
                 if komitmen_raw is not None and komitmen_os is not None and komitmen_os != 0:
                     komitmen_value = calculate_percentage_metric(komitmen_raw, komitmen_os)
-                else:
-                    komitmen_value = None
             else:
                 # For other metrics: Use raw komitmen value
-                komitmen_value = get_komitmen_value(komitmen_data, kcp_code_str, komitmen_segment, komitmen_metric)
-        
-        # Calculate komitmen % Achievement and Gap
-        # Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
-        # NOTE: E_val dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
-        # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
-        komitmen_pct_ach = None
-        komitmen_gab_real = None
-        if komitmen_value is not None and komitmen_value != 0:
-            # For percentage metrics (dpk_pct, npl_pct), E_val is already a percentage
-            # For other metrics, E_val is in RUPIAH PENUH, need conversion to millions
-            if metric_field in ['dpk_pct', 'npl_pct']:
-                E_value = E_val  # Already a percentage
-            else:
-                E_value = E_val / Decimal('1000000')  # Convert to millions
-            
-            # For DPK/NPL and %DPK/%NPL pages: Use reversed formula (Komitmen / E) Ã— 100
-            if metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct']:
-                if E_value != 0:
-                    ratio = komitmen_value / E_value  # REVERSED: Komitmen / E
-                else:
-                    ratio = Decimal('11')  # Will result in 110% cap
-            else:
-                # For OS and other metrics: Normal formula (E / Komitmen)
-                ratio = E_value / komitmen_value
-            
-            if ratio > Decimal('1.1'):
-                komitmen_pct_ach = Decimal('110')
-            elif ratio < 0:
-                komitmen_pct_ach = Decimal('0')
-            else:
-                komitmen_pct_ach = ratio * Decimal('100')
-            
-            # Gap = E - Komitmen (both in same unit)
-            # Positive gap = surplus (realisasi > komitmen) â†’ hitam (for DPK/NPL reversed to red)
-            # Negative gap = shortfall (realisasi < komitmen) â†’ merah (for DPK/NPL reversed to black)
-            komitmen_gab_real = E_value - komitmen_value
-        elif komitmen_value == 0 or komitmen_value is None:
-            # IFERROR: jika error (pembagi nol), anggap 110%
-            komitmen_pct_ach = Decimal('110')
-            if metric_field in ['dpk_pct', 'npl_pct']:
-                E_value = E_val
-            else:
-                E_value = E_val / Decimal('1000000')
-            komitmen_gab_real = E_value  # Gap = realisasi (karena tidak ada target)
-        
-        # Build row
-        row = {
-            'no': idx,
-            'kode_kanca': kcp_info['kode_kanca'],
-            'kanca': f"{kcp_info['kanca_name']} - KCP {kcp_code}",
-            'kode_uker': kcp_code,           # KCP code as kode_uker
-            'uker': kcp_info['kcp_name'],    # KCP name as uker
-            'A': A_val,
-            'B': B_val,
-            'C': C_val,
-            'D': D_val,
-            'E': E_val,
-            'DtD': changes['DtD'],
-            'DtD_pct': changes['DtD_pct'],
-            'MoM': changes['MoM'],
-            'MoM_pct': changes['MoM_pct'],
-            'MtD': changes['MtD'],
-            'MtD_pct': changes['MtD_pct'],
-            'YtD': changes['YtD'],
-            'YtD_pct': changes['YtD_pct'],
-            # Komitmen value
-            'komitmen': komitmen_value,
-            'komitmen_pct_ach': komitmen_pct_ach,
-            'komitmen_gab_real': komitmen_gab_real,
-        }
-        rows.append(row)
-        
-        # Add to totals
-        totals['A'] += A_val
-        totals['B'] += B_val
-        totals['C'] += C_val
-        totals['D'] += D_val
-        totals['E'] += E_val
-    
-    # Calculate totals changes
+                komitmen_value = komitmen_data.uker_value(kcp_code_str, komitmen_segment, komitmen_metric)
+        komitmen_values.append(komitmen_value)
+    
+    # Calculate totals
     # For percentage metrics, recalculate from raw data instead of summing percentages
-    if metric_field in ['dpk_pct', 'npl_pct']:
-        # Determine which raw metrics to use
-        if metric_field == 'dpk_pct':
-            metric_raw = 'sml'
-            base_raw = 'os'
-            metric_filter = '2'   # DPK uses kol_adk='2'
-            base_filter = None    # OS uses all kol_adk
-        elif metric_field == 'npl_pct':
-            metric_raw = 'npl'
-            base_raw = 'os'
-            metric_filter = None
-            base_filter = None
-        
+    # For other metrics, totals = jumlah kolom dari array yang sama
+    totals = None
+    if is_percentage:
         # Recalculate totals for each date from raw data
-        totals_recalc = {}
-        for col_name, col_info in date_columns.items():
+        # (metric_raw: DPK = sml WHERE kol_adk='2' / NPL, base: OS all kol_adk)
+        kcp_codes = hierarchy.kcp_code_strs
+        totals = {}
+        for col_name in date_columns:
             # Get metric sum (DPK or NPL) - only KCP codes
-            metric_data = get_metric_by_uker(col_info['date'], segment_filter, metric_raw, metric_filter)
-            metric_sum = sum(v for k, v in metric_data.items() if str(k) in [str(kcp) for kcp in KCP_CODES])
+            metric_data = uker_data[col_name]['metric_raw']
+            metric_sum = sum(v for k, v in metric_data.items() if k in kcp_codes)
             
             # Get OS sum - only KCP codes, all kol_adk
-            os_data = get_metric_by_uker(col_info['date'], segment_filter, base_raw, base_filter)
-            os_sum = sum(v for k, v in os_data.items() if str(k) in [str(kcp) for kcp in KCP_CODES])
+            os_data = uker_data[col_name]['base']
+            os_sum = sum(v for k, v in os_data.items() if k in kcp_codes)
             
             # Calculate percentage
-            totals_recalc[col_name] = calculate_percentage_metric(metric_sum, os_sum)
-        
-        # Replace totals with recalculated values
-        totals['A'] = totals_recalc['A']
-        totals['B'] = totals_recalc['B']
-        totals['C'] = totals_recalc['C']
-        totals['D'] = totals_recalc['D']
-        totals['E'] = totals_recalc['E']
-    
-    totals_changes = calculate_changes(
-        totals['A'], totals['B'], totals['C'], totals['D'], totals['E']
+            totals[col_name] = calculate_percentage_metric(metric_sum, os_sum)
+    
+    # DtD/MoM/MtD/YtD untuk semua KCP + total dalam satu pass vektor
+    row_changes, totals = calculate_changes_batch(
+        values, totals, scale=None if is_percentage else VALUE_SCALE
     )
-    totals.update(totals_changes)
+    
+    # Calculate komitmen % Achievement and Gap
+    # Formula: =IFERROR(IF((E/Komitmen)>1.1,110%,IF((E/Komitmen)<0,0%,(E/Komitmen))),110%)
+    # NOTE: E_val dari database dalam RUPIAH PENUH, komitmen dalam RIBUAN (juta rupiah)
+    # SPECIAL CASE for DPK/NPL/DPK_PCT/NPL_PCT: Reversed formula (Komitmen / E) instead of (E / Komitmen)
+    # KCP tanpa komitmen: IFERROR -> 110%, Gap = realisasi (karena tidak ada target)
+    komitmen_pct_ach_values, komitmen_gab_real_values = calculate_komitmen_batch(
+        values['E'],
+        komitmen_values,
+        reverse=metric_field in ['dpk', 'npl', 'dpk_pct', 'npl_pct'],
+        in_millions=not is_percentage,
+        missing_as_iferror=True,
+    )
+    
+    # Build rows for each KCP
+    for idx, kcp_info in enumerate(kcp_list, start=1):
+        position = idx - 1
+        kcp_code = kcp_info['kcp_code']
+        rows.append({
+            'no': idx,
+            'kode_kanca': kcp_info['kode_kanca'],
+            'kanca': f"{kcp_info['kanca_name']} - KCP {kcp_code}",
+            'kode_uker': kcp_code,           # KCP code as kode_uker
+            'uker': kcp_info['kcp_name'],    # KCP name as uker
+            'A': values['A'][position],
+            'B': values['B'][position],
+            'C': values['C'][position],
+            'D': values['D'][position],
+            'E': values['E'][position],
+            **row_changes[position],
+            # Komitmen value
+            'komitmen': komitmen_values[position],
+            'komitmen_pct_ach': komitmen_pct_ach_values[position],
+            'komitmen_gab_real': komitmen_gab_real_values[position],
+        })
     
     # Calculate komitmen total
     komitmen_total = None
@@ -1247,20 +1143,20 @@ def build_kcp_only_table(date_columns, segment_filter='SMALL', metric_field='os'
         # SPECIAL CASE for %DPK/%NPL: Calculate komitmen total as percentage
         if metric_field in ['dpk_pct', 'npl_pct']:
             # Get all uker codes from rows (KCP codes only)
-            # Convert to string because komitmen_dict keys are strings (kode_uker is CharField)
+            # Convert to string because snapshot kode_uker keys are strings (kode_uker is CharField)
             uker_codes = [str(row['kode_uker']) for row in rows]
             
             # Sum raw komitmen for numerator (DPK or NPL)
             komitmen_raw_sum = Decimal('0')
             for kode_uker in uker_codes:
-                komitmen_raw = get_komitmen_value(komitmen_data, kode_uker, komitmen_segment, komitmen_metric)
+                komitmen_raw = komitmen_data.uker_value(kode_uker, komitmen_segment, komitmen_metric)
                 if komitmen_raw:
                     komitmen_raw_sum += komitmen_raw
             
             # Sum komitmen OS for denominator
             komitmen_os_sum = Decimal('0')
             for kode_uker in uker_codes:
-                komitmen_os = get_komitmen_value(komitmen_data, kode_uker, komitmen_segment, 'os')
+                komitmen_os = komitmen_data.uker_value(kode_uker, komitmen_segment, 'os')
                 if komitmen_os:
                     komitmen_os_sum += komitmen_os
             
@@ -1341,14 +1237,57 @@ def build_metric_tables(selected_date, segment_filter='SMALL', metric_field='os'
     """
     date_columns = get_date_columns(selected_date)
     
+    # KONSOL: roll-up per KANCA di database; KANCA ONLY / KCP ONLY: satu grouped query per (tanggal, kode_uker)
+    kanca_data = fetch_metric_by_kanca(date_columns, segment_filter, metric_field, kol_adk_filter)
+    uker_data = fetch_metric_by_uker(date_columns, segment_filter, metric_field, kol_adk_filter)
+    
     return {
-        'konsol': build_konsol_table(date_columns, segment_filter, metric_field, kol_adk_filter),
-        'kanca': build_kanca_only_table(date_columns, segment_filter, metric_field, kol_adk_filter),
-        'kcp': build_kcp_only_table(date_columns, segment_filter, metric_field, kol_adk_filter),
+        'konsol': build_konsol_table(date_columns, segment_filter, metric_field, kol_adk_filter, kanca_data),
+        'kanca': build_kanca_only_table(date_columns, segment_filter, metric_field, kol_adk_filter, uker_data),
+        'kcp': build_kcp_only_table(date_columns, segment_filter, metric_field, kol_adk_filter, uker_data),
         'date_columns': date_columns,
     }
 
 
+def get_summary_uker_codes(kode_kanca_filter):
+    """Kode uker (string) milik satu KANCA: KANCA itu sendiri + semua KCP di bawahnya."""
+    return list(get_uker_hierarchy().uker_codes_by_kanca.get(kode_kanca_filter, ()))
+
+
+@request_memoized
+def get_summary_grid(date_columns, kode_kanca_filter=None):
+    """
+    Grid untuk PERFORMANCE HIGHLIGHTS: satu grouped query untuk semua kolom tanggal,
+    SUM(os) dan SUM(nasabah) per periode_date x segment x kol_adk x flag_restruk x dub_nasabah.
+    
+    Args:
+        kode_kanca_filter: Optional KANCA code (None = RO BANDUNG/all)
+    
+    Returns:
+        dict: {date: [sel grid (dict dengan segment, kol_adk, flag_restruk, dub_nasabah,
+                                  total_os, total_nasabah)]}
+    """
+    dates = {col_info['date'] for col_info in date_columns.values()}
+    qs = LW321DailyAggregate.objects.filter(periode_date__in=list(dates))
+    
+    # Apply kanca filter once (filter by kode_uker of the KANCA and its KCPs)
+    if kode_kanca_filter:
+        uker_codes_for_kanca = get_summary_uker_codes(kode_kanca_filter)
+        if uker_codes_for_kanca:
+            qs = qs.filter(kode_uker__in=uker_codes_for_kanca)
+    
+    grid = {value: [] for value in dates}
+    cells = qs.values(
+        'periode_date', 'segment', 'kol_adk', 'flag_restruk', 'dub_nasabah'
+    ).annotate(
+        total_os=Sum('os'),
+        total_nasabah=Sum('nasabah'),
+    ).order_by()
+    for cell in cells:
+        grid[cell['periode_date']].append(cell)
+    return grid
+
+
 def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
     """
     Build PERFORMANCE HIGHLIGHTS SME KONSOL summary table
@@ -1372,36 +1311,21 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
     Returns:
         list: Rows containing all segment data with calculations
     """
-    from dashboard.models import LW321
-    from django.db.models import Sum, Count, Q
-    from dashboard.formulas.komitmen_helper import (
-        get_komitmen_for_month, 
-        get_komitmen_for_kanca_list,
-        get_komitmen_value,
-        aggregate_komitmen_regional
-    )
-    from dashboard.formulas.uker_mapping import KANCA_CODES
+    from functools import partial
     
     rows = []
     
-    # Get komitmen data for the selected month
-    # Use KANCA-level aggregation for better performance
+    # Snapshot komitmen bulan tanggal E (sum KANCA dan regional sudah dihitung di snapshot)
+    komitmen_snapshot = get_komitmen_snapshot(
+        date_columns['E']['date'].year,
+        date_columns['E']['date'].month
+    )
     if kode_kanca_filter:
-        # Single KANCA - get KANCA level data
-        komitmen_kanca_dict = get_komitmen_for_kanca_list(
-            date_columns['E']['date'].year,
-            date_columns['E']['date'].month
-        )
-        komitmen_dict = {kode_kanca_filter: komitmen_kanca_dict.get(kode_kanca_filter, {})}
+        # Single KANCA - KANCA level data
+        komitmen_lookup = partial(komitmen_snapshot.kanca_value, kode_kanca_filter)
     else:
-        # RO BANDUNG (ALL) - aggregate all KANCAs
-        komitmen_kanca_dict = get_komitmen_for_kanca_list(
-            date_columns['E']['date'].year,
-            date_columns['E']['date'].month
-        )
-        # Aggregate all KANCAs into one "RO_BANDUNG" entry
-        regional_komitmen = aggregate_komitmen_regional(komitmen_kanca_dict, list(KANCA_CODES))
-        komitmen_dict = {'RO_BANDUNG': regional_komitmen}
+        # RO BANDUNG (ALL) - agregat semua KANCA
+        komitmen_lookup = komitmen_snapshot.regional_value
     
     # Define segment structure
     segments_config = [
@@ -1527,59 +1451,44 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
         },
     ]
     
-    def get_data_for_segment(date, segment_filter, kol_filter=None, metric='os', flag_restruk_filter=None):
-        """Get data for a specific segment and date"""
-        from dashboard.formulas.segmentation import get_segment_annotation
-        from dashboard.formulas.uker_mapping import UKER_MASTER, KANCA_CODES
-        from django.db.models import Q
-        
-        periode_str = date.strftime("%d/%m/%Y")
-        qs = LW321.objects.filter(periode=periode_str)
-        
-        # Add segment annotation
-        qs = qs.annotate(segment=get_segment_annotation())
-        
-        # Apply kanca filter if specified
-        if kode_kanca_filter:
-            # Get all uker codes that belong to this kanca
-            uker_codes_for_kanca = []
-            
-            # Check if this kode_kanca is a KANCA itself
-            if kode_kanca_filter in KANCA_CODES:
-                uker_codes_for_kanca.append(str(kode_kanca_filter))
-            
-            # Get all KCP under this KANCA
-            for kode_uker, (nama_uker, kode_kanca_induk) in UKER_MASTER.items():
-                if kode_kanca_induk == kode_kanca_filter:
-                    uker_codes_for_kanca.append(str(kode_uker))
-            
-            # Filter by kode_uker
-            if uker_codes_for_kanca:
-                qs = qs.filter(kode_uker__in=uker_codes_for_kanca)
-        
-        # Apply segment filter
-        if isinstance(segment_filter, list):
-            qs = qs.filter(segment__in=segment_filter)
-        else:
-            qs = qs.filter(segment=segment_filter)
-        
-        # Apply kol filter if specified (using kol_adk field)
+    # Grid per tanggal: SUM(os) dan SUM(nasabah) per segment x kol_adk x flag_restruk x dub_nasabah,
+    # diambil sekali untuk kelima kolom tanggal dengan filter uker diterapkan satu kali.
+    # Semua baris di segments_config lalu dihitung in-memory dari grid ini.
+    grid = get_summary_grid(date_columns, kode_kanca_filter)
+    grid_sums = {}
+    
+    def sum_grid(date, segment_filter, kol_filter, flag_restruk_filter, field):
+        """SUM field dari sel grid yang cocok dengan filter (di-cache per kombinasi filter)"""
+        segments = tuple(segment_filter) if isinstance(segment_filter, list) else (segment_filter,)
         if kol_filter:
-            if isinstance(kol_filter, list):
-                qs = qs.filter(kol_adk__in=kol_filter)
-            else:
-                qs = qs.filter(kol_adk=kol_filter)
-        
-        # Apply flag_restruk filter for LR metric
-        if flag_restruk_filter:
-            qs = qs.filter(flag_restruk=flag_restruk_filter)
+            kols = tuple(kol_filter) if isinstance(kol_filter, list) else (kol_filter,)
+        else:
+            kols = None
+        key = (date, segments, kols, flag_restruk_filter, field)
+        if key in grid_sums:
+            return grid_sums[key]
         
+        total = Decimal('0')
+        for cell in grid.get(date, []):
+            if cell['segment'] not in segments:
+                continue
+            if kols is not None and cell['kol_adk'] not in kols:
+                continue
+            if flag_restruk_filter and cell['flag_restruk'] != flag_restruk_filter:
+                continue
+            if field == 'total_nasabah' and (cell['dub_nasabah'] or '').upper() != 'TRUE':
+                # NASABAH hanya dihitung WHERE dub_nasabah='TRUE' (case-insensitive)
+                continue
+            total += cell[field]
+        grid_sums[key] = total
+        return total
+    
+    def get_data_for_segment(date, segment_filter, kol_filter=None, metric='os', flag_restruk_filter=None):
+        """Get data for a specific segment and date (dari grid, tanpa query)"""
         # Get the appropriate metric
         if metric == 'nasabah':
             # Sum nasabah field WHERE dub_nasabah='TRUE'
-            qs = qs.filter(Q(dub_nasabah__iexact='TRUE'))
-            result = qs.aggregate(total=Sum('nasabah'))
-            return float(result['total'] or 0)
+            return float(sum_grid(date, segment_filter, kol_filter, flag_restruk_filter, 'total_nasabah'))
         elif metric == 'lar':
             # LAR = SML + NPL + LR
             # SML = kol_adk='2'
@@ -1589,16 +1498,9 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
             npl = get_data_for_segment(date, segment_filter, kol_filter=['3', '4', '5'], metric='os')
             lr = get_data_for_segment(date, segment_filter, kol_filter='1', metric='os', flag_restruk_filter='Y')
             return sml + npl + lr
-        elif metric in ['kol2', 'npl', 'lr']:
-            # These are absolute metrics but use OS aggregation
-            # Just treat them as 'os' for data retrieval
-            result = qs.aggregate(total=Sum('os'))
-            value = float(result['total'] or 0)
-            # Convert from rupiah penuh to millions
-            return value / 1_000_000
         else:
-            result = qs.aggregate(total=Sum('os'))
-            value = float(result['total'] or 0)
+            # os, kol2, npl, lr: absolute metrics yang memakai agregasi OS
+            value = float(sum_grid(date, segment_filter, kol_filter, flag_restruk_filter, 'total_os'))
             # Convert from rupiah penuh to millions
             return value / 1_000_000
     
@@ -1693,12 +1595,6 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
                 'KUR': ['kur'],
             }
             
-            # Get komitmen identifier (kanca code or RO_BANDUNG)
-            if kode_kanca_filter:
-                komitmen_identifier = kode_kanca_filter
-            else:
-                komitmen_identifier = 'RO_BANDUNG'
-            
             # Get komitmen segments to aggregate
             if isinstance(segment_filter, list):
                 # Multiple segments (e.g., Small + KUR)
@@ -1719,9 +1615,7 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
             komitmen_in_millions = 0  # Initialize
             komitmen_gab_real = 0  # Initialize
             
-            if komitmen_segments and komitmen_identifier in komitmen_dict:
-                kanca_data = komitmen_dict[komitmen_identifier]
-                
+            if komitmen_segments:
                 # Map metric to komitmen field
                 # User clarification:
                 # - BD KOL 2 → DPK field (not PL)
@@ -1743,15 +1637,17 @@ def build_summary_konsol_table(date_columns, kode_kanca_filter=None):
                     komitmen_field = 'os'
                 
                 # Aggregate across segments
-                for seg in komitmen_segments:
-                    if seg in kanca_data and komitmen_field:
-                        value = kanca_data[seg].get(komitmen_field, 0)
+                # Gabungan yang umum (Small = NCC + CC, Small + KUR) sudah dihitung di snapshot
+                combined_segment = komitmen_snapshot.segment_key(komitmen_segments)
+                for seg in ([combined_segment] if combined_segment else komitmen_segments):
+                    if komitmen_field:
+                        value = komitmen_lookup(seg, komitmen_field)
                         if value:
                             komitmen_value += value
                         
                         # For percentage metrics, also get OS for calculation
                         if metric in ['kol2_pct', 'npl_pct', 'lr_pct', 'lar_pct']:
-                            os_value = kanca_data[seg].get('os', 0)
+                            os_value = komitmen_lookup(seg, 'os')
                             if os_value:
                                 komitmen_os_value += os_value
             
@@ -170,14 +170,8 @@ def get_os_for_date(queryset, target_date: date, group_by_kanca: bool = False) -
     Returns:
         Dictionary with OS values
     """
-    from .calculations import annotate_metrics
-    from .segmentation import get_segment_annotation
-    
-    # Convert date to periode format (DD/MM/YYYY)
-    periode_str = date_to_periode_str(target_date)
-    
-    # Filter by exact periode
-    qs = queryset.filter(periode=periode_str)
+    # Filter by exact periode (kolom DATE periode_date)
+    qs = queryset.filter(periode_date=target_date)
     
     if group_by_kanca:
         # Group by kanca and sum OS
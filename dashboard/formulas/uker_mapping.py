@@ -15,8 +15,17 @@ Cara Identifikasi:
 - Nama KCP dimulai dengan "KCP "
 """
 
+import logging
+import time
 from typing import Dict, List, Tuple, Optional
 
+from django.conf import settings
+from django.db import DatabaseError
+
+from .memo import request_memoized
+
+logger = logging.getLogger(__name__)
+
 # ==================================================================================
 # MASTER DATA: KANCA (Kantor Cabang)
 # Format: KODE_KANCA: NAMA_KANCA
@@ -206,6 +215,185 @@ KCP_CODES: List[int] = [
     if kode_uker != kode_kanca and nama.upper().startswith("KCP")
 ]
 
+# ==================================================================================
+# INDEX HIERARKI
+# Lookup UKER -> KANCA, daftar UKER per KANCA, dan keanggotaan KANCA/KCP tanpa
+# scan UKER_MASTER atau membuat list baru per pemanggilan. UKER_HIERARCHY dibangun
+# sekali saat import dari dict di atas; get_uker_hierarchy() memakai tabel uker_master.
+# ==================================================================================
+
+class UkerHierarchy:
+    """
+    Index hierarki KANCA/UKER/KCP dari dict berformat KANCA_MASTER + UKER_MASTER.
+
+    Attributes:
+        version: penanda versi data sumber ('static' untuk dict di modul ini)
+        kanca_codes: tuple kode KANCA (urutan KANCA_MASTER)
+        kanca_names: {kode_kanca: nama}
+        uker_master: {kode_uker: (nama, kode_kanca induk)} seperti UKER_MASTER
+        kanca_code_set / kanca_code_strs: frozenset kode KANCA (int / string)
+        kcp_code_set / kcp_code_strs: frozenset kode KCP (int / string)
+        uker_code_strs: frozenset semua kode UKER (string)
+        kanca_by_uker: {kode_uker int: kode_kanca}
+        kanca_by_uker_str: {kode_uker string: kode_kanca} (key sama dengan kode_uker di database)
+        uker_codes_by_kanca: {kode_kanca: tuple kode UKER string (KANCA + semua UKER di bawahnya)}
+        kcp_by_kanca: {kode_kanca: tuple (kode_kcp, nama)} seperti get_kcp_by_kanca
+    """
+
+    def __init__(self, kanca_master: Dict[int, str], uker_master: Dict[int, Tuple[str, int]], version: str = 'static'):
+        self.version = version
+        self.kanca_codes: Tuple[int, ...] = tuple(kanca_master)
+        self.kanca_names: Dict[int, str] = dict(kanca_master)
+        self.uker_master: Dict[int, Tuple[str, int]] = dict(uker_master)
+        self.kanca_code_set = frozenset(self.kanca_codes)
+        self.kanca_code_strs = frozenset(str(code) for code in self.kanca_codes)
+
+        kcp_codes = [
+            kode_uker for kode_uker, (nama, kode_kanca) in uker_master.items()
+            if kode_uker != kode_kanca and nama.upper().startswith("KCP")
+        ]
+        self.kcp_code_set = frozenset(kcp_codes)
+        self.kcp_code_strs = frozenset(str(code) for code in kcp_codes)
+        self.uker_code_strs = frozenset(str(code) for code in uker_master)
+
+        # KANCA selalu menjadi induk dirinya sendiri (walau tercatat di bawah KANCA lain)
+        self.kanca_by_uker: Dict[int, int] = {
+            kode_uker: kode_kanca for kode_uker, (_, kode_kanca) in uker_master.items()
+        }
+        self.kanca_by_uker.update((code, code) for code in self.kanca_codes)
+        self.kanca_by_uker_str: Dict[str, int] = {
+            str(kode_uker): kode_kanca for kode_uker, kode_kanca in self.kanca_by_uker.items()
+        }
+
+        uker_codes_by_kanca: Dict[int, List[str]] = {}
+        kcp_by_kanca: Dict[int, List[Tuple[int, str]]] = {code: [] for code in self.kanca_codes}
+        for code in self.kanca_codes:
+            uker_codes_by_kanca[code] = [str(code)]
+        for kode_uker, (nama, induk) in uker_master.items():
+            codes = uker_codes_by_kanca.setdefault(induk, [])
+            if str(kode_uker) not in codes:
+                codes.append(str(kode_uker))
+            # Bukan KANCA itu sendiri dan bukan KANCA lain (kasus seperti 137)
+            if kode_uker != induk and kode_uker not in self.kanca_code_set:
+                kcp_by_kanca.setdefault(induk, []).append((kode_uker, nama))
+        self.uker_codes_by_kanca: Dict[int, Tuple[str, ...]] = {
+            code: tuple(codes) for code, codes in uker_codes_by_kanca.items()
+        }
+        self.kcp_by_kanca: Dict[int, Tuple[Tuple[int, str], ...]] = {
+            code: tuple(kcps) for code, kcps in kcp_by_kanca.items()
+        }
+
+    def kanca_of(self, kode_uker) -> Optional[int]:
+        """KODE_KANCA induk dari kode_uker (string dari database atau int), None jika tidak dikenal."""
+        kode_kanca = self.kanca_by_uker_str.get(kode_uker)
+        if kode_kanca is not None:
+            return kode_kanca
+        try:
+            return self.kanca_by_uker.get(int(kode_uker))
+        except (ValueError, TypeError):
+            return None
+
+    def sum_by_kanca(self, metric_by_uker) -> Dict[int, object]:
+        """Jumlahkan {kode_uker: nilai} ke KANCA induk dalam satu pass."""
+        lookup = self.kanca_by_uker_str
+        result = {}
+        for kode_uker, value in metric_by_uker.items():
+            kode_kanca = lookup.get(kode_uker)
+            if kode_kanca is None:
+                kode_kanca = self.kanca_of(kode_uker)
+                if kode_kanca is None:
+                    continue
+            if kode_kanca in result:
+                result[kode_kanca] += value
+            else:
+                result[kode_kanca] = value
+        return result
+
+    @classmethod
+    def from_rows(cls, rows, version: str) -> 'UkerHierarchy':
+        """
+        Bangun index dari baris uker_master (kode_uker, nama_uker, kode_kanca) yang sudah
+        diurutkan; KANCA = baris dengan kode_uker == kode_kanca.
+        """
+        kanca_master = {}
+        uker_master = {}
+        for kode_uker, nama_uker, kode_kanca in rows:
+            try:
+                kode_uker = int(kode_uker)
+            except (TypeError, ValueError):
+                logger.warning(f"Kode uker {kode_uker!r} di uker_master bukan angka, dilewati")
+                continue
+            uker_master[kode_uker] = (nama_uker, kode_kanca)
+            if kode_uker == kode_kanca:
+                kanca_master[kode_kanca] = nama_uker
+        return cls(kanca_master, uker_master, version)
+
+
+UKER_HIERARCHY = UkerHierarchy(KANCA_MASTER, UKER_MASTER)
+
+# ==================================================================================
+# SNAPSHOT DARI DATABASE (tabel uker_master)
+# Setiap proses menyimpan satu snapshot; versinya (jumlah baris + updated_at terakhir)
+# dicek ulang paling sering tiap UKER_MASTER_REFRESH_SECONDS, sehingga perubahan
+# hierarki lewat admin terbaca tanpa deploy / restart.
+# ==================================================================================
+
+_snapshot = {'hierarchy': None, 'checked_at': None}
+
+
+def _uker_master_version() -> Optional[str]:
+    from django.db.models import Count, Max
+    from ..models import UkerMaster
+
+    stats = UkerMaster.objects.aggregate(count=Count('kode_uker'), updated=Max('updated_at'))
+    if not stats['count']:
+        return None
+    return f"{stats['count']}:{stats['updated'].isoformat()}"
+
+
+def load_uker_hierarchy(version: str) -> UkerHierarchy:
+    """Baca seluruh tabel uker_master menjadi UkerHierarchy."""
+    from ..models import UkerMaster
+
+    rows = UkerMaster.objects.order_by('urutan', 'kode_kanca', 'kode_uker').values_list(
+        'kode_uker', 'nama_uker', 'kode_kanca'
+    )
+    return UkerHierarchy.from_rows(rows, version)
+
+
+@request_memoized
+def get_uker_hierarchy() -> UkerHierarchy:
+    """
+    Snapshot hierarki yang sedang berlaku (satu snapshot yang sama selama satu request).
+    Jatuh kembali ke UKER_HIERARCHY jika tabel uker_master kosong atau tidak bisa dibaca.
+    """
+    now = time.monotonic()
+    hierarchy = _snapshot['hierarchy']
+    refresh_seconds = getattr(settings, 'UKER_MASTER_REFRESH_SECONDS', 60)
+    if hierarchy is not None and now - _snapshot['checked_at'] < refresh_seconds:
+        return hierarchy
+
+    try:
+        version = _uker_master_version()
+        if version is None:
+            hierarchy = UKER_HIERARCHY
+        elif hierarchy is None or hierarchy.version != version:
+            hierarchy = load_uker_hierarchy(version)
+            logger.info(f"Snapshot uker_master dimuat (versi {version})")
+    except DatabaseError:
+        logger.exception("Gagal membaca uker_master, memakai hierarki terakhir")
+        hierarchy = hierarchy or UKER_HIERARCHY
+
+    _snapshot['hierarchy'] = hierarchy
+    _snapshot['checked_at'] = now
+    return hierarchy
+
+
+def reset_uker_hierarchy():
+    """Paksa snapshot dicek ulang pada pemanggilan berikutnya (setelah uker_master diubah)."""
+    _snapshot['checked_at'] = None
+    _snapshot['hierarchy'] = None
+
 # ==================================================================================
 # HELPER FUNCTIONS
 # ==================================================================================
@@ -215,7 +403,7 @@ def is_kanca(kode_uker: int) -> bool:
     Check if KODE_UKER is a KANCA (Kantor Cabang)
     KANCA jika KODE_UKER ada di KANCA_MASTER
     """
-    return kode_uker in KANCA_MASTER
+    return kode_uker in get_uker_hierarchy().kanca_code_set
 
 
 def is_kcp(kode_uker: int) -> bool:
@@ -223,18 +411,16 @@ def is_kcp(kode_uker: int) -> bool:
     Check if KODE_UKER is a KCP (Kantor Cabang Pembantu)
     KCP jika KODE_UKER ada di UKER_MASTER dan bukan KANCA
     """
-    if kode_uker not in UKER_MASTER:
-        return False
-    nama, kode_kanca = UKER_MASTER[kode_uker]
-    return kode_uker != kode_kanca and nama.upper().startswith("KCP")
+    return kode_uker in get_uker_hierarchy().kcp_code_set
 
 
 def get_kanca_induk(kode_uker: int) -> Optional[int]:
     """
     Get KODE_KANCA induk dari suatu KODE_UKER
     """
-    if kode_uker in UKER_MASTER:
-        return UKER_MASTER[kode_uker][1]
+    uker_master = get_uker_hierarchy().uker_master
+    if kode_uker in uker_master:
+        return uker_master[kode_uker][1]
     return None
 
 
@@ -242,8 +428,9 @@ def get_uker_name(kode_uker: int) -> Optional[str]:
     """
     Get nama UKER dari KODE_UKER
     """
-    if kode_uker in UKER_MASTER:
-        return UKER_MASTER[kode_uker][0]
+    uker_master = get_uker_hierarchy().uker_master
+    if kode_uker in uker_master:
+        return uker_master[kode_uker][0]
     return None
 
 
@@ -252,15 +439,7 @@ def get_kcp_by_kanca(kode_kanca: int) -> List[Tuple[int, str]]:
     Get list of KCP (kode, nama) under a specific KANCA.
     Excludes any UKER codes that are also defined as KANCA to avoid double counting.
     """
-    result = []
-    for kode_uker, (nama, induk) in UKER_MASTER.items():
-        # Only include if:
-        # 1. Parent KANCA matches
-        # 2. Not the KANCA itself
-        # 3. Not in KANCA_CODES (to handle edge cases like 137)
-        if induk == kode_kanca and kode_uker != kode_kanca and kode_uker not in KANCA_CODES:
-            result.append((kode_uker, nama))
-    return result
+    return list(get_uker_hierarchy().kcp_by_kanca.get(kode_kanca, ()))
 
 
 def get_uker_type(kode_uker: int) -> str:
@@ -271,10 +450,11 @@ def get_uker_type(kode_uker: int) -> str:
     - 'RO' for Regional Office
     - 'UNKNOWN' if not found
     """
-    if kode_uker not in UKER_MASTER:
+    uker_master = get_uker_hierarchy().uker_master
+    if kode_uker not in uker_master:
         return 'UNKNOWN'
     
-    nama, kode_kanca = UKER_MASTER[kode_uker]
+    nama, kode_kanca = uker_master[kode_uker]
     
     if nama.upper().startswith("RO "):
         return 'RO'
@@ -297,9 +477,8 @@ def filter_kanca_only(queryset):
     Filter queryset untuk hanya menampilkan data KANCA (Kantor Cabang)
     Asumsi: queryset memiliki field 'kode_uker' yang berisi KODE_UKER
     """
-    # Convert KANCA_CODES to strings since kode_uker is CharField
-    kanca_codes_str = [str(code) for code in KANCA_CODES]
-    return queryset.filter(kode_uker__in=kanca_codes_str)
+    # kode_uker adalah CharField, pakai kode string dari index
+    return queryset.filter(kode_uker__in=get_uker_hierarchy().kanca_code_strs)
 
 
 def filter_kcp_only(queryset):
@@ -307,9 +486,8 @@ def filter_kcp_only(queryset):
     Filter queryset untuk hanya menampilkan data KCP (Kantor Cabang Pembantu)
     Asumsi: queryset memiliki field 'kode_uker' yang berisi KODE_UKER
     """
-    # Convert KCP_CODES to strings since kode_uker is CharField
-    kcp_codes_str = [str(code) for code in KCP_CODES]
-    return queryset.filter(kode_uker__in=kcp_codes_str)
+    # kode_uker adalah CharField, pakai kode string dari index
+    return queryset.filter(kode_uker__in=get_uker_hierarchy().kcp_code_strs)
 
 
 def filter_kanca_konsol(queryset):
@@ -335,7 +513,7 @@ def get_kanca_with_kcp_grouped() -> Dict[int, Dict]:
     }
     """
     result = {}
-    for kode_kanca, nama_kanca in KANCA_MASTER.items():
+    for kode_kanca, nama_kanca in get_uker_hierarchy().kanca_names.items():
         kcp_list = get_kcp_by_kanca(kode_kanca)
         result[kode_kanca] = {
             'nama': nama_kanca,
@@ -353,6 +531,11 @@ __all__ = [
     'UKER_MASTER',
     'KANCA_CODES',
     'KCP_CODES',
+    'UkerHierarchy',
+    'UKER_HIERARCHY',
+    'get_uker_hierarchy',
+    'load_uker_hierarchy',
+    'reset_uker_hierarchy',
     'is_kanca',
     'is_kcp',
     'get_kanca_induk',
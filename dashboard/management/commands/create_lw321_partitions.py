@@ -0,0 +1,41 @@
+"""
+Management command untuk pre-create partisi bulanan tabel lw321
+Usage: python manage.py create_lw321_partitions [--months 3] [--start 2025-01]
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.partitions import create_upcoming_partitions, is_lw321_partitioned, list_lw321_partitions
+
+
+class Command(BaseCommand):
+    help = 'Create monthly partitions of the lw321 table ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help='Jumlah bulan ke depan (selain bulan awal)', default=3)
+        parser.add_argument('--start', type=str, help='Bulan awal YYYY-MM (default: bulan ini)', default=None)
+
+    def handle(self, *args, **options):
+        if not is_lw321_partitioned():
+            raise CommandError('Tabel lw321 tidak di-partisi (butuh PostgreSQL dan migrasi dashboard terbaru).')
+
+        start = None
+        if options['start']:
+            try:
+                start = datetime.strptime(options['start'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Format --start harus YYYY-MM')
+
+        created = create_upcoming_partitions(months_ahead=options['months'], start=start)
+
+        for name in created:
+            self.stdout.write(self.style.SUCCESS(f'Created partition: {name}'))
+        if not created:
+            self.stdout.write('All partitions already exist')
+
+        partitions = list_lw321_partitions()
+        self.stdout.write(f'  Total partitions: {len(partitions)}')
+        if partitions:
+            self.stdout.write(f'  Range: {partitions[0][1]} - {partitions[-1][1]}')
@@ -0,0 +1,46 @@
+"""
+Management command untuk membangun ulang fact table harian LW321 (LW321DailyAggregate)
+beserta rollup akhir bulan (LW321MonthlyAggregate) untuk bulan-bulan yang tersentuh.
+Rebuild penuh (tanpa --from/--to) juga menghapus tanda aggregates_pending di UploadHistory.
+Usage: python manage.py rebuild_lw321_aggregates [--from 2025-01-01] [--to 2025-12-31]
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.aggregates import rebuild_all_daily_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily per-uker LW321 aggregate table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=str, help='Tanggal awal YYYY-MM-DD', default=None)
+        parser.add_argument('--to', dest='date_to', type=str, help='Tanggal akhir YYYY-MM-DD', default=None)
+
+    def _parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Format {option} harus YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        date_from = self._parse_date(options['date_from'], '--from') if options['date_from'] else None
+        date_to = self._parse_date(options['date_to'], '--to') if options['date_to'] else None
+
+        date_count, row_count = rebuild_all_daily_aggregates(date_from, date_to)
+        if not date_count:
+            self.stdout.write(self.style.WARNING('No LW321 data in the selected range'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt {row_count} aggregate rows on {date_count} dates')
+        )
+
+        if date_from is None and date_to is None:
+            from data_management.models import UploadHistory
+
+            cleared = UploadHistory.objects.filter(aggregates_pending=True).update(aggregates_pending=False)
+            if cleared:
+                self.stdout.write(f'Cleared aggregates_pending on {cleared} uploads')
@@ -0,0 +1,59 @@
+"""
+Management command untuk menghitung ulang kolom turunan LW321
+(segment, outstanding, sml, npl, lr, lar), mis. setelah SEGMENT_MAPPING_BY_CODE berubah.
+Usage: python manage.py recompute_lw321_derived [--segment-only] [--from 2025-01-01] [--to 2025-12-31]
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.aggregates import rebuild_daily_aggregates
+from dashboard.formulas.calculations import recompute_derived_columns
+from dashboard.models import LW321
+
+
+class Command(BaseCommand):
+    help = 'Recompute derived LW321 columns (segment and metrics)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--segment-only', action='store_true', help='Hanya hitung ulang kolom segment')
+        parser.add_argument('--from', dest='date_from', type=str, help='Tanggal awal YYYY-MM-DD', default=None)
+        parser.add_argument('--to', dest='date_to', type=str, help='Tanggal akhir YYYY-MM-DD', default=None)
+
+    def _parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Format {option} harus YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        qs = LW321.objects.order_by()
+        if options['date_from']:
+            qs = qs.filter(periode_date__gte=self._parse_date(options['date_from'], '--from'))
+        if options['date_to']:
+            qs = qs.filter(periode_date__lte=self._parse_date(options['date_to'], '--to'))
+
+        periode_dates = list(qs.values_list('periode_date', flat=True).distinct().order_by('periode_date'))
+        if not periode_dates:
+            self.stdout.write(self.style.WARNING('No LW321 data in the selected range'))
+            return
+
+        # Satu transaksi per tanggal: lock singkat dan hanya menyentuh satu partisi
+        total = 0
+        for periode_date in periode_dates:
+            with transaction.atomic():
+                updated = recompute_derived_columns(
+                    LW321.objects.filter(periode_date=periode_date),
+                    segment_only=options['segment_only'],
+                )
+            total += updated
+            self.stdout.write(f'  {periode_date:%d/%m/%Y}: {updated} rows')
+
+        # Segment / metrics berubah: fact table harian ikut dibangun ulang
+        rebuild_daily_aggregates(periode_dates)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully recomputed {total} rows on {len(periode_dates)} dates')
+        )
@@ -0,0 +1,36 @@
+"""
+Management command untuk precompute tabel halaman metric ke ProcessedData
+Usage: python manage.py warm_dashboard_tables [--date 2025-01-31 ...]
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.models import LW321DailyAggregate
+from dashboard.table_cache import warm_dashboard_tables
+
+
+class Command(BaseCommand):
+    help = 'Precompute metric page tables into ProcessedData (default: latest LW321 date)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', dest='dates', action='append', help='Tanggal YYYY-MM-DD (boleh berulang)', default=None)
+
+    def handle(self, *args, **options):
+        dates = []
+        for value in options['dates'] or []:
+            try:
+                dates.append(datetime.strptime(value, '%Y-%m-%d').date())
+            except ValueError:
+                raise CommandError('Format --date harus YYYY-MM-DD')
+
+        if not dates:
+            latest = LW321DailyAggregate.objects.order_by('-periode_date').values_list('periode_date', flat=True).first()
+            if latest is None:
+                self.stdout.write(self.style.WARNING('No LW321 data available'))
+                return
+            dates = [latest]
+
+        built = warm_dashboard_tables(dates)
+        self.stdout.write(self.style.SUCCESS(f'Successfully built {built} tables for {len(dates)} dates'))
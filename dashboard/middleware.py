@@ -0,0 +1,36 @@
+"""Middleware untuk app dashboard."""
+
+import logging
+
+from django.conf import settings
+
+from .formulas.memo import get_memo_stats, memoization_scope
+
+logger = logging.getLogger(__name__)
+
+
+class FormulaMemoMiddleware:
+    """
+    Aktifkan memoization query formulas selama satu request GET/HEAD.
+
+    Request yang mengubah data (POST dll) tidak di-memo supaya pembacaan
+    setelah penyimpanan tidak memakai hasil lama. Saat DEBUG aktif, jumlah
+    hit/miss dikirim di header X-Formula-Memo-Hits / X-Formula-Memo-Misses.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+
+        with memoization_scope():
+            response = self.get_response(request)
+            stats = get_memo_stats()
+
+        if settings.DEBUG and stats['hits'] + stats['misses']:
+            response['X-Formula-Memo-Hits'] = str(stats['hits'])
+            response['X-Formula-Memo-Misses'] = str(stats['misses'])
+            logger.debug(f"Formula memo {request.path}: {stats}")
+        return response
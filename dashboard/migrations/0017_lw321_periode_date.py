@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0016_update_komitmen_precision_and_kanca_to_integer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lw321',
+            name='periode_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='lw321',
+            index=models.Index(fields=['periode_date', 'kode_uker'], name='lw321_periode_0ed287_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lw321',
+            index=models.Index(fields=['periode_date', 'kanca'], name='lw321_periode_aa1a47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lw321',
+            index=models.Index(fields=['periode_date', 'kol_adk'], name='lw321_periode_5091e7_idx'),
+        ),
+    ]
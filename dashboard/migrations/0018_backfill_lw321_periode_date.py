@@ -0,0 +1,39 @@
+# Data migration: isi periode_date dari periode (DD/MM/YYYY) untuk data lama
+
+from datetime import datetime
+
+from django.db import migrations
+
+
+def backfill_periode_date(apps, schema_editor):
+    """
+    Parse setiap periode yang berbeda sekali di Python, lalu update per periode
+    (memakai index periode). Periode yang formatnya tidak valid dibiarkan NULL.
+    """
+    LW321 = apps.get_model('dashboard', 'LW321')
+    db_alias = schema_editor.connection.alias
+
+    periodes = (
+        LW321.objects.using(db_alias)
+        .filter(periode_date__isnull=True)
+        .order_by()
+        .values_list('periode', flat=True)
+        .distinct()
+    )
+    for periode in list(periodes):
+        try:
+            periode_date = datetime.strptime(periode.strip(), '%d/%m/%Y').date()
+        except (AttributeError, ValueError):
+            continue
+        LW321.objects.using(db_alias).filter(periode=periode).update(periode_date=periode_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0017_lw321_periode_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_periode_date, migrations.RunPython.noop),
+    ]
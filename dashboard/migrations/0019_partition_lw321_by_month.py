@@ -0,0 +1,103 @@
+# Partisi tabel lw321 per bulan (RANGE periode_date) - khusus PostgreSQL
+
+from django.db import migrations, models
+
+
+def _month_bounds(value):
+    start = value.replace(day=1)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+def partition_lw321(apps, schema_editor):
+    """
+    Ubah lw321 menjadi tabel partitioned:
+    1. Rename tabel lama, buat tabel baru PARTITION BY RANGE (periode_date)
+       dengan primary key (id, periode_date) dan id dari sequence
+    2. Buat partisi untuk setiap bulan yang ada + bulan ini dan bulan depan
+    3. Salin data, drop tabel lama, buat ulang index dengan nama yang sama
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('lw321')")
+        if cursor.fetchone():
+            return
+
+        cursor.execute("SELECT DISTINCT periode FROM lw321 WHERE periode_date IS NULL LIMIT 20")
+        invalid_periodes = [row[0] for row in cursor.fetchall()]
+        if invalid_periodes:
+            raise RuntimeError(
+                'Tidak bisa mempartisi lw321: ada data dengan periode yang bukan DD/MM/YYYY '
+                f'(periode_date NULL): {invalid_periodes}. Perbaiki atau hapus data tersebut dulu.'
+            )
+
+        # Definisi index lama (selain primary key) untuk dibuat ulang di tabel partitioned
+        cursor.execute("""
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = 'lw321'
+              AND indexname NOT IN (
+                  SELECT conname FROM pg_constraint WHERE conrelid = 'lw321'::regclass
+              )
+        """)
+        index_definitions = [row[0] for row in cursor.fetchall()]
+
+        cursor.execute("SELECT conname FROM pg_constraint WHERE conrelid = 'lw321'::regclass AND contype = 'p'")
+        old_pkey = cursor.fetchone()
+
+        cursor.execute("ALTER TABLE lw321 RENAME TO lw321_unpartitioned")
+        if old_pkey:
+            cursor.execute(f'ALTER TABLE lw321_unpartitioned RENAME CONSTRAINT "{old_pkey[0]}" TO lw321_unpartitioned_pkey')
+
+        cursor.execute("""
+            CREATE TABLE lw321 (LIKE lw321_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (periode_date)
+        """)
+        # Default id lama (serial/identity) milik tabel lama, diganti sequence baru di bawah
+        cursor.execute("ALTER TABLE lw321 ALTER COLUMN id DROP DEFAULT")
+        cursor.execute("ALTER TABLE lw321 ALTER COLUMN periode_date SET NOT NULL")
+        cursor.execute("ALTER TABLE lw321 ADD CONSTRAINT lw321_pkey PRIMARY KEY (id, periode_date)")
+
+        cursor.execute("""
+            SELECT DISTINCT date_trunc('month', periode_date)::date FROM lw321_unpartitioned
+            UNION SELECT date_trunc('month', CURRENT_DATE)::date
+            UNION SELECT (date_trunc('month', CURRENT_DATE) + INTERVAL '1 month')::date
+        """)
+        for (value,) in cursor.fetchall():
+            start, end = _month_bounds(value)
+            cursor.execute(
+                f'CREATE TABLE "lw321_p{start.year:04d}_{start.month:02d}" '
+                f'PARTITION OF lw321 FOR VALUES FROM (%s) TO (%s)',
+                [start, end],
+            )
+
+        cursor.execute("INSERT INTO lw321 SELECT * FROM lw321_unpartitioned")
+        cursor.execute("DROP TABLE lw321_unpartitioned")
+
+        # IDENTITY tidak didukung di tabel partitioned (PostgreSQL < 17): pakai sequence biasa
+        cursor.execute("DROP SEQUENCE IF EXISTS lw321_id_seq")
+        cursor.execute("CREATE SEQUENCE lw321_id_seq OWNED BY lw321.id")
+        cursor.execute("SELECT setval('lw321_id_seq', COALESCE(MAX(id), 0) + 1, false) FROM lw321")
+        cursor.execute("ALTER TABLE lw321 ALTER COLUMN id SET DEFAULT nextval('lw321_id_seq')")
+
+        for index_definition in index_definitions:
+            cursor.execute(index_definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0018_backfill_lw321_periode_date'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_lw321, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='lw321',
+            name='periode_date',
+            field=models.DateField(),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0019_partition_lw321_by_month'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lw321',
+            name='lar',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='lw321',
+            name='lr',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='lw321',
+            name='npl',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='lw321',
+            name='outstanding',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddField(
+            model_name='lw321',
+            name='segment',
+            field=models.CharField(default='SMALL', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='lw321',
+            name='sml',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=20),
+        ),
+        migrations.AddIndex(
+            model_name='lw321',
+            index=models.Index(fields=['periode_date', 'segment', 'kode_uker'], name='lw321_periode_656c55_idx'),
+        ),
+    ]
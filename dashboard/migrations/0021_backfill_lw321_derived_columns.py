@@ -0,0 +1,31 @@
+# Data migration: hitung kolom turunan (segment dan metrics) untuk data lama
+
+from django.db import migrations
+
+
+def backfill_derived_columns(apps, schema_editor):
+    """Satu UPDATE per tanggal (per partisi), supaya transaksi tidak terlalu besar."""
+    from dashboard.formulas.calculations import recompute_derived_columns
+
+    LW321 = apps.get_model('dashboard', 'LW321')
+    db_alias = schema_editor.connection.alias
+
+    periode_dates = (
+        LW321.objects.using(db_alias)
+        .order_by()
+        .values_list('periode_date', flat=True)
+        .distinct()
+    )
+    for periode_date in list(periode_dates):
+        recompute_derived_columns(LW321.objects.using(db_alias).filter(periode_date=periode_date))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0020_lw321_derived_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_derived_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0021_backfill_lw321_derived_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LW321DailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode_date', models.DateField()),
+                ('kode_uker', models.CharField(blank=True, max_length=10)),
+                ('kanca', models.CharField(blank=True, max_length=100)),
+                ('segment', models.CharField(max_length=20)),
+                ('kol_adk', models.CharField(blank=True, max_length=10)),
+                ('flag_restruk', models.CharField(blank=True, max_length=10)),
+                ('dub_nasabah', models.CharField(blank=True, max_length=10, null=True)),
+                ('os', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('sml', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('npl', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('lr', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('lar', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('nasabah', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('row_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'LW321 daily aggregate',
+                'verbose_name_plural': 'LW321 daily aggregates',
+                'db_table': 'lw321_daily_aggregate',
+                'indexes': [models.Index(fields=['periode_date', 'kode_uker'], name='lw321_daily_periode_225953_idx'), models.Index(fields=['periode_date', 'segment'], name='lw321_daily_periode_638e7f_idx'), models.Index(fields=['periode_date', 'kanca'], name='lw321_daily_periode_dfa59d_idx')],
+            },
+        ),
+    ]
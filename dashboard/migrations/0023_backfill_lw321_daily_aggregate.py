@@ -0,0 +1,52 @@
+# Data migration: isi fact table harian dari data LW321 yang sudah ada
+
+from django.db import migrations
+
+GROUP_COLUMNS = ['periode_date', 'kode_uker', 'kanca', 'segment', 'kol_adk', 'flag_restruk', 'dub_nasabah']
+SUM_COLUMNS = ['os', 'outstanding', 'sml', 'npl', 'lr', 'lar', 'nasabah']
+
+
+def backfill_daily_aggregate(apps, schema_editor):
+    """
+    Satu INSERT ... SELECT ... GROUP BY per tanggal (memakai partisi / index periode_date).
+    """
+    LW321 = apps.get_model('dashboard', 'LW321')
+    LW321DailyAggregate = apps.get_model('dashboard', 'LW321DailyAggregate')
+    db_alias = schema_editor.connection.alias
+    quote = schema_editor.connection.ops.quote_name
+
+    group_sql = ', '.join(quote(name) for name in GROUP_COLUMNS)
+    sum_sql = ', '.join(f'COALESCE(SUM({quote(name)}), 0)' for name in SUM_COLUMNS)
+    target_columns = ', '.join(quote(name) for name in GROUP_COLUMNS + SUM_COLUMNS + ['row_count'])
+    sql = (
+        f'INSERT INTO {quote(LW321DailyAggregate._meta.db_table)} ({target_columns}) '
+        f'SELECT {group_sql}, {sum_sql}, COUNT(*) '
+        f'FROM {quote(LW321._meta.db_table)} WHERE {quote("periode_date")} = %s '
+        f'GROUP BY {group_sql}'
+    )
+
+    periode_dates = (
+        LW321.objects.using(db_alias)
+        .order_by()
+        .values_list('periode_date', flat=True)
+        .distinct()
+    )
+    with schema_editor.connection.cursor() as cursor:
+        for periode_date in list(periode_dates):
+            cursor.execute(sql, [periode_date])
+
+
+def clear_daily_aggregate(apps, schema_editor):
+    LW321DailyAggregate = apps.get_model('dashboard', 'LW321DailyAggregate')
+    LW321DailyAggregate.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0022_lw321_daily_aggregate'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_aggregate, clear_daily_aggregate),
+    ]
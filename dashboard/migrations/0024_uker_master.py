@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0023_backfill_lw321_daily_aggregate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UkerMaster',
+            fields=[
+                ('kode_uker', models.CharField(max_length=10, primary_key=True, serialize=False)),
+                ('nama_uker', models.CharField(max_length=100)),
+                ('kode_kanca', models.IntegerField(db_index=True)),
+                ('urutan', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Uker Master',
+                'verbose_name_plural': 'Uker Master',
+                'db_table': 'uker_master',
+                'ordering': ['urutan', 'kode_kanca', 'kode_uker'],
+            },
+        ),
+        migrations.AddField(
+            model_name='lw321dailyaggregate',
+            name='uker_master',
+            field=models.ForeignObject(from_fields=('kode_uker',), null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dashboard.ukermaster', to_fields=('kode_uker',)),
+        ),
+    ]
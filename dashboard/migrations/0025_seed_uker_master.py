@@ -0,0 +1,44 @@
+# Data migration: isi uker_master dari KANCA_MASTER / UKER_MASTER yang sebelumnya hard-coded
+
+from django.db import migrations
+
+from dashboard.formulas.uker_mapping import KANCA_MASTER, UKER_MASTER
+
+
+def seed_uker_master(apps, schema_editor):
+    UkerMaster = apps.get_model('dashboard', 'UkerMaster')
+    db_alias = schema_editor.connection.alias
+
+    kanca_order = {kode_kanca: urutan for urutan, kode_kanca in enumerate(KANCA_MASTER, start=1)}
+    rows = [
+        UkerMaster(
+            kode_uker=str(kode_uker),
+            nama_uker=nama,
+            kode_kanca=kode_kanca,
+            urutan=kanca_order.get(kode_kanca, len(kanca_order) + 1),
+        )
+        for kode_uker, (nama, kode_kanca) in UKER_MASTER.items()
+    ]
+    # KANCA yang tidak tercatat di UKER_MASTER tetap menjadi baris KANCA
+    rows += [
+        UkerMaster(kode_uker=str(kode_kanca), nama_uker=nama, kode_kanca=kode_kanca, urutan=kanca_order[kode_kanca])
+        for kode_kanca, nama in KANCA_MASTER.items()
+        if kode_kanca not in UKER_MASTER
+    ]
+    UkerMaster.objects.using(db_alias).bulk_create(rows, ignore_conflicts=True)
+
+
+def clear_uker_master(apps, schema_editor):
+    UkerMaster = apps.get_model('dashboard', 'UkerMaster')
+    UkerMaster.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0024_uker_master'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_uker_master, clear_uker_master),
+    ]
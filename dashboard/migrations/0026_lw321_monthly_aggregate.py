@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0025_seed_uker_master'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LW321MonthlyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('segment', models.CharField(max_length=20)),
+                ('kanca', models.CharField(blank=True, max_length=100)),
+                ('eom_date', models.DateField()),
+                ('os', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('sml', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('npl', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+                ('lar', models.DecimalField(decimal_places=2, default=0, max_digits=22)),
+            ],
+            options={
+                'verbose_name': 'LW321 monthly aggregate',
+                'verbose_name_plural': 'LW321 monthly aggregates',
+                'db_table': 'lw321_monthly_aggregate',
+                'unique_together': {('month', 'segment', 'kanca')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Data migration: isi rollup akhir bulan dari fact table harian yang sudah ada
+
+from datetime import date
+
+from django.db import migrations
+
+SUM_COLUMNS = ['os', 'sml', 'npl', 'lar']
+
+
+def _next_month(value):
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def backfill_monthly_aggregate(apps, schema_editor):
+    """
+    Satu INSERT ... SELECT per bulan: SUM metrics pada tanggal terakhir setiap
+    (segment, kanca) di bulan tersebut.
+    """
+    LW321DailyAggregate = apps.get_model('dashboard', 'LW321DailyAggregate')
+    LW321MonthlyAggregate = apps.get_model('dashboard', 'LW321MonthlyAggregate')
+    db_alias = schema_editor.connection.alias
+    quote = schema_editor.connection.ops.quote_name
+
+    daily = quote(LW321DailyAggregate._meta.db_table)
+    sum_sql = ', '.join(f'COALESCE(SUM(d.{quote(name)}), 0)' for name in SUM_COLUMNS)
+    target_columns = ', '.join(quote(name) for name in ['month', 'segment', 'kanca', 'eom_date'] + SUM_COLUMNS)
+    sql = (
+        f'INSERT INTO {quote(LW321MonthlyAggregate._meta.db_table)} ({target_columns}) '
+        f'SELECT %s, d.{quote("segment")}, d.{quote("kanca")}, d.{quote("periode_date")}, {sum_sql} '
+        f'FROM {daily} d JOIN ('
+        f'SELECT {quote("segment")}, {quote("kanca")}, MAX({quote("periode_date")}) AS eom_date '
+        f'FROM {daily} WHERE {quote("periode_date")} >= %s AND {quote("periode_date")} < %s '
+        f'GROUP BY {quote("segment")}, {quote("kanca")}'
+        f') last ON d.{quote("segment")} = last.{quote("segment")} '
+        f'AND d.{quote("kanca")} = last.{quote("kanca")} AND d.{quote("periode_date")} = last.eom_date '
+        f'GROUP BY d.{quote("segment")}, d.{quote("kanca")}, d.{quote("periode_date")}'
+    )
+
+    periode_dates = (
+        LW321DailyAggregate.objects.using(db_alias)
+        .order_by()
+        .values_list('periode_date', flat=True)
+        .distinct()
+    )
+    months = sorted({date(value.year, value.month, 1) for value in periode_dates})
+    with schema_editor.connection.cursor() as cursor:
+        for month in months:
+            cursor.execute(sql, [month, month, _next_month(month)])
+
+
+def clear_monthly_aggregate(apps, schema_editor):
+    LW321MonthlyAggregate = apps.get_model('dashboard', 'LW321MonthlyAggregate')
+    LW321MonthlyAggregate.objects.using(schema_editor.connection.alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0026_lw321_monthly_aggregate'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_monthly_aggregate, clear_monthly_aggregate),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0027_backfill_lw321_monthly_aggregate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processeddata',
+            name='hierarchy_version',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
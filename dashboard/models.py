@@ -9,6 +9,7 @@ class LW321(models.Model):
     """
 
     periode = models.CharField(max_length=20, db_index=True)  # Diubah dari 30 ke 20
+    periode_date = models.DateField()  # Periode (DD/MM/YYYY) sebagai DATE, diisi saat ingestion; kunci partisi bulanan
     kanca = models.CharField(max_length=100, blank=True)  # Diubah dari 50 ke 100 untuk keamanan
     kode_uker = models.CharField(max_length=10, blank=True)  # Diubah dari 50 ke 10
     uker = models.CharField(max_length=100, blank=True)  # Diubah dari 50 ke 100 untuk keamanan
@@ -42,6 +43,14 @@ class LW321(models.Model):
     nasabah = models.DecimalField(max_digits=18, decimal_places=2, null=True, blank=True)  # NASABAH (angka)
     dub_nasabah = models.CharField(max_length=10, null=True, blank=True)  # DUB NASABAH - VARCHAR untuk simpan "TRUE"/"FALSE"
 
+    # Kolom turunan, dihitung sekali saat ingestion (formula di dashboard.formulas.calculations)
+    segment = models.CharField(max_length=20, default='SMALL')  # Dari CODE via SEGMENT_MAPPING_BY_CODE
+    outstanding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    sml = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # DPK: kol_adk = '2'
+    npl = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # kol_adk IN ('3', '4', '5')
+    lr = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # kol_adk = '1' AND flag_restruk = 'Y'
+    lar = models.DecimalField(max_digits=20, decimal_places=2, default=0)  # SML + NPL + LR
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -55,6 +64,11 @@ class LW321(models.Model):
             models.Index(fields=['periode', 'kolektibilitas_macet']),
             models.Index(fields=['nomor_rekening']),
             models.Index(fields=['periode', 'nomor_rekening']),
+            # Filter tanggal (range, tahun/bulan, akhir bulan) memakai periode_date
+            models.Index(fields=['periode_date', 'kode_uker']),
+            models.Index(fields=['periode_date', 'kanca']),
+            models.Index(fields=['periode_date', 'kol_adk']),
+            models.Index(fields=['periode_date', 'segment', 'kode_uker']),
         ]
         # Tidak ada unique constraint - nomor_rekening boleh duplikat untuk tanggal berbeda
 
@@ -63,6 +77,107 @@ class LW321(models.Model):
         return f"{self.nomor_rekening} - {nama}"
 
 
+class UkerMaster(models.Model):
+    """
+    Master hierarki UKER -> KANCA. Baris dengan kode_uker == kode_kanca adalah KANCA,
+    selain itu UKER (KCP) di bawah kode_kanca. Di-seed dari KANCA_MASTER / UKER_MASTER
+    (dashboard.formulas.uker_mapping) dan bisa diubah lewat admin tanpa deploy.
+    Aplikasi membaca snapshot-nya lewat get_uker_hierarchy().
+    """
+    kode_uker = models.CharField(max_length=10, primary_key=True)  # Sama dengan LW321.kode_uker
+    nama_uker = models.CharField(max_length=100)
+    kode_kanca = models.IntegerField(db_index=True)  # KANCA induk (roll-up KONSOL)
+    urutan = models.IntegerField(default=0)  # Urutan baris KANCA di tabel
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'uker_master'
+        verbose_name = 'Uker Master'
+        verbose_name_plural = 'Uker Master'
+        ordering = ['urutan', 'kode_kanca', 'kode_uker']
+
+    def __str__(self):
+        return f"{self.kode_uker} - {self.nama_uker}"
+
+    @property
+    def is_kanca(self):
+        return self.kode_uker == str(self.kode_kanca)
+
+
+class LW321DailyAggregate(models.Model):
+    """
+    Fact table harian: SUM metrics LW321 per tanggal, uker, segment, kol_adk,
+    flag_restruk dan dub_nasabah. Dibangun ulang per tanggal setiap upload
+    selesai / data dihapus (lihat dashboard.aggregates).
+    """
+    periode_date = models.DateField()
+    kode_uker = models.CharField(max_length=10, blank=True)
+    kanca = models.CharField(max_length=100, blank=True)  # Untuk filter kanca di halaman timeseries
+    segment = models.CharField(max_length=20)
+    kol_adk = models.CharField(max_length=10, blank=True)
+    flag_restruk = models.CharField(max_length=10, blank=True)
+    dub_nasabah = models.CharField(max_length=10, null=True, blank=True)
+
+    os = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    outstanding = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    sml = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    npl = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    lr = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    lar = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    nasabah = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    row_count = models.IntegerField(default=0)  # Jumlah baris LW321 di grup ini
+
+    # JOIN ke uker_master lewat kode_uker (tanpa kolom/constraint baru) untuk roll-up per KANCA di SQL
+    uker_master = models.ForeignObject(
+        UkerMaster,
+        on_delete=models.DO_NOTHING,
+        from_fields=('kode_uker',),
+        to_fields=('kode_uker',),
+        related_name='+',
+        null=True,
+    )
+
+    class Meta:
+        db_table = 'lw321_daily_aggregate'
+        verbose_name = 'LW321 daily aggregate'
+        verbose_name_plural = 'LW321 daily aggregates'
+        indexes = [
+            models.Index(fields=['periode_date', 'kode_uker']),
+            models.Index(fields=['periode_date', 'segment']),
+            models.Index(fields=['periode_date', 'kanca']),
+        ]
+
+    def __str__(self):
+        return f"{self.periode_date} - {self.kode_uker} - {self.segment}"
+
+
+class LW321MonthlyAggregate(models.Model):
+    """
+    Rollup akhir bulan per (bulan, segment, kanca) dari LW321DailyAggregate, untuk
+    grafik timeseries bulanan. eom_date = tanggal data terakhir grup ini di bulan
+    tersebut; metrics adalah SUM pada tanggal itu. Dibangun ulang per bulan setiap
+    fact table harian berubah (lihat dashboard.aggregates).
+    """
+    month = models.DateField()  # Tanggal 1 bulan tersebut
+    segment = models.CharField(max_length=20)
+    kanca = models.CharField(max_length=100, blank=True)
+    eom_date = models.DateField()
+
+    os = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    sml = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    npl = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+    lar = models.DecimalField(max_digits=22, decimal_places=2, default=0)
+
+    class Meta:
+        db_table = 'lw321_monthly_aggregate'
+        verbose_name = 'LW321 monthly aggregate'
+        verbose_name_plural = 'LW321 monthly aggregates'
+        unique_together = ['month', 'segment', 'kanca']
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} - {self.segment} - {self.kanca}"
+
+
 class ProcessedData(models.Model):
     """
     Model untuk menyimpan data yang sudah diolah untuk dashboard
@@ -73,6 +188,8 @@ class ProcessedData(models.Model):
     
     # Data yang sudah diolah disimpan dalam JSON atau field terpisah
     processed_json = models.JSONField()
+    # Versi hierarki uker_master saat tabel dibangun; baris dengan versi lain diabaikan
+    hierarchy_version = models.CharField(max_length=64, blank=True, default='')
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
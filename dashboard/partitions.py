@@ -0,0 +1,236 @@
+"""
+Range partitioning tabel lw321 per bulan (PostgreSQL).
+
+Tabel lw321 di-partisi dengan ``PARTITION BY RANGE (periode_date)``, satu
+partisi per bulan dengan nama ``lw321_pYYYY_MM``. Query per tanggal hanya
+menyentuh satu partisi, dan menghapus satu bulan penuh cukup dengan
+DETACH + DROP partisi (tanpa DELETE baris demi baris yang menghasilkan WAL besar).
+
+Di database selain PostgreSQL (mis. SQLite untuk development) tabel tidak
+di-partisi dan semua fungsi di sini jatuh kembali ke DELETE biasa.
+"""
+import logging
+from datetime import date
+
+from django.db import DatabaseError, connection, transaction
+
+from .aggregates import delete_daily_aggregates, truncate_daily_aggregates
+from .models import LW321
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def next_month(value):
+    if value.month == 12:
+        return date(value.year + 1, 1, 1)
+    return date(value.year, value.month + 1, 1)
+
+
+def get_partition_name(value):
+    """Nama partisi untuk bulan dari tanggal value, mis. lw321_p2025_01."""
+    return f'{LW321._meta.db_table}_p{value.year:04d}_{value.month:02d}'
+
+
+def is_lw321_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+            [LW321._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_lw321_partitions():
+    """
+    Returns:
+        list of (tanggal awal bulan, nama partisi), urut dari bulan terlama
+    """
+    if not is_lw321_partitioned():
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(%s)',
+            [LW321._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f'{LW321._meta.db_table}_p'
+    partitions = []
+    for name in names:
+        try:
+            year, month = name[len(prefix):].split('_')
+            partitions.append((date(int(year), int(month), 1), name))
+        except ValueError:
+            continue
+    return sorted(partitions)
+
+
+def create_month_partition(value):
+    """
+    Buat partisi untuk bulan dari tanggal value (jika belum ada).
+
+    Returns:
+        bool: True jika partisi baru dibuat
+    """
+    name = get_partition_name(value)
+    quote = connection.ops.quote_name
+    start = month_start(value)
+
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+        if cursor.fetchone()[0]:
+            return False
+        try:
+            # Savepoint: worker paralel bisa membuat partisi yang sama bersamaan
+            with transaction.atomic():
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {quote(name)} '
+                    f'PARTITION OF {quote(LW321._meta.db_table)} '
+                    f'FOR VALUES FROM (%s) TO (%s)',
+                    [start, next_month(start)],
+                )
+        except DatabaseError:
+            cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+            if not cursor.fetchone()[0]:
+                raise
+            return False
+
+    logger.info(f"Partisi {name} dibuat")
+    return True
+
+
+def ensure_lw321_partitions(dates):
+    """
+    Pastikan partisi ada untuk setiap bulan dari dates (iterable of date, None diabaikan).
+
+    Katalog selalu dicek ulang (tanpa cache per proses): partisi bisa di-drop oleh
+    proses lain (delete_lw321_range di web process) di antara dua upload.
+    """
+    months = {month_start(value) for value in dates if value is not None}
+    if not months or not is_lw321_partitioned():
+        return
+    for value in sorted(months):
+        create_month_partition(value)
+
+
+def create_upcoming_partitions(months_ahead=3, start=None):
+    """
+    Pre-create partisi mulai bulan start (default: bulan ini) sampai months_ahead bulan ke depan.
+
+    Returns:
+        list nama partisi yang baru dibuat
+    """
+    value = month_start(start or date.today())
+    created = []
+    for _ in range(months_ahead + 1):
+        if create_month_partition(value):
+            created.append(get_partition_name(value))
+        value = next_month(value)
+    return created
+
+
+def _lock_partition(cursor, name):
+    """
+    Kunci partisi (ACCESS EXCLUSIVE) sampai akhir transaksi: upload (COPY / publish
+    staging) tidak bisa menulis ke bulan ini selama partisi dicek lalu dihapus.
+    """
+    cursor.execute(f'LOCK TABLE {connection.ops.quote_name(name)} IN ACCESS EXCLUSIVE MODE')
+
+
+def drop_month_partition(value):
+    """
+    DETACH + DROP partisi satu bulan.
+
+    Returns:
+        int: jumlah baris yang ikut terhapus
+    """
+    name = get_partition_name(value)
+    quote = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            _lock_partition(cursor, name)
+            cursor.execute(f'SELECT COUNT(*) FROM {quote(name)}')
+            row_count = cursor.fetchone()[0]
+            cursor.execute(f'ALTER TABLE {quote(LW321._meta.db_table)} DETACH PARTITION {quote(name)}')
+            cursor.execute(f'DROP TABLE {quote(name)}')
+    logger.info(f"Partisi {name} di-drop ({row_count} baris)")
+    return row_count
+
+
+def delete_lw321_range(date_from, date_to):
+    """
+    Hapus data LW321 dengan periode_date di antara date_from dan date_to (inklusif).
+
+    Partisi yang seluruh datanya berada di dalam range di-DROP; sisanya
+    (bulan yang hanya sebagian ter-cover) dihapus dengan DELETE yang
+    hanya menyentuh partisi bulan tersebut. Fact table harian untuk range
+    yang sama ikut dihapus.
+
+    Semuanya berjalan dalam satu transaksi: setiap partisi dikunci sebelum
+    MIN/MAX-nya dicek (upload tidak bisa menyisipkan tanggal di luar range
+    sebelum DROP), dan fact table baru dihapus setelah LW321. Jika DELETE/DROP
+    gagal (mis. lock timeout) tidak ada yang berubah, termasuk dashboard.
+
+    Returns:
+        int: jumlah baris yang dihapus
+    """
+    with transaction.atomic():
+        if not is_lw321_partitioned():
+            deleted = LW321.objects.filter(periode_date__range=(date_from, date_to)).delete()[0]
+        else:
+            deleted = _delete_partitioned_range(date_from, date_to)
+        delete_daily_aggregates(date_from, date_to)
+    return deleted
+
+
+def _delete_partitioned_range(date_from, date_to):
+    quote = connection.ops.quote_name
+    deleted = 0
+    for partition_month, name in list_lw321_partitions():
+        if partition_month > date_to or next_month(partition_month) <= date_from:
+            continue
+
+        with connection.cursor() as cursor:
+            _lock_partition(cursor, name)
+            cursor.execute(f'SELECT MIN(periode_date), MAX(periode_date) FROM {quote(name)}')
+            first_date, last_date = cursor.fetchone()
+        if first_date is None:
+            continue
+
+        if date_from <= first_date and last_date <= date_to:
+            deleted += drop_month_partition(partition_month)
+        else:
+            deleted += LW321.objects.filter(
+                periode_date__range=(max(date_from, partition_month), date_to),
+                periode_date__lt=next_month(partition_month),
+            ).delete()[0]
+    return deleted
+
+
+def truncate_lw321():
+    """
+    Kosongkan seluruh tabel LW321 (TRUNCATE, bukan DELETE per baris)
+    beserta fact table hariannya.
+
+    Returns:
+        int: jumlah baris yang dihapus
+    """
+    truncate_daily_aggregates()
+    if connection.vendor != 'postgresql':
+        return LW321.objects.all().delete()[0]
+
+    quote = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {quote(LW321._meta.db_table)}')
+            row_count = cursor.fetchone()[0]
+            cursor.execute(f'TRUNCATE TABLE {quote(LW321._meta.db_table)}')
+    return row_count
@@ -0,0 +1,50 @@
+"""Signal handler app dashboard."""
+import logging
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .formulas.uker_mapping import reset_uker_hierarchy
+from .models import KomitmenData, UkerMaster
+from .table_cache import invalidate_all_tables, invalidate_komitmen_periode
+
+logger = logging.getLogger(__name__)
+
+# (periode, kode_kanca) KomitmenData yang berubah di transaksi berjalan, per thread
+_pending_komitmen = threading.local()
+
+
+@receiver(post_save, sender=UkerMaster)
+@receiver(post_delete, sender=UkerMaster)
+def uker_master_changed(sender, instance, **kwargs):
+    """
+    Hierarki UKER -> KANCA berubah: baca ulang snapshot di proses ini dan buang semua
+    tabel tersimpan (baris KONSOL / KANCA ONLY / KCP ONLY bisa berpindah KANCA).
+    Proses lain membaca versi baru paling lambat setelah UKER_MASTER_REFRESH_SECONDS.
+    """
+    logger.info(f"uker_master berubah ({instance.kode_uker}), invalidasi tabel dashboard")
+    reset_uker_hierarchy()
+    invalidate_all_tables()
+
+
+def _flush_komitmen_invalidation():
+    pending = getattr(_pending_komitmen, 'kancas', None)
+    _pending_komitmen.kancas = {}
+    for periode, kode_kancas in (pending or {}).items():
+        invalidate_komitmen_periode(periode, kode_kancas)
+
+
+@receiver(post_save, sender=KomitmenData)
+@receiver(post_delete, sender=KomitmenData)
+def komitmen_data_changed(sender, instance, **kwargs):
+    """
+    KomitmenData diubah lewat ORM (admin, shell, dsb.): invalidasi tabel bulan dan KANCA
+    tersebut. Perubahan dalam satu transaksi (mis. delete cascade satu upload)
+    dikumpulkan dan diinvalidasi sekali setelah commit.
+    """
+    if not hasattr(_pending_komitmen, 'kancas'):
+        _pending_komitmen.kancas = {}
+    _pending_komitmen.kancas.setdefault(instance.periode, set()).add(instance.kode_kanca)
+    transaction.on_commit(_flush_komitmen_invalidation)
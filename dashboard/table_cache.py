@@ -0,0 +1,458 @@
+"""
+Cache lintas request untuk tabel metric dan summary dashboard.
+
+Output build_metric_tables / build_summary_konsol_table hanya berubah jika
+data tanggal kolomnya (A-E) atau komitmen bulan tanggal E berubah. Setiap
+tanggal LW321 dan setiap bulan komitmen punya token versi di cache; key
+tabel menyertakan token semua dependensinya, sehingga invalidasi cukup
+mengganti token tanggal/bulan yang tersentuh (entry lama tidak pernah cocok
+lagi dan kedaluwarsa sendiri).
+
+Token LW321 diganti setiap kali fact table harian untuk tanggal tersebut
+dibangun ulang atau dihapus (lihat dashboard.aggregates), token komitmen
+diganti saat komitmen disimpan, diedit, atau dihapus. Summary Konsol per
+KANCA hanya memakai token komitmen KANCA tersebut, sehingga penyimpanan yang
+mengubah sebagian KANCA tidak menginvalidasi KANCA lain. Versi snapshot
+uker_master ikut masuk key, dan perubahan uker_master menginvalidasi semua
+tabel (dashboard.signals).
+
+Setiap tabel yang dibangun juga disimpan ke ProcessedData sehingga tetap
+tersedia setelah entry cache kedaluwarsa; invalidasi menghapus baris
+ProcessedData yang kolom A-E-nya memakai tanggal yang berubah. Setelah
+upload, warm_dashboard_tables membangun semua halaman untuk tanggal baru
+di background (dashboard.tasks).
+
+Frame timeseries (dashboard.timeseries) di-cache per (granularity, segment,
+kanca) untuk seluruh histori, dengan satu token versi yang diganti setiap
+kali ada tanggal LW321 yang berubah.
+
+Snapshot komitmen (dashboard.formulas.komitmen_helper.KomitmenSnapshot) di-cache
+per bulan memakai token komitmen bulan tersebut, sehingga hanya dibangun ulang
+saat KomitmenData bulan itu disimpan, diedit, atau dihapus.
+"""
+import hashlib
+import logging
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from .models import ProcessedData
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'dashboard:tables'
+
+# Range delete lebih panjang dari ini dianggap "semua data berubah"
+MAX_INVALIDATE_DAYS = 400
+
+# ProcessedData.data_type untuk tabel yang disimpan
+METRIC_TABLES_TYPE = 'metric_tables'
+SUMMARY_KONSOL_TYPE = 'summary_konsol'
+
+
+def _get_cache():
+    return caches[getattr(settings, 'DASHBOARD_TABLE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'DASHBOARD_TABLE_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def _global_version_key():
+    return f'{KEY_PREFIX}:version:all'
+
+
+def _date_version_key(value):
+    return f'{KEY_PREFIX}:version:lw321:{value.isoformat()}'
+
+
+def _komitmen_version_key(year, month):
+    return f'{KEY_PREFIX}:version:komitmen:{year:04d}-{month:02d}'
+
+
+def _komitmen_kanca_version_key(year, month, kode_kanca):
+    return f'{KEY_PREFIX}:version:komitmen:{year:04d}-{month:02d}:kanca:{kode_kanca}'
+
+
+def _komitmen_all_kanca_version_key(year, month):
+    """Diganti saat komitmen seluruh KANCA bulan tersebut dianggap berubah."""
+    return f'{KEY_PREFIX}:version:komitmen:{year:04d}-{month:02d}:kanca:*'
+
+
+def _timeseries_version_key():
+    return f'{KEY_PREFIX}:version:timeseries'
+
+
+def _get_versions(keys):
+    """Token versi untuk setiap key; key yang belum ada (atau ter-evict) dibuatkan token baru."""
+    cache = _get_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def _bump(keys):
+    if not keys:
+        return
+    try:
+        _get_cache().set_many({key: uuid.uuid4().hex for key in keys}, None)
+    except Exception:
+        logger.exception(f"Gagal invalidasi cache tabel dashboard ({len(keys)} key)")
+
+
+def _version_digest(parts, date_columns, kode_kanca=None):
+    """
+    Digest parameter tabel + token versi dependensinya (tanggal A-E, komitmen bulan E, uker_master).
+    Tabel satu KANCA (kode_kanca) hanya bergantung pada token komitmen KANCA tersebut.
+    """
+    from .formulas.uker_mapping import get_uker_hierarchy
+
+    dates = sorted({column['date'] for column in date_columns.values()})
+    komitmen_date = date_columns['E']['date']
+    version_keys = [_global_version_key()]
+    version_keys += [_date_version_key(value) for value in dates]
+    if kode_kanca is None:
+        version_keys.append(_komitmen_version_key(komitmen_date.year, komitmen_date.month))
+    else:
+        version_keys.append(_komitmen_all_kanca_version_key(komitmen_date.year, komitmen_date.month))
+        version_keys.append(_komitmen_kanca_version_key(komitmen_date.year, komitmen_date.month, kode_kanca))
+
+    params = ['' if part is None else str(part) for part in parts]
+    params.append(get_uker_hierarchy().version)
+    return hashlib.md5('|'.join(params + _get_versions(version_keys)).encode()).hexdigest()
+
+
+def _encode(value):
+    """Ubah output tabel ke bentuk JSON (Decimal dan date diberi tag supaya tipenya kembali utuh)."""
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(item) for item in value]
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, date):
+        return {'__date__': value.isoformat()}
+    return value
+
+
+def _decode(value):
+    if isinstance(value, dict):
+        if len(value) == 1 and '__decimal__' in value:
+            return Decimal(value['__decimal__'])
+        if len(value) == 1 and '__date__' in value:
+            return date.fromisoformat(value['__date__'])
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _load_processed(stored, hierarchy_version):
+    """
+    Tabel tersimpan, hanya jika dibangun dengan versi hierarki yang sama. Proses yang
+    snapshot uker_master-nya belum ter-refresh bisa menyimpan tabel dengan hierarki
+    lama setelah invalidate_all_tables; baris seperti itu tidak dipakai lagi.
+    """
+    processed = ProcessedData.objects.filter(
+        data_type=stored[0], sub_type=stored[1], date=stored[2],
+        hierarchy_version=hierarchy_version,
+    ).values_list('processed_json', flat=True).first()
+    if processed is None:
+        return None
+    return _decode(processed)
+
+
+def _save_processed(stored, result, hierarchy_version):
+    ProcessedData.objects.update_or_create(
+        data_type=stored[0], sub_type=stored[1], date=stored[2],
+        defaults={'processed_json': _encode(result), 'hierarchy_version': hierarchy_version},
+    )
+
+
+def _get_or_build(kind, slug, parts, date_columns, stored, builder, kode_kanca=None):
+    """
+    Urutan: cache -> ProcessedData -> bangun ulang.
+    stored = (data_type, sub_type, date) baris ProcessedData untuk tabel ini.
+    """
+    from .formulas.uker_mapping import get_uker_hierarchy
+
+    hierarchy_version = get_uker_hierarchy().version
+    try:
+        cache = _get_cache()
+        digest = _version_digest(parts, date_columns, kode_kanca)
+        key = f'{KEY_PREFIX}:{kind}:{slug}:{digest}'
+        result = cache.get(key)
+    except Exception:
+        # Cache backend tidak tersedia (mis. Redis mati): bangun langsung
+        logger.exception("Cache tabel dashboard tidak tersedia")
+        return builder()
+    if result is not None:
+        return result
+
+    result = _load_processed(stored, hierarchy_version)
+    if result is None:
+        result = builder()
+        # Data berubah selama tabel dibangun: jangan simpan hasil yang mungkin sudah basi
+        if _version_digest(parts, date_columns, kode_kanca) != digest:
+            return result
+        try:
+            _save_processed(stored, result, hierarchy_version)
+            # Invalidasi di antara pengecekan di atas dan save sudah menghapus ProcessedData
+            # lebih dulu: cek ulang, dan buang baris yang baru disimpan jika versinya berubah
+            if _version_digest(parts, date_columns, kode_kanca) != digest:
+                ProcessedData.objects.filter(data_type=stored[0], sub_type=stored[1], date=stored[2]).delete()
+                return result
+        except Exception:
+            logger.exception(f"Gagal menyimpan tabel {slug} ke ProcessedData")
+
+    try:
+        cache.set(key, result, _timeout())
+    except Exception:
+        logger.exception("Gagal menyimpan tabel dashboard ke cache")
+    return result
+
+
+def get_cached_metric_tables(slug, selected_date, segment_filter='SMALL', metric_field='os', kol_adk_filter=None):
+    """build_metric_tables dengan cache, key (slug, segment, metric, kol_adk, selected_date)."""
+    from .formulas.table_builder import build_metric_tables, get_date_columns
+
+    return _get_or_build(
+        'metric',
+        slug,
+        [segment_filter, metric_field, kol_adk_filter, selected_date.isoformat()],
+        get_date_columns(selected_date),
+        (METRIC_TABLES_TYPE, slug or '', selected_date),
+        lambda: build_metric_tables(selected_date, segment_filter, metric_field, kol_adk_filter),
+    )
+
+
+def get_cached_summary_konsol_table(slug, date_columns, kode_kanca_filter=None):
+    """build_summary_konsol_table dengan cache, key (slug, selected_date, kanca)."""
+    from .formulas.table_builder import build_summary_konsol_table
+
+    return _get_or_build(
+        'summary',
+        slug,
+        [date_columns['E']['date'].isoformat(), kode_kanca_filter],
+        date_columns,
+        (SUMMARY_KONSOL_TYPE, 'ALL' if kode_kanca_filter is None else str(kode_kanca_filter), date_columns['E']['date']),
+        lambda: build_summary_konsol_table(date_columns, kode_kanca_filter),
+        kode_kanca=kode_kanca_filter or None,
+    )
+
+
+def _filter_param(values):
+    return '*' if values is None else ','.join(sorted(str(value) for value in values))
+
+
+def get_cached_timeseries(granularity, segments=None, kancas=None):
+    """build_timeseries dengan cache, key (granularity, segments, kancas); None = semua."""
+    from .timeseries import build_timeseries
+
+    def build():
+        return build_timeseries(granularity, segments, kancas)
+
+    params = [granularity, _filter_param(segments), _filter_param(kancas)]
+    try:
+        cache = _get_cache()
+        versions = _get_versions([_global_version_key(), _timeseries_version_key()])
+        digest = hashlib.md5('|'.join(params + versions).encode()).hexdigest()
+        key = f'{KEY_PREFIX}:timeseries:{granularity}:{digest}'
+        frame = cache.get(key)
+    except Exception:
+        logger.exception("Cache timeseries dashboard tidak tersedia")
+        return build()
+    if frame is not None:
+        return frame
+
+    frame = build()
+    try:
+        # Data berubah selama frame dibangun: jangan simpan hasil yang mungkin sudah basi
+        if _get_versions([_global_version_key(), _timeseries_version_key()]) == versions:
+            cache.set(key, frame, _timeout())
+    except Exception:
+        logger.exception("Gagal menyimpan timeseries dashboard ke cache")
+    return frame
+
+
+def get_cached_komitmen_snapshot(year, month):
+    """build_komitmen_snapshot dengan cache, key (bulan, versi uker_master)."""
+    from .formulas.komitmen_helper import build_komitmen_snapshot
+    from .formulas.uker_mapping import get_uker_hierarchy
+
+    def build():
+        return build_komitmen_snapshot(year, month)
+
+    # Sum regional bergantung pada daftar KANCA di hierarki
+    params = [f'{year:04d}-{month:02d}', str(get_uker_hierarchy().version)]
+    version_keys = [_global_version_key(), _komitmen_version_key(year, month)]
+    try:
+        cache = _get_cache()
+        versions = _get_versions(version_keys)
+        digest = hashlib.md5('|'.join(params + versions).encode()).hexdigest()
+        key = f'{KEY_PREFIX}:komitmen:{year:04d}-{month:02d}:{digest}'
+        snapshot = cache.get(key)
+    except Exception:
+        logger.exception("Cache snapshot komitmen tidak tersedia")
+        return build()
+    if snapshot is not None:
+        return snapshot
+
+    snapshot = build()
+    try:
+        # Komitmen berubah selama snapshot dibangun: jangan simpan hasil yang mungkin sudah basi
+        if _get_versions(version_keys) == versions:
+            cache.set(key, snapshot, _timeout())
+    except Exception:
+        logger.exception("Gagal menyimpan snapshot komitmen ke cache")
+    return snapshot
+
+
+def _month_end(value):
+    return (value.replace(day=1) + relativedelta(months=1)) - timedelta(days=1)
+
+
+def _dependent_ranges(value):
+    """
+    Range tanggal terpilih (kolom E) yang kolom A-E-nya memakai tanggal value
+    (lihat get_date_columns): E itu sendiri, H+1, tanggal sama bulan depan,
+    seluruh bulan depan jika value akhir bulan, seluruh tahun depan jika 31 Desember.
+    """
+    next_day = value + timedelta(days=1)
+    next_month = value + relativedelta(months=1)
+    ranges = [(value, next_day), (next_month, next_month)]
+    if next_day.day == 1:
+        ranges.append((next_day, _month_end(next_day)))
+    if value.month == 12 and value.day == 31:
+        ranges.append((next_day, date(value.year + 1, 12, 31)))
+    return ranges
+
+
+def _delete_processed(ranges, summary_sub_types=None):
+    """
+    Hapus tabel tersimpan untuk tanggal terpilih di dalam ranges (digabung dulu).
+    summary_sub_types membatasi Summary Konsol yang ikut dihapus ('ALL' / kode KANCA); None = semua.
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + timedelta(days=1):
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if not merged:
+        return
+
+    condition = Q()
+    for start, end in merged:
+        condition |= Q(date__range=(start, end))
+    if summary_sub_types is None:
+        table_condition = Q(data_type__in=[METRIC_TABLES_TYPE, SUMMARY_KONSOL_TYPE])
+    else:
+        table_condition = Q(data_type=METRIC_TABLES_TYPE) | Q(data_type=SUMMARY_KONSOL_TYPE, sub_type__in=summary_sub_types)
+    try:
+        ProcessedData.objects.filter(condition, table_condition).delete()
+    except Exception:
+        logger.exception("Gagal menghapus tabel dashboard tersimpan (ProcessedData)")
+
+
+def invalidate_lw321_dates(dates):
+    """Invalidasi tabel yang memakai salah satu tanggal LW321 di dates."""
+    dates = {value for value in dates if value is not None}
+    if dates:
+        _bump([_date_version_key(value) for value in dates] + [_timeseries_version_key()])
+    _delete_processed([item for value in dates for item in _dependent_ranges(value)])
+
+
+def invalidate_lw321_range(date_from, date_to):
+    """Invalidasi tabel untuk tanggal di antara date_from dan date_to (inklusif)."""
+    days = (date_to - date_from).days + 1
+    if days > MAX_INVALIDATE_DAYS:
+        invalidate_all_tables()
+        return
+    invalidate_lw321_dates(date_from + timedelta(days=offset) for offset in range(max(days, 0)))
+
+
+def invalidate_komitmen_periode(periode, kode_kancas=None):
+    """
+    Invalidasi tabel yang memakai komitmen bulan periode (date).
+
+    kode_kancas: KANCA yang komitmennya berubah (None = semua). Tabel yang memuat
+    semua KANCA (halaman metric, Summary Konsol RO) selalu ikut diinvalidasi,
+    Summary Konsol KANCA lain tetap dipakai.
+    """
+    keys = [_komitmen_version_key(periode.year, periode.month)]
+    if kode_kancas is None:
+        keys.append(_komitmen_all_kanca_version_key(periode.year, periode.month))
+        summary_sub_types = None
+    else:
+        kode_kancas = sorted({int(kode_kanca) for kode_kanca in kode_kancas})
+        keys += [_komitmen_kanca_version_key(periode.year, periode.month, kode_kanca) for kode_kanca in kode_kancas]
+        summary_sub_types = ['ALL'] + [str(kode_kanca) for kode_kanca in kode_kancas]
+    _bump(keys)
+    _delete_processed([(periode.replace(day=1), _month_end(periode))], summary_sub_types)
+
+
+def invalidate_all_tables():
+    """Invalidasi semua tabel (mis. setelah truncate LW321)."""
+    _bump([_global_version_key()])
+    try:
+        ProcessedData.objects.filter(data_type__in=[METRIC_TABLES_TYPE, SUMMARY_KONSOL_TYPE]).delete()
+    except Exception:
+        logger.exception("Gagal menghapus tabel dashboard tersimpan (ProcessedData)")
+
+
+def warm_dashboard_tables(dates):
+    """
+    Bangun tabel semua halaman metric (dan Summary Konsol RO) untuk setiap tanggal,
+    lalu simpan ke cache dan ProcessedData. Tanggal terbaru dikerjakan lebih dulu.
+
+    Returns:
+        int: jumlah tabel yang dibangun / diperbarui
+    """
+    from .formulas.memo import memoization_scope
+    from .formulas.metric_handlers import METRIC_TABLE_PAGES
+    from .formulas.table_builder import get_date_columns
+    from .navigation import METRIC_PAGES
+
+    max_dates = getattr(settings, 'DASHBOARD_WARM_MAX_DATES', 5)
+    dates = sorted({value for value in dates if value is not None}, reverse=True)[:max_dates]
+
+    built = 0
+    for value in dates:
+        # Lookup komitmen dipakai bersama oleh semua halaman di tanggal yang sama
+        with memoization_scope():
+            for slug in METRIC_PAGES:
+                if slug in METRIC_TABLE_PAGES:
+                    segment_filter, metric_field = METRIC_TABLE_PAGES[slug]
+                    get_cached_metric_tables(slug, value, segment_filter, metric_field)
+                elif slug == 'summary-konsol':
+                    get_cached_summary_konsol_table(slug, get_date_columns(value))
+                else:
+                    continue
+                built += 1
+        logger.info(f"Tabel dashboard untuk {value} siap ({built} tabel)")
+    return built
+
+
+def schedule_dashboard_warmup(dates):
+    """
+    Kirim task warm-up tabel dashboard ke Celery setelah upload selesai.
+    Broker tidak tersedia tidak menggagalkan upload (tabel dibangun saat halaman dibuka).
+    """
+    from .tasks import warm_dashboard_tables_task
+
+    dates = sorted({value.isoformat() for value in dates if value is not None})
+    if not dates:
+        return
+    try:
+        warm_dashboard_tables_task.delay(dates)
+    except Exception:
+        logger.exception(f"Gagal menjadwalkan warm-up tabel dashboard untuk {len(dates)} tanggal")
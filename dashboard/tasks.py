@@ -0,0 +1,20 @@
+"""Background tasks for dashboard precomputation"""
+from datetime import date
+
+from celery import shared_task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name='dashboard.warm_dashboard_tables', ignore_result=True)
+def warm_dashboard_tables_task(dates):
+    """
+    Precompute tabel semua halaman metric untuk tanggal hasil upload
+    (list string YYYY-MM-DD) ke cache dan ProcessedData.
+    """
+    from .table_cache import warm_dashboard_tables
+
+    built = warm_dashboard_tables(date.fromisoformat(value) for value in dates)
+    logger.info(f"Warm-up tabel dashboard selesai: {len(dates)} tanggal, {built} tabel")
+    return built
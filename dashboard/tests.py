@@ -0,0 +1,220 @@
+"""
+Test kalkulasi tabel dashboard.
+
+calculate_changes_batch / calculate_komitmen_batch (NumPy) harus menghasilkan nilai
+yang sama dengan perhitungan per baris (calculate_changes dan rumus % Ach / Gap
+Decimal), termasuk baris total, nilai None / nol / negatif, dan nilai yang terlalu
+besar untuk int64.
+"""
+import math
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+
+from .formulas.table_builder import (
+    calculate_changes,
+    calculate_changes_batch,
+    calculate_komitmen_batch,
+    calculate_percentage_metric,
+)
+
+CHANGE_NAMES = ['DtD', 'MoM', 'MtD', 'YtD']
+
+
+def assert_float_close(test, value, expected, msg=None):
+    test.assertIsInstance(value, float, msg)
+    test.assertTrue(
+        math.isclose(value, float(expected), rel_tol=1e-12, abs_tol=1e-9),
+        f'{value!r} != {expected!r} ({msg})',
+    )
+
+
+def scalar_komitmen(E, komitmen_value, reverse=False, in_millions=True, missing_as_iferror=False):
+    """Rumus % Ach / Gap per baris (Decimal), seperti sebelum dihitung per batch."""
+    E_val = E if E is not None else Decimal('0')
+    E_value = E_val / Decimal('1000000') if in_millions else E_val
+    if komitmen_value is None or komitmen_value == 0:
+        if missing_as_iferror:
+            return Decimal('110'), E_value
+        return None, None
+
+    if reverse:
+        ratio = komitmen_value / E_value if E_value != 0 else Decimal('11')
+    else:
+        ratio = E_value / komitmen_value
+    if ratio > Decimal('1.1'):
+        pct_ach = Decimal('110')
+    elif ratio < 0:
+        pct_ach = Decimal('0')
+    else:
+        pct_ach = ratio * Decimal('100')
+    return pct_ach, E_value - komitmen_value
+
+
+class CalculateChangesBatchTest(SimpleTestCase):
+    # Kolom A-E per baris: None, nol, negatif, pecahan sen, dan perubahan dari/ke nol
+    RUPIAH_ROWS = [
+        ('1000000.00', '1500000.50', '1200000.25', '1450000.75', '1500000.50'),
+        (None, '250000.00', None, '0', '300000.00'),
+        ('0', '0', '0', '0', '0'),
+        ('-50000.10', '-25000.00', '10000.00', '-5000.05', '-7500.00'),
+        ('100.00', None, '0', None, None),
+        ('987654321.99', '123456789.01', '555555555.55', '999999999.99', '0.01'),
+    ]
+
+    def _columns(self, rows):
+        values = {col_name: [] for col_name in 'ABCDE'}
+        for row in rows:
+            for col_name, value in zip('ABCDE', row):
+                values[col_name].append(Decimal(value) if value is not None else None)
+        return values
+
+    def _scalar(self, values, index):
+        return calculate_changes(*(values[col_name][index] for col_name in 'ABCDE'))
+
+    def _scalar_total(self, values):
+        sums = {
+            col_name: sum((value or Decimal('0') for value in column), Decimal('0'))
+            for col_name, column in values.items()
+        }
+        return sums, calculate_changes(*(sums[col_name] for col_name in 'ABCDE'))
+
+    def assertChangesEqual(self, batch, expected, exact=True):
+        # Persentase dihitung dengan float64 (scalar: Decimal): cukup sama sampai pembulatan float
+        for name in CHANGE_NAMES:
+            if exact:
+                self.assertEqual(batch[name], expected[name], name)
+                self.assertIsInstance(batch[name], Decimal)
+            else:
+                assert_float_close(self, batch[name], expected[name], name)
+            assert_float_close(self, batch[f'{name}_pct'], expected[f'{name}_pct'], f'{name}_pct')
+
+    def test_rupiah_rows_and_total_match_scalar(self):
+        values = self._columns(self.RUPIAH_ROWS)
+        row_changes, totals = calculate_changes_batch(values)
+
+        self.assertEqual(len(row_changes), len(self.RUPIAH_ROWS))
+        for index, changes in enumerate(row_changes):
+            self.assertChangesEqual(changes, self._scalar(values, index))
+
+        sums, expected_total = self._scalar_total(values)
+        for col_name in 'ABCDE':
+            self.assertEqual(totals[col_name], sums[col_name], col_name)
+        self.assertChangesEqual(totals, expected_total)
+
+    def test_values_beyond_int64_stay_exact(self):
+        # > 2**62 / VALUE_SCALE: jatuh ke array object (integer Python)
+        rows = [
+            ('46116860184273879.03', '46116860184273880.00', '1.01', None, '46116860184273879.04'),
+            ('92233720368547758.07', '-92233720368547758.08', '0', '5.00', '92233720368547758.09'),
+        ] + self.RUPIAH_ROWS
+        values = self._columns(rows)
+        row_changes, totals = calculate_changes_batch(values)
+
+        for index, changes in enumerate(row_changes):
+            self.assertChangesEqual(changes, self._scalar(values, index))
+        sums, expected_total = self._scalar_total(values)
+        self.assertEqual(totals['E'], sums['E'])
+        self.assertChangesEqual(totals, expected_total)
+
+    def test_sum_overflowing_int64_stays_exact(self):
+        # Setiap nilai muat di int64, tapi jumlah kolom (baris total) tidak
+        big = '40000000000000000.00'
+        values = self._columns([(big, big, big, big, big)] * 4)
+        _, totals = calculate_changes_batch(values)
+
+        sums, expected_total = self._scalar_total(values)
+        self.assertEqual(totals['E'], sums['E'])
+        self.assertChangesEqual(totals, expected_total)
+
+    def test_percentage_metric_with_separate_totals(self):
+        rows = [
+            ('1.25', '2.50', None, '0', '3.75'),
+            ('0', '10.125', '7.5', '-1.5', '0'),
+            (None, None, None, None, '4.4'),
+        ]
+        values = self._columns(rows)
+        totals_input = {
+            col_name: calculate_percentage_metric(Decimal(metric), Decimal('80'))
+            for col_name, metric in zip('ABCDE', ['3', '5', '6', '1', '9'])
+        }
+        row_changes, totals = calculate_changes_batch(values, totals_input, scale=None)
+
+        for index, changes in enumerate(row_changes):
+            self.assertChangesEqual(changes, self._scalar(values, index), exact=False)
+        # Total persentase dipakai apa adanya (bukan jumlah kolom)
+        for col_name in 'ABCDE':
+            self.assertEqual(totals[col_name], totals_input[col_name])
+        expected_total = calculate_changes(*(totals_input[col_name] for col_name in 'ABCDE'))
+        self.assertChangesEqual(totals, expected_total, exact=False)
+
+    def test_percentage_metric_summed_totals(self):
+        values = self._columns([('1.5', '2.25', '0', None, '3.1'), ('0.1', '0.2', '0.3', '0.4', '0.5')])
+        _, totals = calculate_changes_batch(values, scale=None)
+
+        sums, expected_total = self._scalar_total(values)
+        for col_name in 'ABCDE':
+            self.assertIsInstance(totals[col_name], Decimal)
+            assert_float_close(self, float(totals[col_name]), sums[col_name], col_name)
+        self.assertChangesEqual(totals, expected_total, exact=False)
+
+    def test_empty_table(self):
+        row_changes, totals = calculate_changes_batch({col_name: [] for col_name in 'ABCDE'})
+
+        self.assertEqual(row_changes, [])
+        self.assertChangesEqual(totals, calculate_changes(*[Decimal('0')] * 5))
+
+
+class CalculateKomitmenBatchTest(SimpleTestCase):
+    # (E rupiah penuh, komitmen juta rupiah)
+    RUPIAH_ROWS = [
+        ('1500000000.00', '1000.5'),      # rasio > 1.1 -> 110%
+        ('950000000.00', '1000'),         # rasio normal
+        ('-20000000.00', '500'),          # rasio negatif -> 0%
+        ('0', '750.25'),                  # E nol
+        ('123456789.12', None),           # tanpa komitmen
+        ('5000000.00', '0'),              # komitmen nol
+        (None, '10'),                     # E kosong
+        ('99999999999999999.99', '12345.6789012345'),  # di luar int64 setelah di-skala
+    ]
+
+    def _run(self, rows, **kwargs):
+        E_values = [Decimal(E) if E is not None else None for E, _ in rows]
+        komitmen_values = [Decimal(komitmen) if komitmen is not None else None for _, komitmen in rows]
+        pct_list, gap_list = calculate_komitmen_batch(E_values, komitmen_values, **kwargs)
+        self.assertEqual(len(pct_list), len(rows))
+        self.assertEqual(len(gap_list), len(rows))
+
+        for index, (E, komitmen_value) in enumerate(zip(E_values, komitmen_values)):
+            expected_pct, expected_gap = scalar_komitmen(E, komitmen_value, **kwargs)
+            if expected_pct is None:
+                self.assertIsNone(pct_list[index], index)
+                self.assertIsNone(gap_list[index], index)
+                continue
+            assert_float_close(self, pct_list[index], expected_pct, index)
+            if kwargs.get('in_millions', True):
+                self.assertEqual(gap_list[index], expected_gap, index)
+            else:
+                assert_float_close(self, gap_list[index], expected_gap, index)
+
+    def test_rupiah(self):
+        self._run(self.RUPIAH_ROWS)
+
+    def test_rupiah_reversed(self):
+        self._run(self.RUPIAH_ROWS, reverse=True)
+
+    def test_rupiah_missing_as_iferror(self):
+        self._run(self.RUPIAH_ROWS, missing_as_iferror=True)
+
+    def test_rupiah_reversed_missing_as_iferror(self):
+        self._run(self.RUPIAH_ROWS, reverse=True, missing_as_iferror=True)
+
+    def test_percentage(self):
+        rows = [('3.5', '2.75'), ('0', '1.5'), ('-0.5', '4'), ('2.2', None), ('1.0', '0'), (None, '0.9')]
+        for reverse in (False, True):
+            for missing_as_iferror in (False, True):
+                with self.subTest(reverse=reverse, missing_as_iferror=missing_as_iferror):
+                    self._run(rows, reverse=reverse, in_millions=False, missing_as_iferror=missing_as_iferror)
+
+    def test_empty(self):
+        self.assertEqual(calculate_komitmen_batch([], []), ([], []))
@@ -0,0 +1,156 @@
+"""
+Engine query untuk halaman timeseries dashboard.
+
+Semua grafik timeseries (timeseries-os, timeseries-os-dpk-npl-lar,
+timeseries-baki-debit-uker, timeseries-bulanan, timeseries-harian) membaca
+TimeseriesFrame: matriks NumPy (periode x metric) hasil satu query grouped.
+
+- granularity 'day'  : SUM per periode_date dari fact table harian (LW321DailyAggregate)
+- granularity 'month': SUM per tanggal akhir bulan dari rollup bulanan (LW321MonthlyAggregate)
+
+Frame selalu dibangun untuk seluruh histori dan semua metric TIMESERIES_METRICS,
+sehingga halaman dengan filter segment/kanca yang sama memakai entry cache yang
+sama (dashboard.table_cache.get_cached_timeseries); filter tanggal, tahun, bulan
+dan pilihan metric dilakukan di NumPy.
+"""
+from datetime import date
+
+import numpy as np
+from django.db.models import Sum
+
+from .aggregates import MONTHLY_SUM_FIELDS, get_end_of_month_totals
+from .models import LW321DailyAggregate
+
+# Metric yang tersedia di kedua granularity
+TIMESERIES_METRICS = tuple(MONTHLY_SUM_FIELDS)
+
+GRANULARITY_DAY = 'day'
+GRANULARITY_MONTH = 'month'
+GRANULARITIES = (GRANULARITY_DAY, GRANULARITY_MONTH)
+
+
+class TimeseriesFrame:
+    """
+    Deret waktu padat: dates (datetime64[D], urut naik) x metrics (float64).
+
+    Untuk granularity 'month', dates berisi tanggal akhir bulan yang dipakai
+    (tanggal terakhir yang ada untuk grup terpilih di bulan tersebut).
+    """
+
+    def __init__(self, granularity, dates, metrics, values):
+        self.granularity = granularity
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.metrics = tuple(metrics)
+        self.values = np.asarray(values, dtype=np.float64).reshape(len(self.dates), len(self.metrics))
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def years(self):
+        return self.dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+    @property
+    def months(self):
+        return self.dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+    @property
+    def days(self):
+        return (self.dates - self.dates.astype('datetime64[M]')).astype(np.int64) + 1
+
+    def date_list(self):
+        """dates sebagai list datetime.date."""
+        return self.dates.astype(object).tolist()
+
+    def column(self, metric):
+        return self.values[:, self.metrics.index(metric)]
+
+    def select(self, metrics=None, date_from=None, date_to=None, years=None, months=None):
+        """Frame baru berisi baris yang lolos filter dan kolom metrics (None = semua)."""
+        mask = np.ones(len(self.dates), dtype=bool)
+        if date_from is not None:
+            mask &= self.dates >= np.datetime64(date_from, 'D')
+        if date_to is not None:
+            mask &= self.dates <= np.datetime64(date_to, 'D')
+        if years is not None:
+            mask &= np.isin(self.years, list(years))
+        if months is not None:
+            mask &= np.isin(self.months, list(months))
+
+        metrics = self.metrics if metrics is None else tuple(metrics)
+        columns = [self.metrics.index(metric) for metric in metrics]
+        return TimeseriesFrame(self.granularity, self.dates[mask], metrics, self.values[mask][:, columns])
+
+    def by_month_and_day(self, metric):
+        """
+        {bulan: list 31 nilai (hari 1-31)} untuk grafik harian per bulan; hari tanpa
+        data = None. Hanya bulan yang punya data yang muncul.
+        """
+        column = self.column(metric)
+        months = self.months
+        days = self.days
+        grid = {}
+        for month in np.unique(months).tolist():
+            row = np.full(31, np.nan)
+            in_month = months == month
+            row[days[in_month] - 1] = column[in_month]
+            grid[month] = [None if np.isnan(value) else value for value in row.tolist()]
+        return grid
+
+
+def build_timeseries(granularity, segments=None, kancas=None):
+    """
+    Bangun TimeseriesFrame seluruh histori untuk semua TIMESERIES_METRICS (satu query).
+
+    Args:
+        granularity: 'day' atau 'month'
+        segments / kancas: list filter (None = semua)
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularity tidak dikenal: {granularity}")
+
+    if granularity == GRANULARITY_MONTH:
+        rows = get_end_of_month_totals(segments=segments, kancas=kancas)
+        dates = [eom_date for eom_date, _ in rows]
+        values = [[totals[metric] or 0 for metric in TIMESERIES_METRICS] for _, totals in rows]
+    else:
+        qs = LW321DailyAggregate.objects.all()
+        if segments is not None:
+            qs = qs.filter(segment__in=segments)
+        if kancas is not None:
+            qs = qs.filter(kanca__in=kancas)
+        rows = list(
+            qs.values('periode_date')
+            .annotate(**{metric: Sum(metric) for metric in TIMESERIES_METRICS})
+            .order_by('periode_date')
+        )
+        dates = [row['periode_date'] for row in rows]
+        values = [[row[metric] or 0 for metric in TIMESERIES_METRICS] for row in rows]
+
+    # Decimal -> float per nilai (sama seperti float(Decimal) di grafik sebelumnya)
+    values = np.array([[float(value) for value in row] for row in values], dtype=np.float64)
+    return TimeseriesFrame(granularity, dates, TIMESERIES_METRICS, values)
+
+
+def get_timeseries(metrics, granularity, date_from=None, date_to=None, segments=None, kancas=None,
+                   years=None, months=None):
+    """
+    TimeseriesFrame untuk metrics pada granularity tertentu, dibatasi range tanggal
+    (inklusif), tahun, bulan, segment dan kanca. None = tanpa filter.
+
+    Frame seluruh histori diambil dari cache (per granularity + segment + kanca),
+    lalu dipotong di NumPy.
+    """
+    from .table_cache import get_cached_timeseries
+
+    for metric in metrics:
+        if metric not in TIMESERIES_METRICS:
+            raise ValueError(f"Metric timeseries tidak dikenal: {metric}")
+
+    frame = get_cached_timeseries(granularity, segments, kancas)
+    return frame.select(metrics, date_from=date_from, date_to=date_to, years=years, months=months)
+
+
+def year_range(year):
+    """(1 Januari, 31 Desember) tahun year, untuk argumen date_from / date_to."""
+    return date(year, 1, 1), date(year, 12, 31)
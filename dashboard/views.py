@@ -1,16 +1,11 @@
 from django.http import Http404
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum
 from django.core.serializers.json import DjangoJSONEncoder
 import json
-from .models import LW321
-from .formulas.calculations import annotate_metrics
-from .formulas.segmentation import get_segment_annotation
+from .models import LW321, LW321DailyAggregate
 from .navigation import METRIC_PAGES
 from datetime import datetime
-from django.db.models import DateField, Value, F
-from django.db.models.functions import Cast, Concat, Substr
 import math
 
 def get_quarter(date_obj):
@@ -91,15 +86,12 @@ def metric_page_view(request, slug):
     #       Contoh: 31 Oktober 2025, 30 November 2025, 31 Desember 2025
     # =================================================================================
     if slug == 'timeseries-os':
-        # 1. Base Query & Annotations
-        qs = LW321.objects.all()
-        qs = qs.annotate(segment=get_segment_annotation())
-        qs = annotate_metrics(qs)
+        from .timeseries import GRANULARITY_MONTH, get_timeseries
 
-        # 2. Get Filter Options (Distinct Kanca)
-        kanca_list = LW321.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
+        # 1. Get Filter Options (Distinct Kanca)
+        kanca_list = LW321DailyAggregate.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
 
-        # 3. Handle Filters (Multi-select)
+        # 2. Handle Filters (Multi-select)
         selected_segments = request.GET.getlist('segment')
         selected_kancas = request.GET.getlist('kanca')
 
@@ -108,76 +100,20 @@ def metric_page_view(request, slug):
         if not selected_kancas:
             selected_kancas = ['ALL']
 
-        if 'ALL' not in selected_segments:
-            qs = qs.filter(segment__in=selected_segments)
-
-        if 'ALL' not in selected_kancas:
-            qs = qs.filter(kanca__in=selected_kancas)
-
-        # 4. Group by MONTH & YEAR, lalu ambil hanya tanggal AKHIR BULAN
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        from django.db.models import Max
-
-        # Step 4a: Konversi periode ke date dan extract year, month, day
-        qs_with_date = qs.annotate(
-            # Ubah DD/MM/YYYY → YYYY-MM-DD
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-
-        # Step 4b: Cari tanggal maksimum (akhir bulan) per year-month
-        max_days = (
-            qs_with_date
-            .values('year', 'month')
-            .annotate(max_day=Max('day'))
-            .order_by('year', 'month')
+        # 3. Total OS per tanggal AKHIR BULAN (timeseries engine, granularity bulanan)
+        frame = get_timeseries(
+            ['os'], GRANULARITY_MONTH,
+            segments=None if 'ALL' in selected_segments else selected_segments,
+            kancas=None if 'ALL' in selected_kancas else selected_kancas,
         )
 
-        # Step 4c: Buat list of (year, month, max_day) untuk filter
-        end_of_month_dates = []
-        for row in max_days:
-            end_of_month_dates.append({
-                'year': row['year'],
-                'month': row['month'],
-                'day': row['max_day'],
-            })
-
-        # Step 4d: Filter hanya data yang ada di tanggal akhir bulan, lalu sum OS
-        from django.db.models import Q
-
         labels = []
-        data_values = []
-
-        for eom in end_of_month_dates:
-            yr = eom['year']
-            mo = eom['month']
-            dy = eom['day']
-
-            # Filter data hanya untuk tanggal akhir bulan ini
-            eom_qs = qs_with_date.filter(year=yr, month=mo, day=dy)
-            total_os = eom_qs.aggregate(total=Sum('os'))['total'] or 0
-
+        for eom_date in frame.date_list():
             # Format label
-            try:
-                dt = datetime(yr, mo, dy)
-                month_name = dt.strftime('%B')   # January, February, ...
-                label = f"{month_name} {yr}"
-            except Exception:
-                label = f"{mo}-{yr}"
+            month_name = eom_date.strftime('%B')   # January, February, ...
+            labels.append(f"{month_name} {eom_date.year}")
 
-            labels.append(label)
-            data_values.append(float(total_os))
+        data_values = frame.column('os').tolist()
 
         chart_data = {
             'labels': labels,
@@ -211,15 +147,12 @@ def metric_page_view(request, slug):
     #       Metrics: OS, DPK, NPL, LAR (Stacked Vertical Bar Chart)
     # =================================================================================
     if slug == 'timeseries-os-dpk-npl-lar':
-        # 1. Base Query & Annotations
-        qs = LW321.objects.all()
-        qs = qs.annotate(segment=get_segment_annotation())
-        qs = annotate_metrics(qs)
+        from .timeseries import GRANULARITY_MONTH, get_timeseries
 
-        # 2. Get Filter Options (Distinct Kanca)
-        kanca_list = LW321.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
+        # 1. Get Filter Options (Distinct Kanca)
+        kanca_list = LW321DailyAggregate.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
 
-        # 3. Handle Filters (Multi-select)
+        # 2. Handle Filters (Multi-select)
         selected_segments = request.GET.getlist('segment')
         selected_kancas = request.GET.getlist('kanca')
 
@@ -228,87 +161,23 @@ def metric_page_view(request, slug):
         if not selected_kancas:
             selected_kancas = ['ALL']
 
-        if 'ALL' not in selected_segments:
-            qs = qs.filter(segment__in=selected_segments)
-
-        if 'ALL' not in selected_kancas:
-            qs = qs.filter(kanca__in=selected_kancas)
-
-        # 4. Group by MONTH & YEAR, lalu ambil hanya tanggal AKHIR BULAN
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        from django.db.models import Max
-
-        # Step 4a: Konversi periode ke date dan extract year, month, day
-        qs_with_date = qs.annotate(
-            # Ubah DD/MM/YYYY → YYYY-MM-DD
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
+        # 3. Semua metrics per tanggal AKHIR BULAN (timeseries engine, granularity bulanan)
+        frame = get_timeseries(
+            ['os', 'sml', 'npl', 'lar'], GRANULARITY_MONTH,
+            segments=None if 'ALL' in selected_segments else selected_segments,
+            kancas=None if 'ALL' in selected_kancas else selected_kancas,
         )
 
-        # Step 4b: Cari tanggal maksimum (akhir bulan) per year-month
-        max_days = (
-            qs_with_date
-            .values('year', 'month')
-            .annotate(max_day=Max('day'))
-            .order_by('year', 'month')
-        )
-
-        # Step 4c: Buat list of (year, month, max_day) untuk filter
-        end_of_month_dates = []
-        for row in max_days:
-            end_of_month_dates.append({
-                'year': row['year'],
-                'month': row['month'],
-                'day': row['max_day'],
-            })
-
-        # Step 4d: Filter hanya data yang ada di tanggal akhir bulan, lalu sum metrics
         labels = []
-        os_values = []
-        dpk_values = []
-        npl_values = []
-        lar_values = []
-
-        for eom in end_of_month_dates:
-            yr = eom['year']
-            mo = eom['month']
-            dy = eom['day']
-
-            # Filter data hanya untuk tanggal akhir bulan ini
-            eom_qs = qs_with_date.filter(year=yr, month=mo, day=dy)
-            
-            # Aggregate semua metrics
-            totals = eom_qs.aggregate(
-                total_os=Sum('os'),
-                total_dpk=Sum('sml'),  # SML = DPK based on formula
-                total_npl=Sum('npl'),
-                total_lar=Sum('lar'),
-            )
-
+        for eom_date in frame.date_list():
             # Format label
-            try:
-                dt = datetime(yr, mo, dy)
-                month_name = dt.strftime('%B')   # January, February, ...
-                label = f"{month_name} {yr}"
-            except Exception:
-                label = f"{mo}-{yr}"
+            month_name = eom_date.strftime('%B')   # January, February, ...
+            labels.append(f"{month_name} {eom_date.year}")
 
-            labels.append(label)
-            os_values.append(float(totals['total_os'] or 0))
-            dpk_values.append(float(totals['total_dpk'] or 0))
-            npl_values.append(float(totals['total_npl'] or 0))
-            lar_values.append(float(totals['total_lar'] or 0))
+        os_values = frame.column('os').tolist()
+        dpk_values = frame.column('sml').tolist()  # SML = DPK based on formula
+        npl_values = frame.column('npl').tolist()
+        lar_values = frame.column('lar').tolist()
 
         # 5. Chart Data untuk Stacked Bar Chart
         chart_data = {
@@ -367,28 +236,10 @@ def metric_page_view(request, slug):
     #       Tujuan: Membandingkan posisi OS harian antar bulan
     # =================================================================================
     if slug == 'timeseries-baki-debit-uker':
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        from django.db.models import Max
+        from .timeseries import GRANULARITY_DAY, get_timeseries, year_range
         
         # 1. Get available years from data
-        qs_base = LW321.objects.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-        
-        # Get distinct years
-        available_years = list(qs_base.values_list('year', flat=True).distinct().order_by('year'))
+        available_years = [d.year for d in LW321DailyAggregate.objects.dates('periode_date', 'year')]
         
         # Get distinct months (1-12)
         available_months = [
@@ -407,7 +258,7 @@ def metric_page_view(request, slug):
         ]
         
         # Get filter options
-        kanca_list = LW321.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
+        kanca_list = LW321DailyAggregate.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
         
         # 2. Handle Filters
         selected_year = request.GET.get('year', str(available_years[-1]) if available_years else '2025')
@@ -425,47 +276,14 @@ def metric_page_view(request, slug):
         if not selected_kancas:
             selected_kancas = ['ALL']
         
-        # 3. Build base queryset with annotations
-        qs = LW321.objects.all()
-        qs = qs.annotate(segment=get_segment_annotation())
-        qs = annotate_metrics(qs)
-        
-        qs = qs.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),
-                Value('-'),
-                Substr('periode', 4, 2),
-                Value('-'),
-                Substr('periode', 1, 2),
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-        
-        # Apply year filter
-        qs = qs.filter(year=int(selected_year))
-        
-        # Apply month filter
+        # 3-4. OS per tanggal di tahun dan bulan terpilih (timeseries engine, granularity harian)
+        date_from, date_to = year_range(int(selected_year))
         selected_months_int = [int(m) for m in selected_months]
-        qs = qs.filter(month__in=selected_months_int)
-        
-        # Apply segment filter
-        if 'ALL' not in selected_segments:
-            qs = qs.filter(segment__in=selected_segments)
-        
-        # Apply kanca filter
-        if 'ALL' not in selected_kancas:
-            qs = qs.filter(kanca__in=selected_kancas)
-        
-        # 4. Aggregate data: Group by month and day, sum OS
-        chart_qs = (
-            qs.values('month', 'day')
-            .annotate(total_os=Sum('os'))
-            .order_by('month', 'day')
+        frame = get_timeseries(
+            ['os'], GRANULARITY_DAY, date_from, date_to,
+            segments=None if 'ALL' in selected_segments else selected_segments,
+            kancas=None if 'ALL' in selected_kancas else selected_kancas,
+            months=selected_months_int,
         )
         
         # 5. Prepare data structure for chart
@@ -494,24 +312,13 @@ def metric_page_view(request, slug):
             9: 'September', 10: 'October', 11: 'November', 12: 'December'
         }
         
-        # Organize data by month
-        data_by_month = {}
-        for row in chart_qs:
-            mo = row['month']
-            dy = row['day']
-            os_val = float(row['total_os'] or 0)
-            
-            if mo not in data_by_month:
-                data_by_month[mo] = {}
-            data_by_month[mo][dy] = os_val
+        # Organize data by month: {month: [31 hari, None jika tidak ada data]}
+        data_by_month = frame.by_month_and_day('os')
         
         # Build datasets for each month
         datasets = []
         for mo in sorted(data_by_month.keys()):
-            # Create array of 31 days (None for missing days)
-            day_data = []
-            for d in range(1, 32):
-                day_data.append(data_by_month[mo].get(d, None))
+            day_data = data_by_month[mo]
             
             colors = month_colors.get(mo, {'bg': 'rgba(128, 128, 128, 0.3)', 'border': 'rgba(128, 128, 128, 1)'})
             
@@ -562,26 +369,10 @@ def metric_page_view(request, slug):
     #       4 Grafik: SML, NPL, Baki Debet (OS), LAR
     # =================================================================================
     if slug == 'timeseries-bulanan':
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        from django.db.models import Max
+        from .timeseries import GRANULARITY_MONTH, get_timeseries
         
         # 1. Get available years from data
-        qs_base = LW321.objects.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-        )
-        
-        # Get distinct years
-        available_years = list(qs_base.values_list('year', flat=True).distinct().order_by('year'))
+        available_years = [d.year for d in LW321DailyAggregate.objects.dates('periode_date', 'year')]
         
         # Get distinct months (1-12)
         available_months = [
@@ -600,7 +391,7 @@ def metric_page_view(request, slug):
         ]
         
         # Get filter options
-        kanca_list = LW321.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
+        kanca_list = LW321DailyAggregate.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
         
         # 2. Handle Filters
         selected_years = request.GET.getlist('year')
@@ -621,84 +412,23 @@ def metric_page_view(request, slug):
         if not selected_kancas:
             selected_kancas = ['ALL']
         
-        # 3. Build base queryset with annotations
-        qs = LW321.objects.all()
-        qs = qs.annotate(segment=get_segment_annotation())
-        qs = annotate_metrics(qs)
-        
-        qs = qs.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),
-                Value('-'),
-                Substr('periode', 4, 2),
-                Value('-'),
-                Substr('periode', 1, 2),
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-        
-        # Apply year filter
         selected_years_int = [int(y) for y in selected_years]
-        qs = qs.filter(year__in=selected_years_int)
-        
-        # Apply month filter
         selected_months_int = [int(m) for m in selected_months]
-        qs = qs.filter(month__in=selected_months_int)
-        
-        # Apply segment filter
-        if 'ALL' not in selected_segments:
-            qs = qs.filter(segment__in=selected_segments)
         
-        # Apply kanca filter
-        if 'ALL' not in selected_kancas:
-            qs = qs.filter(kanca__in=selected_kancas)
-        
-        # 4. Get end-of-month data for each year-month combination
-        max_days = (
-            qs.values('year', 'month')
-            .annotate(max_day=Max('day'))
-            .order_by('year', 'month')
+        # 3. Total per tanggal akhir bulan (timeseries engine, granularity bulanan)
+        frame = get_timeseries(
+            ['sml', 'npl', 'os', 'lar'], GRANULARITY_MONTH,
+            segments=None if 'ALL' in selected_segments else selected_segments,
+            kancas=None if 'ALL' in selected_kancas else selected_kancas,
+            years=selected_years_int,
+            months=selected_months_int,
         )
         
-        end_of_month_dates = []
-        for row in max_days:
-            end_of_month_dates.append({
-                'year': row['year'],
-                'month': row['month'],
-                'day': row['max_day'],
-            })
-        
-        # 5. Aggregate data for each year-month at end of month
         # Structure: {year: {month: {sml, npl, os, lar}}}
         data_by_year = {}
         
-        for eom in end_of_month_dates:
-            yr = eom['year']
-            mo = eom['month']
-            dy = eom['day']
-            
-            eom_qs = qs.filter(year=yr, month=mo, day=dy)
-            totals = eom_qs.aggregate(
-                total_sml=Sum('sml'),
-                total_npl=Sum('npl'),
-                total_os=Sum('os'),
-                total_lar=Sum('lar'),
-            )
-            
-            if yr not in data_by_year:
-                data_by_year[yr] = {}
-            
-            data_by_year[yr][mo] = {
-                'sml': float(totals['total_sml'] or 0),
-                'npl': float(totals['total_npl'] or 0),
-                'os': float(totals['total_os'] or 0),
-                'lar': float(totals['total_lar'] or 0),
-            }
+        for eom_date, row in zip(frame.date_list(), frame.values.tolist()):
+            data_by_year.setdefault(eom_date.year, {})[eom_date.month] = dict(zip(frame.metrics, row))
         
         # 6. Prepare chart data for each metric
         # X-axis labels: Months (filtered)
@@ -785,28 +515,10 @@ def metric_page_view(request, slug):
     #       Filter: Mirip Timeseries Baki Debit UKER (Year radio, Month checkbox)
     # =================================================================================
     if slug == 'timeseries-harian':
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        from django.db.models import Max
+        from .timeseries import GRANULARITY_DAY, get_timeseries, year_range
         
         # 1. Get available years from data
-        qs_base = LW321.objects.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-        
-        # Get distinct years
-        available_years = list(qs_base.values_list('year', flat=True).distinct().order_by('year'))
+        available_years = [d.year for d in LW321DailyAggregate.objects.dates('periode_date', 'year')]
         
         # Get distinct months (1-12)
         available_months = [
@@ -825,7 +537,7 @@ def metric_page_view(request, slug):
         ]
         
         # Get filter options
-        kanca_list = LW321.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
+        kanca_list = LW321DailyAggregate.objects.values_list('kanca', flat=True).distinct().order_by('kanca')
         
         # 2. Handle Filters
         selected_year = request.GET.get('year', str(available_years[-1]) if available_years else '2025')
@@ -842,51 +554,14 @@ def metric_page_view(request, slug):
         if not selected_kancas:
             selected_kancas = ['ALL']
         
-        # 3. Build base queryset with annotations
-        qs = LW321.objects.all()
-        qs = qs.annotate(segment=get_segment_annotation())
-        qs = annotate_metrics(qs)
-        
-        qs = qs.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),
-                Value('-'),
-                Substr('periode', 4, 2),
-                Value('-'),
-                Substr('periode', 1, 2),
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).annotate(
-            year=ExtractYear('periode_date'),
-            month=ExtractMonth('periode_date'),
-            day=ExtractDay('periode_date'),
-        )
-        
-        # Apply year filter
-        qs = qs.filter(year=int(selected_year))
-        
-        # Apply month filter
+        # 3-4. LAR, NPL, SML per tanggal di tahun dan bulan terpilih (timeseries engine, granularity harian)
+        date_from, date_to = year_range(int(selected_year))
         selected_months_int = [int(m) for m in selected_months]
-        qs = qs.filter(month__in=selected_months_int)
-        
-        # Apply segment filter
-        if 'ALL' not in selected_segments:
-            qs = qs.filter(segment__in=selected_segments)
-        
-        # Apply kanca filter
-        if 'ALL' not in selected_kancas:
-            qs = qs.filter(kanca__in=selected_kancas)
-        
-        # 4. Aggregate data: Group by month and day, sum LAR, NPL, SML
-        chart_qs = (
-            qs.values('month', 'day')
-            .annotate(
-                total_lar=Sum('lar'),
-                total_npl=Sum('npl'),
-                total_sml=Sum('sml'),
-            )
-            .order_by('month', 'day')
+        frame = get_timeseries(
+            ['lar', 'npl', 'sml'], GRANULARITY_DAY, date_from, date_to,
+            segments=None if 'ALL' in selected_segments else selected_segments,
+            kancas=None if 'ALL' in selected_kancas else selected_kancas,
+            months=selected_months_int,
         )
         
         # 5. Prepare data structure for chart
@@ -915,35 +590,16 @@ def metric_page_view(request, slug):
             9: 'September', 10: 'October', 11: 'November', 12: 'December'
         }
         
-        # Organize data by month for each metric
-        data_by_month_lar = {}
-        data_by_month_npl = {}
-        data_by_month_sml = {}
-        
-        for row in chart_qs:
-            mo = row['month']
-            dy = row['day']
-            lar_val = float(row['total_lar'] or 0)
-            npl_val = float(row['total_npl'] or 0)
-            sml_val = float(row['total_sml'] or 0)
-            
-            if mo not in data_by_month_lar:
-                data_by_month_lar[mo] = {}
-                data_by_month_npl[mo] = {}
-                data_by_month_sml[mo] = {}
-            
-            data_by_month_lar[mo][dy] = lar_val
-            data_by_month_npl[mo][dy] = npl_val
-            data_by_month_sml[mo][dy] = sml_val
+        # Organize data by month for each metric: {month: [31 hari, None jika tidak ada data]}
+        data_by_month_lar = frame.by_month_and_day('lar')
+        data_by_month_npl = frame.by_month_and_day('npl')
+        data_by_month_sml = frame.by_month_and_day('sml')
         
         # Build datasets for each metric
         def build_datasets_for_metric(data_by_month):
             datasets = []
             for mo in sorted(data_by_month.keys()):
-                # Create array of 31 days (None for missing days)
-                day_data = []
-                for d in range(1, 32):
-                    day_data.append(data_by_month[mo].get(d, None))
+                day_data = data_by_month[mo]
                 
                 colors = month_colors.get(mo, {'bg': 'rgba(128, 128, 128, 0.3)', 'border': 'rgba(128, 128, 128, 1)'})
                 
@@ -1027,12 +683,9 @@ def metric_page_view(request, slug):
     # =================================================================================
     elif slug == 'small-ncc-os':
         from datetime import date
-        from .formulas import (
-            get_date_columns,
-            KANCA_MASTER, UKER_MASTER, KANCA_CODES, KCP_CODES
-        )
-        from .formulas.table_builder import build_konsol_table, build_kanca_only_table, build_kcp_only_table
-        # Note: annotate_metrics and get_segment_annotation already imported at top
+        from .formulas import get_date_columns
+        from .table_cache import get_cached_metric_tables
+        # Note: segment dan metrics adalah kolom tersimpan di LW321 (dihitung saat ingestion)
         
         # 1. Handle date filter
         selected_date_str = request.GET.get('selected_date', '')
@@ -1045,50 +698,18 @@ def metric_page_view(request, slug):
             selected_date = date.today()
         
         # 2. Get available dates from database
-        from django.db.models.functions import ExtractYear, ExtractMonth, ExtractDay
-        
-        qs_base = LW321.objects.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        )
-        
         available_dates = list(
-            qs_base.values_list('periode_date', flat=True)
-            .distinct()
-            .order_by('-periode_date')[:100]  # Last 100 dates
+            LW321DailyAggregate.objects.dates('periode_date', 'day', order='DESC')[:100]  # Last 100 dates
         )
         
         # 3. Get date columns info
         date_cols = get_date_columns(selected_date)
         
-        # 4. Build all tables using table_builder functions
-        konsol_table = build_konsol_table(
-            date_columns=date_cols,
-            segment_filter='SMALL NCC',
-            metric_field='os',
-            kol_adk_filter=None
-        )
-        
-        kanca_table = build_kanca_only_table(
-            date_columns=date_cols,
-            segment_filter='SMALL NCC',
-            metric_field='os',
-            kol_adk_filter=None
-        )
-        
-        kcp_table = build_kcp_only_table(
-            date_columns=date_cols,
-            segment_filter='SMALL NCC',
-            metric_field='os',
-            kol_adk_filter=None
-        )
+        # 4. Build all tables (satu grouped query untuk ketiga tabel, di-cache per tanggal)
+        table_data = get_cached_metric_tables(slug, selected_date, 'SMALL NCC', 'os')
+        konsol_table = table_data['konsol']
+        kanca_table = table_data['kanca']
+        kcp_table = table_data['kcp']
         
         # 5. Format date headers
         dtd_header = f"{date_cols['E']['label']} - {date_cols['D']['label']}"
@@ -1539,21 +1160,12 @@ def metric_page_view(request, slug):
     #       - Date filter same as other pages
     # =================================================================================
     elif slug == 'summary-konsol':
-        from .formulas.table_builder import build_summary_konsol_table, get_date_columns
-        from dashboard.formulas.uker_mapping import KANCA_CODES, KANCA_MASTER
+        from .formulas.table_builder import get_date_columns
+        from .table_cache import get_cached_summary_konsol_table
+        from dashboard.formulas.uker_mapping import get_uker_hierarchy
         
         # Get available dates
-        available_dates_qs = LW321.objects.annotate(
-            periode_iso=Concat(
-                Substr('periode', 7, 4),  # YYYY
-                Value('-'),
-                Substr('periode', 4, 2),  # MM
-                Value('-'),
-                Substr('periode', 1, 2),  # DD
-            ),
-        ).annotate(
-            periode_date=Cast('periode_iso', output_field=DateField())
-        ).values_list('periode_date', flat=True).distinct().order_by('-periode_date')
+        available_dates_qs = LW321DailyAggregate.objects.dates('periode_date', 'day', order='DESC')
         
         available_dates = list(available_dates_qs)
         
@@ -1583,12 +1195,13 @@ def metric_page_view(request, slug):
         date_cols = get_date_columns(selected_date)
         
         # Build summary table
-        summary_rows = build_summary_konsol_table(date_cols, kode_kanca_filter)
+        summary_rows = get_cached_summary_konsol_table(slug, date_cols, kode_kanca_filter)
         
         # Build KANCA dropdown options
         kanca_options = [{'code': 'RO_BANDUNG', 'name': 'RO BANDUNG (ALL)'}]
-        for kode in sorted(KANCA_CODES):
-            nama = KANCA_MASTER.get(kode, f"KANCA {kode}")
+        hierarchy = get_uker_hierarchy()
+        for kode in sorted(hierarchy.kanca_codes):
+            nama = hierarchy.kanca_names.get(kode, f"KANCA {kode}")
             kanca_options.append({'code': str(kode), 'name': nama})
         
         # Format komitmen header (dynamic month label)
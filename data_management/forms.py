@@ -26,6 +26,13 @@ class UploadDataForm(forms.Form):
         })
     )
     
+    replace_periode = forms.BooleanField(
+        label='Ganti data periode yang sama',
+        required=False,
+        help_text='Data lama untuk periode yang ada di file akan diganti sekaligus setelah file selesai diproses',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.helper = FormHelper()
@@ -34,6 +41,7 @@ class UploadDataForm(forms.Form):
         self.helper.layout = Layout(
             'file',
             'notes',
+            'replace_periode',
             Div(
                 Submit('submit', 'Upload', css_class='btn btn-primary'),
                 css_class='mt-3'
@@ -0,0 +1,258 @@
+"""
+Bulk ingestion engine untuk data LW321.
+
+DataFrame di-parse per kolom (data_management.parsers), lalu baris yang valid
+di-stream ke PostgreSQL dengan COPY (psycopg 3 ``cursor.copy``) dalam batch.
+Jika satu batch gagal di database, batch tersebut diulang baris per baris
+supaya error tetap bisa dilaporkan per baris seperti sebelumnya.
+"""
+import logging
+
+from itertools import repeat
+
+import numpy as np
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from dashboard.models import LW321
+from dashboard.partitions import ensure_lw321_partitions
+from .parsers import parse_lw321_frame
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 5000
+
+# Kolom yang ditulis saat COPY: semua kolom konkret LW321 kecuali primary key
+LW321_COPY_FIELDS = [
+    field for field in LW321._meta.concrete_fields
+    if not field.primary_key
+]
+
+
+def _copy_rows(cursor, table_name, column_names, rows):
+    """Tulis rows ke table_name dengan COPY (PostgreSQL) atau executemany (DB lain)."""
+    quote = connection.ops.quote_name
+    column_sql = ', '.join(quote(name) for name in column_names)
+
+    if connection.vendor == 'postgresql':
+        # cursor.cursor adalah cursor psycopg mentah; bungkus supaya error
+        # tetap menjadi DatabaseError milik Django
+        with connection.wrap_database_errors, cursor.cursor.copy(f'COPY {quote(table_name)} ({column_sql}) FROM STDIN') as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        placeholders = ', '.join(['%s'] * len(column_names))
+        cursor.executemany(
+            f'INSERT INTO {quote(table_name)} ({column_sql}) VALUES ({placeholders})',
+            rows,
+        )
+
+
+def _write_batch(table_name, column_names, rows, row_labels, errors):
+    """
+    Tulis satu batch. Jika COPY batch gagal, ulangi per baris di dalam savepoint
+    supaya baris yang bermasalah bisa dilaporkan satu per satu.
+
+    Returns:
+        int: jumlah baris yang berhasil ditulis
+    """
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                _copy_rows(cursor, table_name, column_names, rows)
+        return len(rows)
+    except DatabaseError as batch_error:
+        logger.warning(f"COPY batch gagal ({batch_error}), fallback ke insert per baris")
+
+    written = 0
+    for row, label in zip(rows, row_labels):
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    _copy_rows(cursor, table_name, column_names, [row])
+            written += 1
+        except DatabaseError as e:
+            errors.append((label, str(e).strip()))
+    return written
+
+
+def copy_lw321_batch(batch, table_name=None, batch_size=None):
+    """
+    Stream baris valid dari LW321ColumnBatch ke tabel LW321 dengan COPY per batch.
+
+    Args:
+        batch: LW321ColumnBatch (output parse_lw321_frame)
+        table_name: tabel tujuan (default: tabel LW321)
+        batch_size: jumlah baris per COPY
+
+    Returns:
+        tuple: (successful_rows, errors) - errors berupa list of (index, message)
+    """
+    table_name = table_name or LW321._meta.db_table
+    batch_size = batch_size or getattr(settings, 'LW321_COPY_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    now = timezone.now()
+    column_names = [field.column for field in LW321_COPY_FIELDS]
+    positions = np.flatnonzero(batch.valid)
+
+    if table_name == LW321._meta.db_table and 'periode_date' in batch.columns:
+        # Tabel partitioned: partisi bulan yang dibutuhkan harus ada sebelum COPY
+        ensure_lw321_partitions(set(batch.columns['periode_date'][positions]))
+    successful_rows = 0
+    errors = []
+
+    for start in range(0, len(positions), batch_size):
+        batch_positions = positions[start:start + batch_size]
+        size = len(batch_positions)
+
+        field_values = []
+        for field in LW321_COPY_FIELDS:
+            if field.name in batch.columns:
+                field_values.append(batch.columns[field.name][batch_positions])
+            elif field.name in ('created_at', 'updated_at'):
+                field_values.append(repeat(now, size))
+            else:
+                # Kolom tidak ada di file: pakai default model (string kosong / NULL)
+                field_values.append(repeat(field.get_default(), size))
+
+        rows = list(zip(*field_values))
+        row_labels = batch.index[batch_positions].tolist()
+        successful_rows += _write_batch(table_name, column_names, rows, row_labels, errors)
+
+    return successful_rows, errors
+
+
+def ingest_lw321_dataframe(df, table_name=None, batch_size=None):
+    """
+    Parse dan simpan seluruh DataFrame LW321 dengan COPY.
+
+    Returns:
+        dict: format sama dengan process_uploaded_file
+    """
+    batch = parse_lw321_frame(df)
+
+    successful_rows, write_errors = copy_lw321_batch(
+        batch, table_name=table_name, batch_size=batch_size,
+    )
+    errors = sorted(batch.errors + write_errors, key=lambda item: item[0])
+
+    return {
+        'success': True,
+        'total_rows': len(df),
+        'successful_rows': successful_rows,
+        'failed_rows': len(errors),
+        'errors': [f"Row {index + 1}: {message}" for index, message in errors],
+    }
+
+
+# ==================== STAGING TABLE ====================
+
+def get_staging_table_name(upload_id, part=None):
+    """Nama tabel staging per upload (dan per bagian untuk mode paralel)."""
+    name = f'{LW321._meta.db_table}_stage_{upload_id}'
+    return f'{name}_{part}' if part is not None else name
+
+
+def create_staging_table(table_name):
+    """
+    Buat (ulang) tabel staging UNLOGGED dengan struktur yang sama seperti LW321,
+    tanpa kolom id. Selalu dikosongkan supaya load ulang bersifat idempotent.
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {quote(table_name)}')
+        cursor.execute(
+            f'CREATE UNLOGGED TABLE {quote(table_name)} '
+            f'(LIKE {quote(LW321._meta.db_table)})'
+        )
+        cursor.execute(f'ALTER TABLE {quote(table_name)} DROP COLUMN IF EXISTS {quote(LW321._meta.pk.column)}')
+
+
+def drop_staging_tables(table_names):
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for table_name in table_names:
+            cursor.execute(f'DROP TABLE IF EXISTS {quote(table_name)}')
+
+
+def drop_orphaned_staging_tables(active_upload_ids):
+    """
+    Hapus tabel staging milik upload yang sudah tidak berjalan (gagal, selesai,
+    atau sudah dihapus), mis. sisa worker yang mati sebelum sempat membersihkan.
+
+    Returns:
+        list: nama tabel yang dihapus
+    """
+    prefix = f'{LW321._meta.db_table}_stage_'
+    active = {str(upload_id) for upload_id in active_upload_ids}
+    with connection.cursor() as cursor:
+        table_names = connection.introspection.table_names(cursor)
+    orphaned = [
+        table_name for table_name in table_names
+        if table_name.startswith(prefix)
+        and table_name[len(prefix):].split('_')[0] not in active
+    ]
+    drop_staging_tables(orphaned)
+    return orphaned
+
+
+def count_staging_rows(table_name):
+    """Jumlah baris di tabel staging, atau None jika tabel tidak ada."""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        if table_name not in connection.introspection.table_names(cursor):
+            return None
+        cursor.execute(f'SELECT COUNT(*) FROM {quote(table_name)}')
+        return cursor.fetchone()[0]
+
+
+def publish_staging_tables(table_names, replace_periode=False):
+    """
+    Pindahkan isi tabel staging ke LW321 dalam satu transaksi, lalu drop staging.
+    Reader tidak pernah melihat data yang baru setengah masuk.
+
+    Args:
+        table_names: list tabel staging
+        replace_periode: hapus dulu data LW321 untuk periode yang ada di staging
+            (DELETE + INSERT dalam transaksi yang sama)
+
+    Returns:
+        int: jumlah baris yang dipindahkan
+    """
+    quote = connection.ops.quote_name
+    lw321_table = quote(LW321._meta.db_table)
+    column_sql = ', '.join(quote(field.column) for field in LW321_COPY_FIELDS)
+    moved = 0
+
+    staged_dates = []
+    if table_names:
+        with connection.cursor() as cursor:
+            staged_sql = ' UNION '.join(
+                f"SELECT DISTINCT {quote('periode_date')} FROM {quote(table_name)}"
+                for table_name in table_names
+            )
+            cursor.execute(staged_sql)
+            staged_dates = [row[0] for row in cursor.fetchall() if row[0] is not None]
+        ensure_lw321_partitions(staged_dates)
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            if replace_periode and staged_dates:
+                # Tanggal sebagai literal (bukan subquery) supaya partisi LW321 di-prune saat planning
+                cursor.execute(
+                    f'DELETE FROM {lw321_table} WHERE {quote("periode_date")} = ANY(%s)',
+                    [staged_dates],
+                )
+                logger.info(f"Replace periode: {cursor.rowcount} baris lama dihapus")
+
+            for table_name in table_names:
+                cursor.execute(
+                    f'INSERT INTO {lw321_table} ({column_sql}) '
+                    f'SELECT {column_sql} FROM {quote(table_name)}'
+                )
+                moved += cursor.rowcount
+            for table_name in table_names:
+                cursor.execute(f'DROP TABLE IF EXISTS {quote(table_name)}')
+
+    return moved
@@ -0,0 +1,147 @@
+"""
+File sementara untuk alur upload komitmen (validasi AJAX -> upload -> preview -> konfirmasi).
+
+File disimpan di <KOMITMEN_UPLOAD_DIR>/<pemilik>_<sha256>/<nama file>, dengan
+pemilik = hash session key, sehingga dua session yang meng-upload workbook yang
+sama tidak berbagi direktori (discard satu session tidak menghapus file session
+lain). Hasil validate_komitmen_excel (termasuk DataFrame yang sudah dibersihkan)
+di-pickle di sebelah file tersebut, sehingga langkah berikutnya cukup memuat
+pickle tanpa membaca ulang workbook dengan openpyxl. File yang sama (isi dan
+nama) dari validasi AJAX dipakai lagi oleh langkah upload di session yang sama.
+
+Direktori yang lebih tua dari umur session (SESSION_COOKIE_AGE) dianggap
+kedaluwarsa dan dihapus oleh cleanup_expired_komitmen_uploads.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import uuid
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+VALIDATED_SUFFIX = '.validated.pkl'
+
+
+def _upload_root():
+    root = getattr(settings, 'KOMITMEN_UPLOAD_DIR', None) or os.path.join(tempfile.gettempdir(), 'sme-komitmen')
+    os.makedirs(root, exist_ok=True)
+    return root
+
+
+def _validated_path(file_path):
+    return file_path + VALIDATED_SUFFIX
+
+
+def _owner_token(owner):
+    """Token direktori untuk pemilik upload (session key di-hash, tidak ditulis mentah ke path)."""
+    if not owner:
+        return uuid.uuid4().hex[:16]
+    return hashlib.sha256(str(owner).encode()).hexdigest()[:16]
+
+
+def store_komitmen_upload(upload_file, owner=None):
+    """
+    Simpan UploadedFile ke <root>/<pemilik>_<sha256>/<nama file>.
+
+    Args:
+        owner: session key pemilik upload (None = direktori baru yang unik)
+
+    Returns:
+        str: path file tersimpan (file dengan isi dan nama sama dari pemilik yang sama dipakai ulang)
+    """
+    root = _upload_root()
+    digest = hashlib.sha256()
+    fd, partial_path = tempfile.mkstemp(dir=root, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as destination:
+            for chunk in upload_file.chunks():
+                digest.update(chunk)
+                destination.write(chunk)
+
+        upload_dir = os.path.join(root, f'{_owner_token(owner)}_{digest.hexdigest()}')
+        os.makedirs(upload_dir, exist_ok=True)
+        file_path = os.path.join(upload_dir, os.path.basename(upload_file.name))
+        if os.path.exists(file_path):
+            os.remove(partial_path)
+        else:
+            os.replace(partial_path, file_path)
+        # Sentuh direktori supaya umurnya dihitung dari upload terakhir
+        os.utime(upload_dir)
+        return file_path
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def load_validated_komitmen(file_path, expected_periode=None):
+    """
+    validate_komitmen_excel(file_path, expected_periode) dengan cache pickle di sebelah file.
+
+    Workbook hanya di-parse sekali per file; hasil validasi (dict yang sama dengan
+    validate_komitmen_excel) dimuat dari cache pada langkah berikutnya.
+    """
+    from .validators import validate_komitmen_excel
+
+    cache_path = _validated_path(file_path)
+    result = None
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as handle:
+                result = pickle.load(handle)
+        except Exception:
+            logger.exception(f"Cache validasi komitmen rusak, membaca ulang {file_path}")
+
+    if result is None:
+        result = validate_komitmen_excel(file_path)
+        try:
+            fd, partial_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix='.part')
+            with os.fdopen(fd, 'wb') as handle:
+                pickle.dump(result, handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(partial_path, cache_path)
+        except Exception:
+            logger.exception(f"Gagal menyimpan cache validasi komitmen {file_path}")
+
+    periode = result.get('periode')
+    if expected_periode and periode and periode != expected_periode:
+        result['warnings'] = result['warnings'] + [
+            f"⚠️ Periode dari filename ({periode}) berbeda dengan expected ({expected_periode})"
+        ]
+    return result
+
+
+def discard_komitmen_upload(file_path):
+    """Hapus file upload beserta cache validasinya."""
+    if file_path:
+        shutil.rmtree(os.path.dirname(file_path), ignore_errors=True)
+
+
+def cleanup_expired_komitmen_uploads(max_age=None):
+    """
+    Hapus direktori upload yang lebih tua dari max_age detik (default: SESSION_COOKIE_AGE).
+
+    Returns:
+        int: jumlah direktori yang dihapus
+    """
+    max_age = settings.SESSION_COOKIE_AGE if max_age is None else max_age
+    root = _upload_root()
+    cutoff = time.time() - max_age
+    removed = 0
+    for entry in os.scandir(root):
+        try:
+            if entry.stat().st_mtime >= cutoff:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            removed += 1
+        except OSError:
+            logger.exception(f"Gagal menghapus upload komitmen kedaluwarsa {entry.path}")
+    return removed
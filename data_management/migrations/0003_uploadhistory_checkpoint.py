@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0002_alter_uploadhistory_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='last_checkpoint_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='processed_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='run_start_offset',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='run_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
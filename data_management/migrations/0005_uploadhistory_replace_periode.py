@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0004_uploadhistory_ingest_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='replace_periode',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0005_uploadhistory_replace_periode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='part_progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_management', '0006_uploadhistory_part_progress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadhistory',
+            name='aggregates_pending',
+            field=models.BooleanField(default=False),
+        ),
+    ]
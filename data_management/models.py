@@ -25,6 +25,27 @@ class UploadHistory(models.Model):
     error_log = models.TextField(blank=True, null=True)
     notes = models.TextField(blank=True, null=True)
     
+    INGEST_MODE_CHOICES = (
+        ('sequential', 'Sequential'),  # Satu worker, checkpoint per chunk
+        ('parallel', 'Parallel'),  # Range baris dibagi ke beberapa worker (chord)
+    )
+    ingest_mode = models.CharField(max_length=20, choices=INGEST_MODE_CHOICES, default='sequential')
+    # Replace periode: load ke staging dulu, lalu hapus + insert periode yang sama dalam satu transaksi
+    replace_periode = models.BooleanField(default=False)
+    # Data sudah masuk LW321 tetapi agregat dashboard gagal dibangun ulang:
+    # data belum tampil di dashboard sampai rebuild_lw321_aggregates dijalankan
+    aggregates_pending = models.BooleanField(default=False)
+    
+    # Checkpoint ingestion per chunk: jumlah baris file yang sudah di-commit.
+    # Task yang di-retry / restart melanjutkan dari offset ini.
+    processed_rows = models.IntegerField(default=0)
+    run_started_at = models.DateTimeField(null=True, blank=True)  # Awal run task terakhir
+    run_start_offset = models.IntegerField(default=0)  # processed_rows saat run terakhir dimulai
+    last_checkpoint_at = models.DateTimeField(null=True, blank=True)
+    # Mode paralel: baris yang sudah di-stage per bagian ({"<part>": rows}).
+    # processed_rows = jumlahnya, sehingga bagian yang dikirim ulang tidak terhitung dua kali.
+    part_progress = models.JSONField(default=dict, blank=True)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
@@ -36,3 +57,23 @@ class UploadHistory(models.Model):
     
     def __str__(self):
         return f"{self.file_name} - {self.uploaded_by.username} - {self.created_at}"
+    
+    @property
+    def progress_percent(self):
+        """Persentase baris yang sudah di-commit"""
+        if self.status == 'completed':
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(100, round(self.processed_rows * 100 / self.total_rows, 1))
+    
+    @property
+    def rows_per_second(self):
+        """Kecepatan ingestion run terakhir (baris/detik)"""
+        if not self.run_started_at or not self.last_checkpoint_at:
+            return None
+        elapsed = (self.last_checkpoint_at - self.run_started_at).total_seconds()
+        rows = self.processed_rows - self.run_start_offset
+        if elapsed <= 0 or rows <= 0:
+            return None
+        return round(rows / elapsed)
@@ -0,0 +1,360 @@
+"""
+Vectorized column parsers untuk file LW321.
+
+Setiap kolom diproses sekali dengan operasi pandas/NumPy (bukan per cell):
+numeric coercion, strip + truncation, zero-padding nomor rekening,
+normalisasi boolean DUB NASABAH, periode_date (DATE) dari PERIODE, dan
+kolom turunan segment/outstanding/sml/npl/lr/lar.
+Hasilnya adalah LW321ColumnBatch berisi array per field plus daftar baris
+yang gagal (berdasarkan index DataFrame).
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from django.db import models
+
+from dashboard.formulas.segmentation import SEGMENT_MAPPING_BY_CODE
+from dashboard.models import LW321
+from .utils import COLUMN_FIELD_MAP, DATE_STRING_FIELDS, DECIMAL_FIELDS, PERIODE_FIELD
+
+# Field yang disimpan sebagai teks "TRUE"/"FALSE"
+FLAG_FIELDS = {'dub_nasabah'}
+
+TRUE_VALUES = ['TRUE', '1', 'YES', 'Y', 'T']
+FALSE_VALUES = ['FALSE', '0', 'NO', 'N', 'F']
+
+NULL_STRINGS = ['None', 'none', 'NONE']
+
+NOMOR_REKENING_LENGTH = 18
+
+DEFAULT_SEGMENT = 'SMALL'
+
+KOLEKTIBILITAS_FIELDS = [
+    'kolektibilitas_lancar',
+    'kolektibilitas_dpk',
+    'kolektibilitas_kurang_lancar',
+    'kolektibilitas_diragukan',
+    'kolektibilitas_macet',
+]
+
+_SOURCE_COLUMNS = {target: source for source, target in COLUMN_FIELD_MAP.items()}
+
+_MODEL_FIELDS = {
+    model_field.name: model_field
+    for model_field in LW321._meta.concrete_fields
+    if not model_field.primary_key
+}
+
+# Batas panjang VARCHAR (sesuai max_length di model LW321)
+MAX_LENGTHS = {
+    name: model_field.max_length
+    for name, model_field in _MODEL_FIELDS.items()
+    if isinstance(model_field, models.CharField) and model_field.max_length
+}
+
+# Batas nilai absolut untuk DecimalField (max_digits, decimal_places)
+DECIMAL_LIMITS = {
+    name: 10 ** (model_field.max_digits - model_field.decimal_places)
+    for name, model_field in _MODEL_FIELDS.items()
+    if isinstance(model_field, models.DecimalField)
+}
+
+
+@dataclass
+class LW321ColumnBatch:
+    """
+    Hasil parsing satu DataFrame LW321.
+
+    columns berisi numpy array (dtype object) per field model, siap ditulis ke
+    database; numeric berisi versi float64 dari kolom numerik untuk perhitungan.
+    valid menandai baris yang boleh diinsert, errors berisi (index, pesan).
+    """
+    index: np.ndarray
+    columns: dict
+    numeric: dict
+    valid: np.ndarray
+    errors: list = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def valid_count(self):
+        return int(self.valid.sum())
+
+    def reject(self, mask, messages):
+        """Tandai baris pada mask sebagai gagal; messages sejajar dengan baris."""
+        newly_failed = np.asarray(mask, dtype=bool) & self.valid
+        for position in np.flatnonzero(newly_failed):
+            self.errors.append((self.index[position], messages[position]))
+        self.valid &= ~newly_failed
+
+
+def _to_object(series):
+    """Series -> Series dtype object dengan NaN/NaT diganti None."""
+    values = series.astype(object)
+    return values.where(series.notna(), None)
+
+
+def _value_kinds(values):
+    """Masks tipe nilai per baris (str / angka / datetime) tanpa loop Python."""
+    kinds = values.map(type)
+    is_str = kinds == str
+    is_bool = kinds.isin([bool, np.bool_])
+    is_number = kinds.isin([int, float, np.int64, np.float64, np.int32, np.float32])
+    is_datetime = kinds.isin([pd.Timestamp, datetime, date])
+    return is_str, is_bool, is_number, is_datetime
+
+
+def parse_string_column(series):
+    """NULL -> '', strip, dan 'None' literal -> ''."""
+    isna = series.isna()
+    result = series.astype(str).str.strip()
+    result = result.mask(isna | result.isin(NULL_STRINGS), '')
+    return result
+
+
+def parse_periode_column(series):
+    """Tanggal -> 'DD/MM/YYYY', teks lain apa adanya (strip)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime('%d/%m/%Y').fillna('')
+
+    values = _to_object(series)
+    result = parse_string_column(series)
+    _, _, _, is_datetime = _value_kinds(values)
+    if is_datetime.any():
+        result[is_datetime] = pd.to_datetime(values[is_datetime]).dt.strftime('%d/%m/%Y')
+    return result
+
+
+def parse_periode_date_column(periode):
+    """Periode 'DD/MM/YYYY' (hasil parse_periode_column) -> datetime.date, tidak valid -> None."""
+    dates = pd.to_datetime(periode, format='%d/%m/%Y', errors='coerce')
+    return dates.dt.date.astype(object).where(dates.notna(), None)
+
+
+def parse_date_string_column(series):
+    """
+    Kolom tanggal yang disimpan sebagai teks.
+    0 -> '0', kosong -> '', 'D/M/YYYY' dipertahankan,
+    format tanggal lain -> 'MM/DD/YYYY', selain itu apa adanya.
+    """
+    values = _to_object(series)
+    is_str, _, is_number, _ = _value_kinds(values)
+
+    result = parse_string_column(series)
+
+    numeric_values = pd.to_numeric(values.where(is_number), errors='coerce')
+    result[is_number & (numeric_values == 0)] = '0'
+
+    text = result.where(is_str, '')
+    result[is_str & (text == '0.0')] = ''
+
+    # D/M/YYYY (semua bagian angka) dipertahankan apa adanya
+    is_slash_date = text.str.fullmatch(r'\d+/\d+/\d+')
+    needs_parsing = is_str & (text != '') & (text != '0') & (text != '0.0') & ~is_slash_date
+    if needs_parsing.any():
+        parsed = pd.to_datetime(text[needs_parsing], errors='coerce', format='mixed')
+        converted = parsed.dt.strftime('%m/%d/%Y')
+        result[needs_parsing] = converted.where(parsed.notna(), text[needs_parsing])
+
+    return result
+
+
+def parse_decimal_column(series):
+    """
+    Numeric coercion untuk kolom angka.
+
+    Returns:
+        tuple: (text, numbers)
+            - text: Series object berisi representasi angka (str) atau None
+            - numbers: numpy float64 (NaN untuk nilai kosong/tidak valid)
+    """
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        numbers = series.astype('float64').to_numpy(copy=True)
+        numbers[~np.isfinite(numbers)] = np.nan
+        is_integer = np.isfinite(numbers) & (np.mod(numbers, 1) == 0) & (np.abs(numbers) < 2 ** 53)
+        text = pd.Series(numbers, index=series.index).astype(str).astype(object)
+        text[is_integer] = numbers[is_integer].astype(np.int64).astype(str)
+        text[~np.isfinite(numbers)] = None
+        return text, numbers
+
+    cleaned = series.astype(str).str.replace(',', '', regex=False).str.strip()
+    cleaned = cleaned.mask(series.isna() | (cleaned == ''))
+    numbers = pd.to_numeric(cleaned, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    numbers[~np.isfinite(numbers)] = np.nan
+    text = cleaned.astype(object).where(np.isfinite(numbers), None)
+    return text, numbers
+
+
+def parse_flag_column(series):
+    """Boolean text (TRUE/true/1/Y/...) -> 'TRUE' / 'FALSE'. Nilai lain dibiarkan."""
+    result = parse_string_column(series)
+    upper = result.str.upper()
+    result = result.mask(upper.isin(TRUE_VALUES), 'TRUE')
+    result = result.mask(upper.isin(FALSE_VALUES), 'FALSE')
+    return result
+
+
+def pad_nomor_rekening(series):
+    """Zero-pad nomor rekening numerik sampai 18 digit."""
+    needs_padding = series.str.isdigit() & (series.str.len() < NOMOR_REKENING_LENGTH)
+    return series.mask(needs_padding, series.str.zfill(NOMOR_REKENING_LENGTH))
+
+
+def _text_values(columns, name, row_count):
+    """Kolom teks hasil parsing; kolom yang tidak ada di file = '' (default model)."""
+    if name not in columns:
+        return pd.Series([''] * row_count, dtype=object)
+    return pd.Series(columns[name], dtype=object).fillna('')
+
+
+def _kolektibilitas_values(text):
+    """Sama seperti cast_to_decimal di SQL: ',' -> '.', kosong -> 0, dibulatkan 2 desimal."""
+    text = text.astype(str).str.replace(',', '.', regex=False)
+    numbers = pd.to_numeric(text.mask(text == '', '0'), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return np.round(np.nan_to_num(numbers, nan=0.0), 2)
+
+
+def derive_lw321_columns(columns, numeric, row_count):
+    """
+    Kolom turunan segment, outstanding, sml, npl, lr, lar secara vectorized.
+    Formula sama dengan get_segment_annotation() dan get_metric_expressions()
+    di dashboard.formulas (dipakai management command recompute_lw321_derived).
+
+    Returns:
+        dict: field -> numpy array (dtype object)
+    """
+    segment_by_code = {}
+    for segment, codes in SEGMENT_MAPPING_BY_CODE.items():
+        for code in codes:
+            segment_by_code.setdefault(code, segment)  # Urutan penting: mapping pertama menang
+
+    code = _text_values(columns, 'code', row_count)
+    segment = code.map(segment_by_code).fillna(DEFAULT_SEGMENT)
+
+    val_lancar, val_dpk, val_kl, val_d, val_m = [
+        _kolektibilitas_values(_text_values(columns, name, row_count))
+        for name in KOLEKTIBILITAS_FIELDS
+    ]
+    val_os = np.round(np.nan_to_num(numeric.get('os', np.zeros(row_count)), nan=0.0), 2)
+
+    kol_adk = _text_values(columns, 'kol_adk', row_count).to_numpy()
+    flag_restruk = _text_values(columns, 'flag_restruk', row_count).to_numpy()
+    is_npl = np.isin(kol_adk, ['3', '4', '5'])
+    is_sml = kol_adk == '2'
+    is_lr = (kol_adk == '1') & (flag_restruk == 'Y')
+
+    outstanding = np.where(val_os > 0, val_os, val_lancar + val_dpk + val_kl + val_d + val_m)
+    npl = np.where(is_npl & (val_os > 0), val_os, np.where(is_npl & (val_os == 0), val_kl + val_d + val_m, 0.0))
+    sml = np.where(is_sml & (val_os > 0), val_os, np.where(is_sml & (val_os == 0), val_dpk, 0.0))
+    lr = np.where(is_lr, val_lancar, 0.0)
+    lar = sml + npl + lr
+
+    derived = {'segment': segment.to_numpy(dtype=object)}
+    for name, values in (('outstanding', outstanding), ('sml', sml), ('npl', npl), ('lr', lr), ('lar', lar)):
+        derived[name] = np.round(values, 2).astype(object)
+    return derived
+
+
+def parse_lw321_frame(df):
+    """
+    Parse DataFrame LW321 kolom demi kolom.
+
+    Args:
+        df: DataFrame dengan nama kolom yang sudah dinormalisasi (UPPER, strip)
+
+    Returns:
+        LW321ColumnBatch
+    """
+    row_count = len(df)
+    parsed = {}
+    numeric = {}
+
+    for source_column, target_field in COLUMN_FIELD_MAP.items():
+        if source_column not in df.columns:
+            continue
+        series = df[source_column]
+
+        if target_field == PERIODE_FIELD:
+            parsed[target_field] = parse_periode_column(series)
+        elif target_field in DATE_STRING_FIELDS:
+            parsed[target_field] = parse_date_string_column(series)
+        elif target_field in DECIMAL_FIELDS:
+            parsed[target_field], numeric[target_field] = parse_decimal_column(series)
+        elif target_field in FLAG_FIELDS:
+            parsed[target_field] = parse_flag_column(series)
+        else:
+            parsed[target_field] = parse_string_column(series)
+
+    batch = LW321ColumnBatch(
+        index=df.index.to_numpy(),
+        columns={},
+        numeric=numeric,
+        valid=np.ones(row_count, dtype=bool),
+    )
+
+    if 'nomor_rekening' in parsed:
+        parsed['nomor_rekening'] = pad_nomor_rekening(parsed['nomor_rekening'])
+
+
+    required_checks = [
+        ('nomor_rekening', 'NOMOR REKENING', 'Nomor rekening tidak boleh kosong'),
+        ('periode', 'PERIODE', 'Periode tidak boleh kosong'),
+        ('cif_no', 'CIFNO', 'CIF tidak boleh kosong'),
+    ]
+    for target_field, source_column, message in required_checks:
+        if target_field not in parsed:
+            continue
+        empty = (parsed[target_field] == '').to_numpy()
+        if empty.any():
+            raw_values = df[source_column].tolist()
+            batch.reject(empty, [f'{message}. Nilai: {value}' for value in raw_values])
+
+    # periode_date adalah kunci partisi bulanan: periode harus tanggal DD/MM/YYYY yang valid
+    periode_date = None
+    if PERIODE_FIELD in parsed:
+        periode_date = parse_periode_date_column(parsed[PERIODE_FIELD])
+        invalid = periode_date.isna().to_numpy()
+        if invalid.any():
+            batch.reject(invalid, [
+                f'Format periode tidak valid (harus DD/MM/YYYY). Nilai: {value}'
+                for value in parsed[PERIODE_FIELD].tolist()
+            ])
+
+    # Nilai yang pasti ditolak database (NOT NULL / numeric overflow) dilaporkan di sini
+    for target_field, values in parsed.items():
+        model_field = _MODEL_FIELDS[target_field]
+        if not model_field.null:
+            is_null = values.isna().to_numpy()
+            if is_null.any():
+                batch.reject(is_null, [
+                    f'Nilai kolom {target_field} tidak valid: {value}'
+                    for value in df[_SOURCE_COLUMNS[target_field]].tolist()
+                ])
+
+        limit = DECIMAL_LIMITS.get(target_field)
+        if limit is not None:
+            with np.errstate(invalid='ignore'):
+                overflow = np.abs(np.round(numeric[target_field], model_field.decimal_places)) >= limit
+            if overflow.any():
+                batch.reject(overflow, [
+                    f'Nilai {target_field} terlalu besar (maks {limit - 1}): {value}'
+                    for value in values.tolist()
+                ])
+
+    # Truncate VARCHAR fields to prevent "value too long" errors
+    for target_field, values in parsed.items():
+        max_length = MAX_LENGTHS.get(target_field)
+        if max_length:
+            values = values.where(values.isna(), values.str.slice(0, max_length))
+        batch.columns[target_field] = values.to_numpy(dtype=object)
+
+    if periode_date is not None:
+        batch.columns['periode_date'] = periode_date.to_numpy(dtype=object)
+
+    batch.columns.update(derive_lw321_columns(batch.columns, numeric, row_count))
+
+    return batch
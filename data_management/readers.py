@@ -0,0 +1,377 @@
+"""
+Streaming reader untuk file upload LW321 (CSV / Excel).
+
+File dibaca sekali secara bertahap (chunk): CSV memakai ``read_csv(chunksize=...)``
+dan xlsx memakai openpyxl ``read_only``. Dalam satu pass yang sama reader
+melakukan validasi header, mengambil preview, menghitung total baris, dan
+(opsional) menulis hasil parsing ke cache di disk supaya task Celery tidak
+perlu mem-parse file yang sama lagi.
+
+Format cache: beberapa DataFrame yang di-pickle berurutan dalam satu file,
+disimpan di <UPLOAD_CACHE_DIR>/<sha256 isi file>.pkl, ditambah
+<sha256>.json berisi total baris (untuk progress ingestion) dan tanggal
+periode yang ada di file (untuk rebuild agregat harian setelah upload).
+"""
+import hashlib
+import json
+import os
+import pickle
+import time
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+from django.conf import settings
+
+from .utils import COLUMN_FIELD_MAP
+
+# Urutan kolom yang diharapkan di file upload
+EXPECTED_COLUMNS = list(COLUMN_FIELD_MAP.keys())
+
+REQUIRED_COLUMNS = ['PERIODE', 'NOMOR REKENING', 'CIFNO']
+
+SUPPORTED_EXTENSIONS = ['.csv', '.xlsx', '.xls']
+
+DEFAULT_CHUNK_SIZE = 20000
+
+CACHE_DIR_NAME = 'upload_cache'
+
+
+def get_file_extension(file_path):
+    file_path = str(file_path)
+    return file_path.lower()[file_path.rfind('.'):]
+
+
+def normalize_columns(columns):
+    return [str(col).strip().upper() for col in columns]
+
+
+def _get_chunk_size(chunk_size=None):
+    return chunk_size or getattr(settings, 'LW321_READ_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+
+
+def _integral_floats_to_int(chunk):
+    """
+    Kolom float yang semua nilainya bulat (int + NaN) dijadikan Int64, supaya
+    tipe kolom tidak berubah-ubah antar chunk (mis. kode uker '46' vs '46.0').
+    """
+    for col in chunk.columns:
+        series = chunk[col]
+        if pd.api.types.is_float_dtype(series):
+            values = series.dropna()
+            if not values.empty and (values % 1 == 0).all():
+                chunk[col] = series.astype('Int64')
+    return chunk
+
+
+def _iter_csv_chunks(file_path, chunk_size):
+    # PENTING: NOMOR REKENING dibaca sebagai string untuk preserve leading zeros
+    reader = pd.read_csv(
+        file_path,
+        dtype={'NOMOR REKENING': str, 'NOMOR_REKENING': str},
+        parse_dates=False,
+        chunksize=chunk_size,
+    )
+    for chunk in reader:
+        chunk.columns = normalize_columns(chunk.columns)
+        yield _integral_floats_to_int(chunk)
+
+
+def _normalize_cell(value):
+    # Samakan dengan pd.read_excel: float bulat (mis. 123.0) menjadi int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _iter_xlsx_chunks(file_path, chunk_size):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = normalize_columns(['' if col is None else col for col in header])
+
+        buffer = []
+        index = []
+        position = 0
+        for row in rows:
+            position += 1
+            if row is None or all(value is None or value == '' for value in row):
+                continue
+            values = [_normalize_cell(value) for value in row[:len(columns)]]
+            values.extend([None] * (len(columns) - len(values)))
+            buffer.append(values)
+            # Index = posisi baris data di sheet (0-based), sama seperti read_excel
+            index.append(position - 1)
+            if len(buffer) >= chunk_size:
+                yield pd.DataFrame(buffer, columns=columns, index=index)
+                buffer, index = [], []
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns, index=index)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_chunks(file_path, chunk_size):
+    # Format .xls lama tidak mendukung pembacaan streaming
+    df = pd.read_excel(file_path, dtype={'NOMOR REKENING': str, 'NOMOR_REKENING': str})
+    df.columns = normalize_columns(df.columns)
+    for start in range(0, len(df), chunk_size):
+        yield df.iloc[start:start + chunk_size]
+
+
+def iter_file_chunks(file_path, chunk_size=None):
+    """
+    Baca file upload per chunk.
+
+    Yields:
+        DataFrame dengan nama kolom ter-normalisasi dan index = posisi baris data
+    """
+    chunk_size = _get_chunk_size(chunk_size)
+    file_ext = get_file_extension(file_path)
+
+    if file_ext == '.csv':
+        yield from _iter_csv_chunks(file_path, chunk_size)
+    elif file_ext == '.xlsx':
+        yield from _iter_xlsx_chunks(file_path, chunk_size)
+    elif file_ext == '.xls':
+        yield from _iter_xls_chunks(file_path, chunk_size)
+    else:
+        raise ValueError('Format file tidak didukung. Gunakan .csv, .xlsx, atau .xls')
+
+
+def _read_header(file_path):
+    """Header saja (untuk file kosong yang tidak menghasilkan chunk)."""
+    file_ext = get_file_extension(file_path)
+    if file_ext == '.csv':
+        return normalize_columns(pd.read_csv(file_path, nrows=0).columns)
+    if file_ext == '.xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(file_path, read_only=True)
+        try:
+            header = next(workbook.active.iter_rows(values_only=True), None) or []
+        finally:
+            workbook.close()
+        return normalize_columns(['' if col is None else col for col in header])
+    return normalize_columns(pd.read_excel(file_path, nrows=0).columns)
+
+
+# ==================== CACHE ====================
+
+def get_cache_dir():
+    # Sengaja di luar MEDIA_ROOT: MEDIA_ROOT disajikan sebagai file statis saat DEBUG,
+    # sedangkan pickle di sini di-unpickle oleh worker
+    cache_dir = getattr(settings, 'UPLOAD_CACHE_DIR', None)
+    return Path(cache_dir) if cache_dir else Path(settings.BASE_DIR) / CACHE_DIR_NAME
+
+
+def compute_file_digest(file_path, block_size=1024 * 1024):
+    """SHA-256 isi file (dibaca per blok, memori konstan)."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_cache_path(file_path):
+    return get_cache_dir() / f'{compute_file_digest(file_path)}.pkl'
+
+
+def _meta_path(cache_path):
+    return Path(cache_path).with_suffix('.json')
+
+
+def read_cache_meta(cache_path):
+    with open(_meta_path(cache_path)) as handle:
+        return json.load(handle)
+
+
+def _chunk_periode_dates(chunk):
+    """Tanggal periode (ISO string) yang valid di satu chunk."""
+    from .parsers import parse_periode_column, parse_periode_date_column
+
+    if 'PERIODE' not in chunk.columns:
+        return set()
+    dates = parse_periode_date_column(parse_periode_column(chunk['PERIODE']))
+    return {value.isoformat() for value in dates.dropna().unique()}
+
+
+def get_cached_periode_dates(cache_path):
+    """
+    Tanggal periode yang ada di file ter-cache. Cache lama yang meta-nya belum
+    menyimpan 'periode_dates' dibaca ulang per chunk.
+
+    Returns:
+        list of date
+    """
+    values = read_cache_meta(cache_path).get('periode_dates')
+    if values is None:
+        values = set()
+        for _, chunk in iter_cached_chunks(cache_path):
+            values |= _chunk_periode_dates(chunk)
+    return sorted(date.fromisoformat(value) for value in values)
+
+
+def iter_cached_chunks(cache_path, start_row=0, end_row=None):
+    """
+    Baca ulang chunk yang sudah di-cache oleh scan_upload_file.
+
+    Args:
+        start_row: lewati baris sebelum offset ini (untuk resume dari checkpoint)
+        end_row: berhenti sebelum offset ini (untuk pembagian range antar worker)
+
+    Yields:
+        tuple: (offset baris awal chunk, DataFrame)
+    """
+    # Lompat langsung ke chunk yang memuat start_row (posisi byte ada di meta)
+    offset, byte_position = 0, 0
+    chunk_positions = read_cache_meta(cache_path).get('chunks', [])
+    for chunk_row, chunk_byte in chunk_positions:
+        if chunk_row > start_row:
+            break
+        offset, byte_position = chunk_row, chunk_byte
+
+    with open(cache_path, 'rb') as handle:
+        handle.seek(byte_position)
+        while end_row is None or offset < end_row:
+            try:
+                chunk = pickle.load(handle)
+            except EOFError:
+                return
+            chunk_start = offset
+            offset += len(chunk)
+            if offset <= start_row:
+                continue
+            if chunk_start < start_row:
+                chunk = chunk.iloc[start_row - chunk_start:]
+                chunk_start = start_row
+            if end_row is not None and offset > end_row:
+                chunk = chunk.iloc[:end_row - chunk_start]
+            yield chunk_start, chunk
+
+
+def ensure_upload_cache(file_path):
+    """
+    Pastikan file sudah ter-cache (hasil validasi dipakai ulang jika ada).
+    Jika belum, file di-scan sekali dan langsung ditulis ke cache.
+
+    Returns:
+        tuple: (cache_path, meta dict dengan 'total_rows' dan 'columns')
+    """
+    cache_path = get_cache_path(file_path)
+    if not (cache_path.exists() and _meta_path(cache_path).exists()):
+        scan_upload_file(file_path, preview_rows=0, write_cache=True)
+    return cache_path, read_cache_meta(cache_path)
+
+
+def remove_cache(cache_path):
+    if not cache_path:
+        return
+    for path in (Path(cache_path), _meta_path(cache_path)):
+        path.unlink(missing_ok=True)
+
+
+def cleanup_cache(max_age_seconds):
+    """Hapus cache yang tidak pernah dipakai task (mis. validasi tanpa upload)."""
+    cache_dir = get_cache_dir()
+    if not cache_dir.exists():
+        return 0
+
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for cache_file in cache_dir.iterdir():
+        if cache_file.stat().st_mtime < cutoff:
+            cache_file.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+# ==================== SINGLE-PASS SCAN ====================
+
+def scan_upload_file(file_path, preview_rows=10, write_cache=False, chunk_size=None):
+    """
+    Satu pass: header, preview, total baris, dan (opsional) cache di disk.
+
+    Returns:
+        dict: {
+            'columns': list kolom (normalized),
+            'preview': DataFrame (maks preview_rows baris),
+            'total_rows': int,
+            'cache_path': Path atau None,
+        }
+    """
+    columns = None
+    preview_frames = []
+    preview_count = 0
+    total_rows = 0
+
+    cache_path = None
+    cache_handle = None
+    chunk_positions = []
+    periode_dates = set()
+    temp_cache_path = None
+    temp_meta_path = None
+    if write_cache:
+        cache_dir = get_cache_dir()
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path = get_cache_path(file_path)
+        temp_cache_path = cache_path.with_suffix(f'.pkl.{os.getpid()}.tmp')
+        cache_handle = open(temp_cache_path, 'wb')
+
+    try:
+        for chunk in iter_file_chunks(file_path, chunk_size):
+            if columns is None:
+                columns = list(chunk.columns)
+            total_rows += len(chunk)
+
+            if preview_count < preview_rows:
+                needed = preview_rows - preview_count
+                preview_frames.append(chunk.iloc[:needed])
+                preview_count += min(needed, len(chunk))
+
+            if cache_handle:
+                chunk_positions.append([total_rows - len(chunk), cache_handle.tell()])
+                pickle.dump(chunk, cache_handle, protocol=pickle.HIGHEST_PROTOCOL)
+                periode_dates |= _chunk_periode_dates(chunk)
+
+        if cache_handle:
+            cache_handle.close()
+            cache_handle = None
+            # Meta dulu, baru pickle; keduanya di-rename atomik. ensure_upload_cache
+            # hanya menganggap cache siap jika kedua file ada, jadi proses lain
+            # (view validasi vs task Celery) tidak pernah membaca file setengah jadi
+            temp_meta_path = _meta_path(cache_path).with_suffix(f'.json.{os.getpid()}.tmp')
+            with open(temp_meta_path, 'w') as handle:
+                json.dump({
+                    'total_rows': total_rows,
+                    'columns': columns or [],
+                    'chunks': chunk_positions,
+                    'periode_dates': sorted(periode_dates),
+                }, handle)
+            os.replace(temp_meta_path, _meta_path(cache_path))
+            os.replace(temp_cache_path, cache_path)
+    finally:
+        if cache_handle:
+            cache_handle.close()
+        for temp_path in (temp_cache_path, temp_meta_path):
+            if temp_path and os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    if columns is None:
+        columns = _read_header(file_path)
+
+    preview = pd.concat(preview_frames) if preview_frames else pd.DataFrame(columns=columns)
+
+    return {
+        'columns': columns,
+        'preview': preview,
+        'total_rows': total_rows,
+        'cache_path': cache_path,
+    }
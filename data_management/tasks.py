@@ -1,26 +1,66 @@
 """Background tasks for data processing"""
-from celery import shared_task
+import math
+
+from celery import chord, shared_task
+from celery.exceptions import Retry, SoftTimeLimitExceeded
+from django.conf import settings
+from django.db import connection, transaction
 from django.utils import timezone
-from dashboard.models import LW321
 from .models import UploadHistory
 import logging
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True, name='data_management.process_uploaded_data')
+@shared_task(
+    bind=True,
+    name='data_management.process_uploaded_data',
+    acks_late=True,  # Worker mati di tengah jalan -> task dikirim ulang dan resume
+    max_retries=20,
+    soft_time_limit=max(settings.CELERY_TASK_TIME_LIMIT - 60, 60),
+)
 def process_uploaded_data_task(self, upload_history_id):
-    """Process uploaded data in background after file is saved"""
+    """
+    Process uploaded data in background after file is saved
+    
+    Ingestion berjalan per chunk dengan checkpoint di UploadHistory.processed_rows.
+    Jika soft time limit tercapai, task di-retry dan melanjutkan dari checkpoint.
+    """
     try:
         upload_history = UploadHistory.objects.get(id=upload_history_id)
+        if upload_history.status == 'completed':
+            logger.info(f"Upload ID {upload_history_id} already completed, skipping")
+            return {'status': 'success', 'skipped': True}
+        
+        if upload_history.ingest_mode == 'parallel' and upload_history.status == 'processing':
+            # Task dikirim ulang setelah chord paralel sudah berjalan
+            logger.info(f"Upload ID {upload_history_id} is being processed by parallel workers, skipping")
+            return {'status': 'dispatched', 'skipped': True}
+        
         upload_history.status = 'processing'
-        upload_history.save()
+        upload_history.save(update_fields=['status'])
         
-        logger.info(f"Starting data processing for upload ID: {upload_history_id}")
+        if upload_history.processed_rows:
+            logger.info(
+                f"Resuming data processing for upload ID: {upload_history_id} "
+                f"from row {upload_history.processed_rows}"
+            )
+        else:
+            logger.info(f"Starting data processing for upload ID: {upload_history_id}")
+        
+        if _use_parallel_ingestion(upload_history):
+            return _dispatch_parallel_ingestion(upload_history)
         
         from .utils import process_uploaded_file
         
-        result = process_uploaded_file(upload_history)
+        try:
+            result = process_uploaded_file(upload_history)
+        except SoftTimeLimitExceeded:
+            logger.warning(
+                f"Soft time limit reached for upload ID: {upload_history_id}, "
+                f"retrying from row {upload_history.processed_rows}"
+            )
+            raise self.retry(countdown=5)
         
         if result['success']:
             upload_history.status = 'completed'
@@ -28,8 +68,6 @@ def process_uploaded_data_task(self, upload_history_id):
             upload_history.successful_rows = result['successful_rows']
             upload_history.failed_rows = result['failed_rows']
             upload_history.completed_at = timezone.now()
-            if result.get('errors'):
-                upload_history.error_log = '\n'.join(result['errors'])
             upload_history.save()
             
             logger.info(f"Data processing completed for upload ID: {upload_history_id}")
@@ -49,7 +87,9 @@ def process_uploaded_data_task(self, upload_history_id):
                 'status': 'failed',
                 'error': result.get('error', 'Unknown error')
             }
-            
+    
+    except Retry:
+        raise
     except Exception as e:
         logger.exception(f"Error processing upload ID: {upload_history_id}")
         try:
@@ -66,6 +106,171 @@ def process_uploaded_data_task(self, upload_history_id):
         }
 
 
+# ==================== PARALLEL INGESTION ====================
+
+def _use_parallel_ingestion(upload_history):
+    """
+    Mode paralel aktif jika LW321_PARALLEL_WORKERS > 1 (butuh PostgreSQL untuk
+    tabel staging). Upload yang sudah punya checkpoint dilanjutkan secara sekuensial.
+    """
+    workers = getattr(settings, 'LW321_PARALLEL_WORKERS', 1)
+    return workers > 1 and connection.vendor == 'postgresql' and upload_history.processed_rows == 0
+
+
+def _dispatch_parallel_ingestion(upload_history):
+    """
+    Bagi file menjadi beberapa range baris dan kirim sebagai chord:
+    setiap worker load ke tabel staging sendiri, callback memindahkan semuanya
+    ke LW321 dalam satu transaksi.
+    """
+    from .readers import REQUIRED_COLUMNS, ensure_upload_cache
+    
+    cache_path, meta = ensure_upload_cache(upload_history.file_path.path)
+    
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in meta['columns']]
+    if missing_columns:
+        upload_history.status = 'failed'
+        upload_history.error_log = f'Kolom yang diperlukan tidak ditemukan: {", ".join(missing_columns)}. Kolom yang ada: {", ".join(meta["columns"])}'
+        upload_history.save()
+        return {'status': 'failed', 'error': upload_history.error_log}
+    
+    total_rows = meta['total_rows']
+    workers = getattr(settings, 'LW321_PARALLEL_WORKERS', 1)
+    part_size = max(math.ceil(total_rows / workers), 1)
+    ranges = [
+        (start, min(start + part_size, total_rows))
+        for start in range(0, total_rows, part_size)
+    ]
+    
+    upload_history.ingest_mode = 'parallel'
+    upload_history.total_rows = total_rows
+    upload_history.run_started_at = timezone.now()
+    upload_history.run_start_offset = 0
+    upload_history.last_checkpoint_at = upload_history.run_started_at
+    upload_history.part_progress = {}
+    upload_history.save(update_fields=[
+        'ingest_mode', 'total_rows', 'run_started_at', 'run_start_offset', 'last_checkpoint_at',
+        'part_progress',
+    ])
+    
+    header = [
+        ingest_upload_range_task.s(upload_history.id, part, start, end, str(cache_path))
+        for part, (start, end) in enumerate(ranges)
+    ]
+    callback = finalize_parallel_upload_task.s(upload_history.id, str(cache_path)).on_error(
+        parallel_upload_failed_task.s(upload_history.id, len(ranges))
+    )
+    chord(header)(callback)
+    
+    logger.info(f"Dispatched upload ID {upload_history.id} to {len(ranges)} parallel workers")
+    return {'status': 'dispatched', 'parts': len(ranges)}
+
+
+def _record_part_progress(upload_history_id, part, rows):
+    """
+    Simpan jumlah baris yang sudah di-stage oleh satu bagian (nilai absolut, bukan increment),
+    lalu hitung ulang processed_rows dari semua bagian.
+    """
+    with transaction.atomic():
+        upload_history = UploadHistory.objects.select_for_update().only('part_progress').get(id=upload_history_id)
+        progress = dict(upload_history.part_progress or {})
+        progress[str(part)] = rows
+        UploadHistory.objects.filter(id=upload_history_id).update(
+            part_progress=progress,
+            processed_rows=sum(progress.values()),
+            last_checkpoint_at=timezone.now(),
+        )
+
+
+@shared_task(bind=True, name='data_management.ingest_upload_range', acks_late=True)
+def ingest_upload_range_task(self, upload_history_id, part, start_row, end_row, cache_path):
+    """Load satu range baris ke tabel staging bagian ini (idempotent: staging dibuat ulang)"""
+    from .ingestion import create_staging_table, get_staging_table_name, ingest_lw321_dataframe
+    from .readers import iter_cached_chunks
+    
+    table_name = get_staging_table_name(upload_history_id, part)
+    create_staging_table(table_name)
+    # Task dikirim ulang: staging kosong lagi, progress bagian ini mulai dari 0
+    _record_part_progress(upload_history_id, part, 0)
+    
+    successful_rows = 0
+    failed_rows = 0
+    errors = []
+    for chunk_start, chunk in iter_cached_chunks(cache_path, start_row=start_row, end_row=end_row):
+        result = ingest_lw321_dataframe(chunk, table_name=table_name)
+        successful_rows += result['successful_rows']
+        failed_rows += result['failed_rows']
+        errors.extend(result['errors'])
+        
+        # Progress saja; angka final di-set oleh finalize_parallel_upload_task
+        _record_part_progress(upload_history_id, part, chunk_start + len(chunk) - start_row)
+    
+    logger.info(f"Upload ID {upload_history_id} part {part}: rows {start_row}-{end_row} staged")
+    return {
+        'part': part,
+        'successful_rows': successful_rows,
+        'failed_rows': failed_rows,
+        'errors': errors,
+    }
+
+
+@shared_task(name='data_management.finalize_parallel_upload')
+def finalize_parallel_upload_task(results, upload_history_id, cache_path):
+    """
+    Chord callback: swap semua staging ke LW321 secara atomik lalu tandai completed.
+    Pada mode replace periode, data lama periode yang sama dihapus di transaksi yang sama.
+    """
+    from dashboard.aggregates import refresh_daily_aggregates_safely
+    from dashboard.table_cache import schedule_dashboard_warmup
+    from .ingestion import get_staging_table_name, publish_staging_tables
+    from .readers import get_cached_periode_dates, remove_cache
+    from .utils import mark_aggregates_pending
+    
+    upload_history = UploadHistory.objects.get(id=upload_history_id)
+    
+    results = sorted(results, key=lambda item: item['part'])
+    table_names = [get_staging_table_name(upload_history_id, item['part']) for item in results]
+    moved = publish_staging_tables(table_names, replace_periode=upload_history.replace_periode)
+    periode_dates = get_cached_periode_dates(cache_path)
+    aggregates_written = refresh_daily_aggregates_safely(periode_dates)
+    schedule_dashboard_warmup(periode_dates)
+    
+    errors = [message for item in results for message in item['errors']]
+    upload_history.status = 'completed'
+    upload_history.successful_rows = sum(item['successful_rows'] for item in results)
+    upload_history.failed_rows = sum(item['failed_rows'] for item in results)
+    upload_history.processed_rows = upload_history.total_rows
+    upload_history.error_log = '\n'.join(errors) if errors else None
+    upload_history.completed_at = timezone.now()
+    upload_history.last_checkpoint_at = upload_history.completed_at
+    upload_history.save()
+    if aggregates_written is None:
+        mark_aggregates_pending(upload_history, periode_dates)
+    
+    remove_cache(cache_path)
+    
+    logger.info(f"Parallel data processing completed for upload ID: {upload_history_id} ({moved} rows)")
+    return {
+        'status': 'success',
+        'total_rows': upload_history.total_rows,
+        'successful_rows': upload_history.successful_rows,
+        'failed_rows': upload_history.failed_rows,
+    }
+
+
+@shared_task(name='data_management.parallel_upload_failed')
+def parallel_upload_failed_task(request, exc, traceback, upload_history_id, parts):
+    """Error callback chord: bersihkan staging dan tandai upload gagal"""
+    from .ingestion import drop_staging_tables, get_staging_table_name
+    
+    logger.error(f"Parallel data processing failed for upload ID: {upload_history_id}: {exc}")
+    drop_staging_tables([get_staging_table_name(upload_history_id, part) for part in range(parts)])
+    UploadHistory.objects.filter(id=upload_history_id).update(
+        status='failed',
+        error_log=str(exc),
+    )
+
+
 @shared_task(name='data_management.cleanup_old_uploads')
 def cleanup_old_uploads():
     """
@@ -83,5 +288,19 @@ def cleanup_old_uploads():
     count = old_uploads.count()
     old_uploads.delete()
     
-    logger.info(f"Cleaned up {count} old upload records")
+    # Cache hasil validasi yang tidak pernah diproses (validasi tanpa upload)
+    from .readers import cleanup_cache
+    cache_count = cleanup_cache(max_age_seconds=24 * 60 * 60)
+    
+    # Tabel staging yang tertinggal dari upload yang tidak lagi berjalan
+    from .ingestion import drop_orphaned_staging_tables
+    active_ids = UploadHistory.objects.filter(
+        status__in=['queued', 'processing'],
+    ).values_list('id', flat=True)
+    staging_count = len(drop_orphaned_staging_tables(active_ids))
+    
+    logger.info(
+        f"Cleaned up {count} old upload records, {cache_count} cached files "
+        f"and {staging_count} staging tables"
+    )
     return f"Cleaned up {count} old upload records"
@@ -0,0 +1,122 @@
+"""
+Test endpoint edit sel komitmen (update_komitmen_cell / update_komitmen_cells).
+"""
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from dashboard.models import KomitmenData, KomitmenUpload
+
+from .views import KOMITMEN_BATCH_EDIT_MAX
+
+# Tidak muat di DecimalField(max_digits=20, decimal_places=10): 15 digit sebelum koma
+OVERFLOW_VALUE = '123456789012345'
+
+
+class KomitmenCellEditTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user('admin', password='secret', role='admin')
+        upload = KomitmenUpload.objects.create(periode=date(2025, 3, 1), file_name='komitmen.xlsx', status='completed')
+        cls.rows = [
+            KomitmenData.objects.create(
+                upload=upload, periode=upload.periode, kode_kanca=kode_kanca, kode_uker=str(kode_kanca),
+                nama_kanca=f'KANCA {kode_kanca}', nama_uker=f'KANCA {kode_kanca}',
+                kur_os=Decimal('1000.5'), small_pl=Decimal('2.25'),
+            )
+            for kode_kanca in (101, 102)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post_cells(self, edits):
+        return self.client.post(
+            reverse('data_management:update_komitmen_cells'),
+            json.dumps({'edits': edits}),
+            content_type='application/json',
+        )
+
+    def assertRowsUnchanged(self):
+        for row in self.rows:
+            stored = KomitmenData.objects.get(pk=row.pk)
+            self.assertEqual(stored.kur_os, Decimal('1000.5'))
+            self.assertEqual(stored.small_pl, Decimal('2.25'))
+
+    def test_batch_update_writes_all_edits(self):
+        response = self.post_cells([
+            {'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': '1,234.5'},
+            {'row_id': self.rows[1].pk, 'field_name': 'small_pl', 'value': '-'},
+            {'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': '99'},  # edit terakhir dipakai
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(KomitmenData.objects.get(pk=self.rows[0].pk).kur_os, Decimal('99'))
+        self.assertIsNone(KomitmenData.objects.get(pk=self.rows[1].pk).small_pl)
+
+    def test_mixed_batch_saves_nothing(self):
+        response = self.post_cells([
+            {'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': '1'},
+            {'row_id': self.rows[1].pk, 'field_name': 'nama_uker', 'value': 'X'},
+            {'row_id': self.rows[1].pk, 'field_name': 'small_pl', 'value': 'abc'},
+            {'row_id': 'x', 'field_name': 'kur_os', 'value': '1'},
+            {'row_id': self.rows[1].pk, 'field_name': 'kur_os', 'value': OVERFLOW_VALUE},
+            {'row_id': self.rows[1].pk, 'field_name': 'kur_os', 'value': 'NaN'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        result = response.json()
+        self.assertFalse(result['success'])
+        self.assertEqual([error['index'] for error in result['errors']], [1, 2, 3, 4, 5])
+        self.assertEqual(result['errors'][0]['error'], 'Field tidak valid')
+        self.assertEqual(result['errors'][1]['error'], 'Format angka tidak valid')
+        self.assertEqual(result['errors'][2]['error'], 'Row tidak valid')
+        self.assertRowsUnchanged()
+
+    def test_missing_row_saves_nothing(self):
+        missing_id = max(row.pk for row in self.rows) + 1000
+        response = self.post_cells([
+            {'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': '1'},
+            {'row_id': missing_id, 'field_name': 'small_pl', 'value': '2'},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['errors'], [
+            {'row_id': missing_id, 'field_name': 'small_pl', 'error': 'Data tidak ditemukan'},
+        ])
+        self.assertRowsUnchanged()
+
+    def test_overflowing_value_is_rejected(self):
+        response = self.post_cells([{'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': OVERFLOW_VALUE}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['errors']], [0])
+
+        response = self.client.post(
+            reverse('data_management:update_komitmen_cell'),
+            json.dumps({'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': OVERFLOW_VALUE}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertRowsUnchanged()
+
+    def test_batch_size_limit(self):
+        edits = [{'row_id': self.rows[0].pk, 'field_name': 'kur_os', 'value': '1'}] * (KOMITMEN_BATCH_EDIT_MAX + 1)
+        response = self.post_cells(edits)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('errors', response.json())
+        self.assertRowsUnchanged()
+
+    def test_invalid_request(self):
+        self.assertEqual(self.post_cells([]).status_code, 400)
+        response = self.client.post(
+            reverse('data_management:update_komitmen_cells'), 'not json', content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(reverse('data_management:update_komitmen_cells')).status_code, 405)
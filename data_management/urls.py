@@ -19,4 +19,5 @@ urlpatterns = [
     path('komitmen/delete/<int:upload_id>/', views.delete_komitmen, name='delete_komitmen'),
     path('komitmen/view/', views.view_komitmen, name='view_komitmen'),  # New: View komitmen data
     path('komitmen/update-cell/', views.update_komitmen_cell, name='update_komitmen_cell'),  # New: AJAX update
+    path('komitmen/update-cells/', views.update_komitmen_cells, name='update_komitmen_cells'),  # AJAX batch update
 ]
@@ -1,7 +1,3 @@
-import pandas as pd
-from decimal import Decimal, InvalidOperation
-from dashboard.models import LW321
-
 COLUMN_FIELD_MAP = {
     'PERIODE': 'periode',
     'KANCA': 'kanca',
@@ -51,123 +47,15 @@ DECIMAL_FIELDS = {
     'kolektibilitas_kurang_lancar', 'kolektibilitas_diragukan', 'kolektibilitas_macet',
 }
 
-DATE_FIELDS = INTEGER_FIELDS = BOOLEAN_FIELDS = set()
-
-
-def _parse_date(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    try:
-        parsed = pd.to_datetime(value, errors='coerce')
-        return None if pd.isna(parsed) else parsed.date()
-    except (ValueError, TypeError):
-        return None
-
-
-def _parse_decimal(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    try:
-        if isinstance(value, str):
-            value = value.replace(',', '').strip()
-            if not value:
-                return None
-        return Decimal(value)
-    except (InvalidOperation, ValueError, TypeError):
-        return None
-
-
-def _parse_int(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    try:
-        return int(float(value))
-    except (ValueError, TypeError):
-        return None
-
-
-def _parse_string(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return ''
-    result = str(value).strip()
-    return '' if result in ['None', 'none', 'NONE'] else result
-
-
-def _parse_periode(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return ''
-    if isinstance(value, pd.Timestamp) or hasattr(value, 'strftime') and not isinstance(value, str):
-        return value.strftime('%d/%m/%Y')
-    return str(value).strip() if isinstance(value, str) else str(value).strip()
-
-
-def _parse_date_string(value):
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return ''
-    
-    if isinstance(value, (int, float)) and value == 0:
-        return '0'
-    
-    if isinstance(value, str):
-        value_clean = value.strip()
-        if value_clean == '0':
-            return '0'
-        if not value_clean or value_clean == '0.0':
-            return ''
-        if '/' in value_clean:
-            parts = value_clean.split('/')
-            if len(parts) == 3 and all(p.isdigit() for p in parts):
-                return value_clean
-        
-        # Try to parse any date format and convert to MM/DD/YYYY
-        try:
-            # Try multiple date formats
-            parsed = pd.to_datetime(value_clean, errors='coerce', infer_datetime_format=True)
-            if pd.notna(parsed):
-                return parsed.strftime('%m/%d/%Y')
-        except:
-            pass
-        
-        # If can't parse, return as-is
-        return value_clean
-    
-    # Fallback: convert to string
-    return str(value).strip()
-
-
-def _parse_boolean(value):
-    """
-    Parse boolean value dari Excel.
-    Accepts: TRUE, FALSE, True, False, true, false, 1, 0, Yes, No, Y, N
-    Returns: True, False, or None
-    """
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    
-    # If already boolean
-    if isinstance(value, bool):
-        return value
-    
-    # Convert to string and normalize
-    str_value = str(value).strip().upper()
-    
-    # True values
-    if str_value in ['TRUE', '1', 'YES', 'Y', 'T']:
-        return True
-    
-    # False values
-    if str_value in ['FALSE', '0', 'NO', 'N', 'F']:
-        return False
-    
-    # Invalid value
-    return None
-
-
 def validate_file_structure(file_path):
     """
     Validasi struktur file dan return sample data untuk preview.
     STRICT VALIDATION: Hanya menerima format kolom dengan spasi (tidak ada keringanan underscore).
     
+    File dibaca satu kali secara streaming (lihat data_management.readers):
+    header, 10 baris sample dan total baris dihitung dalam pass yang sama,
+    dan hasil parsing di-cache di disk untuk dipakai task ingestion.
+    
     Args:
         file_path: Path ke file yang akan divalidasi
     
@@ -181,70 +69,22 @@ def validate_file_structure(file_path):
             'total_rows': int (total baris dalam file)
         }
     """
+    from .readers import EXPECTED_COLUMNS, SUPPORTED_EXTENSIONS, get_file_extension, scan_upload_file
+
     try:
-        file_ext = file_path.lower()[file_path.rfind('.'):]
-        
-        # Baca file untuk menghitung total baris (tanpa batasan nrows)
-        if file_ext == '.csv':
-            df_full = pd.read_csv(file_path, dtype={'NOMOR REKENING': str})
-            df_sample = pd.read_csv(file_path, dtype={'NOMOR REKENING': str}, nrows=10)
-        elif file_ext in ['.xlsx', '.xls']:
-            df_full = pd.read_excel(file_path, dtype={'NOMOR REKENING': str})
-            df_sample = pd.read_excel(file_path, dtype={'NOMOR REKENING': str}, nrows=10)
-        else:
+        if get_file_extension(file_path) not in SUPPORTED_EXTENSIONS:
             return {
                 'valid': False,
                 'error': 'Format file tidak didukung. Gunakan .csv, .xlsx, atau .xls'
             }
         
-        # Hitung total baris
-        total_rows = len(df_full)
-        
-        # Gunakan sample untuk preview
-        df = df_sample
-        
-        # Normalisasi nama kolom
-        df.columns = [str(col).strip().upper() for col in df.columns]
+        scan = scan_upload_file(file_path, preview_rows=10, write_cache=True)
         
         # Expected columns dalam urutan yang diinginkan user
-        expected_columns_ordered = [
-            'PERIODE',
-            'KANCA',
-            'KODE UKER',
-            'UKER',
-            'LN TYPE',
-            'NOMOR REKENING',
-            'NAMA DEBITUR',
-            'PLAFON',
-            'NEXT PMT DATE',
-            'NEXT INT PMT DATE',
-            'RATE',
-            'TGL MENUNGGAK',
-            'TGL REALISASI',
-            'TGL JATUH TEMPO',
-            'JANGKA WAKTU',
-            'FLAG RESTRUK',
-            'CIFNO',
-            'KOLEKTIBILITAS LANCAR',
-            'KOLEKTIBILITAS DPK',
-            'KOLEKTIBILITAS KURANG LANCAR',
-            'KOLEKTIBILITAS DIRAGUKAN',
-            'KOLEKTIBILITAS MACET',
-            'TUNGGAKAN POKOK',
-            'TUNGGAKAN BUNGA',
-            'TUNGGAKAN PINALTI',
-            'CODE',
-            'DESCRIPTION',
-            'KOL_ADK',
-            'PN RM',
-            'NAMA RM',
-            'OS',
-            'NASABAH',
-            'DUB NASABAH'
-        ]
+        expected_columns_ordered = EXPECTED_COLUMNS
         
         expected_columns = set(expected_columns_ordered)
-        actual_columns = set(df.columns)
+        actual_columns = set(scan['columns'])
         
         # STRICT VALIDATION: Hanya terima format dengan spasi (sesuai expected_columns_ordered)
         # Kolom yang hilang (tidak ada exact match)
@@ -256,15 +96,18 @@ def validate_file_structure(file_path):
         # Prepare sample data dengan status validasi per kolom
         # IMPORTANT: Urutan kolom sesuai expected_columns_ordered
         # Status kolom: 'ok' = kolom ada di file (exact match), 'missing' = kolom tidak ada
+        preview = scan['preview']
+        preview = preview.astype(object).where(preview.notna(), None)
+        
         sample_data = []
-        for index, row in df.iterrows():
+        for row in preview.to_dict('records'):
             row_data = {}
             for col in expected_columns_ordered:  # Gunakan urutan yang sudah ditentukan
                 if col in actual_columns:
                     # Kolom ada di file Excel dengan nama yang persis - status OK (hijau)
                     value = row.get(col)
                     # Apply TRIM untuk string values
-                    if pd.notna(value) and isinstance(value, str):
+                    if isinstance(value, str):
                         value = value.strip()
                     row_data[col] = {
                         'value': value,
@@ -286,7 +129,7 @@ def validate_file_structure(file_path):
             'extra_columns': list(extra_columns),
             'expected_columns': expected_columns_ordered,  # Gunakan list yang sudah terurut
             'actual_columns': list(actual_columns),
-            'total_rows': total_rows  # Total baris dalam file (bukan sample)
+            'total_rows': scan['total_rows']  # Total baris dalam file (bukan sample)
         }
         
     except Exception as e:
@@ -296,172 +139,149 @@ def validate_file_structure(file_path):
         }
 
 
+def mark_aggregates_pending(upload_history, periode_dates):
+    """
+    Tandai upload yang datanya sudah tersimpan tetapi agregat dashboard gagal dibangun
+    ulang, beserta perintah untuk menjalankannya ulang di error_log.
+    """
+    periode_dates = sorted(value for value in periode_dates if value is not None)
+    command = 'python manage.py rebuild_lw321_aggregates'
+    if periode_dates:
+        command += f' --from {periode_dates[0].isoformat()} --to {periode_dates[-1].isoformat()}'
+    message = f'Agregat dashboard gagal dibangun ulang, data belum tampil di dashboard. Jalankan: {command}'
+    
+    upload_history.aggregates_pending = True
+    upload_history.error_log = '\n'.join(filter(None, [message, upload_history.error_log]))
+    upload_history.save(update_fields=['aggregates_pending', 'error_log'])
+
+
 def process_uploaded_file(upload_history):
     """
     Process uploaded file dan simpan ke database
     
+    File diproses per chunk. Setiap chunk di-commit dalam satu transaksi bersama
+    checkpoint di UploadHistory (processed_rows, successful_rows, failed_rows,
+    error_log), sehingga task yang di-retry / restart melanjutkan dari baris
+    terakhir yang sudah di-commit tanpa menduplikasi data.
+    
+    Chunk diambil dari cache hasil validasi (lihat data_management.readers);
+    jika belum ada, file di-scan sekali dan di-cache terlebih dahulu.
+    
+    Mode replace periode: chunk di-load ke tabel staging UNLOGGED, lalu data
+    periode yang sama di LW321 dihapus dan diganti dalam satu transaksi.
+    
     Args:
         upload_history: UploadHistory instance
     
     Returns:
         dict: Result dengan informasi proses
     """
+    from celery.exceptions import SoftTimeLimitExceeded
+    from django.db import transaction
+    from django.utils import timezone
+    from .ingestion import (
+        count_staging_rows, create_staging_table, drop_staging_tables,
+        get_staging_table_name, ingest_lw321_dataframe, publish_staging_tables,
+    )
+    from .readers import (
+        REQUIRED_COLUMNS, SUPPORTED_EXTENSIONS, ensure_upload_cache,
+        get_cached_periode_dates, get_file_extension, iter_cached_chunks, remove_cache,
+    )
+    from dashboard.aggregates import refresh_daily_aggregates_safely
+    from dashboard.table_cache import schedule_dashboard_warmup
+
+    staging_table = None
     try:
         file_path = upload_history.file_path.path
-        file_ext = file_path.lower()[file_path.rfind('.'):]
         
-        # Baca file berdasarkan ekstensi
-        # PENTING: dtype=str untuk kolom yang harus preserve leading zeros
-        # Jangan parse dates otomatis, kita akan handle manual
-        if file_ext == '.csv':
-            df = pd.read_csv(file_path, dtype={'NOMOR REKENING': str, 'NOMOR_REKENING': str}, parse_dates=False)
-        elif file_ext in ['.xlsx', '.xls']:
-            df = pd.read_excel(file_path, dtype={'NOMOR REKENING': str, 'NOMOR_REKENING': str})
-        else:
+        if get_file_extension(file_path) not in SUPPORTED_EXTENSIONS:
             return {
                 'success': False,
                 'error': 'Format file tidak didukung'
             }
         
-        df.columns = [str(col).strip().upper() for col in df.columns]
-        
-        required_columns = ['PERIODE', 'NOMOR REKENING', 'CIFNO']
-        missing_columns = [col for col in required_columns if col not in df.columns]
+        cache_path, meta = ensure_upload_cache(file_path)
         
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in meta['columns']]
         if missing_columns:
             return {
                 'success': False,
-                'error': f'Kolom yang diperlukan tidak ditemukan: {", ".join(missing_columns)}. Kolom yang ada: {", ".join(df.columns)}'
+                'error': f'Kolom yang diperlukan tidak ditemukan: {", ".join(missing_columns)}. Kolom yang ada: {", ".join(meta["columns"])}'
             }
-
-        total_rows = len(df)
-        successful_rows = 0
-        failed_rows = 0
-        error_messages = []
         
-        # Process setiap baris
-        for index, row in df.iterrows():
-            try:
-                record = {}
-
-                # Process setiap kolom berdasarkan COLUMN_FIELD_MAP (format dengan spasi)
-                for source_column, target_field in COLUMN_FIELD_MAP.items():
-                    # Skip jika kolom tidak ada di DataFrame
-                    if source_column not in df.columns:
-                        continue
-                    
-                    raw_value = row.get(source_column)
-
-                    if pd.notna(raw_value) and isinstance(raw_value, str):
-                        raw_value = raw_value.strip()
-
-                    if target_field == PERIODE_FIELD:
-                        record[target_field] = _parse_periode(raw_value)
-                    elif target_field in DATE_FIELDS:
-                        record[target_field] = _parse_date(raw_value)
-                    elif target_field in DATE_STRING_FIELDS:
-                        record[target_field] = _parse_date_string(raw_value)
-                    elif target_field in DECIMAL_FIELDS:
-                        record[target_field] = _parse_decimal(raw_value)
-                    elif target_field in INTEGER_FIELDS:
-                        record[target_field] = _parse_int(raw_value)
-                    elif target_field in BOOLEAN_FIELDS:
-                        record[target_field] = _parse_boolean(raw_value)
-                    else:
-                        record[target_field] = _parse_string(raw_value)
-
-                nomor_rekening = record.get('nomor_rekening')
-                if not nomor_rekening:
-                    # Debug: cek apakah kolom NOMOR REKENING ada di file
-                    if 'NOMOR REKENING' not in df.columns:
-                        raise ValueError('Kolom "NOMOR REKENING" tidak ditemukan di file Excel. Kolom yang tersedia: ' + ', '.join(df.columns))
-                    else:
-                        raise ValueError(f'Nomor rekening tidak boleh kosong. Nilai: {row.get("NOMOR REKENING")}')
-                
-                # Ensure nomor_rekening is string and preserve leading zeros
-                # Convert float/int to string with proper formatting
-                if isinstance(nomor_rekening, (int, float)):
-                    # Format as integer string (no decimal point)
-                    nomor_rekening = str(int(nomor_rekening))
-                else:
-                    nomor_rekening = str(nomor_rekening).strip()
+        if upload_history.replace_periode:
+            staging_table = get_staging_table_name(upload_history.id)
+            staged_rows = count_staging_rows(staging_table) if upload_history.processed_rows else None
+            if staged_rows != upload_history.successful_rows:
+                # Staging belum ada / tidak sinkron dengan checkpoint (mis. tabel UNLOGGED
+                # ter-truncate setelah crash): mulai load dari awal
+                create_staging_table(staging_table)
+                upload_history.processed_rows = 0
+                upload_history.successful_rows = 0
+                upload_history.failed_rows = 0
+                upload_history.error_log = None
+                upload_history.save(update_fields=[
+                    'processed_rows', 'successful_rows', 'failed_rows', 'error_log',
+                ])
+        
+        # Mulai run baru (atau lanjutkan dari checkpoint terakhir)
+        upload_history.total_rows = meta['total_rows']
+        upload_history.run_started_at = timezone.now()
+        upload_history.run_start_offset = upload_history.processed_rows
+        upload_history.last_checkpoint_at = upload_history.run_started_at
+        upload_history.save(update_fields=[
+            'total_rows', 'run_started_at', 'run_start_offset', 'last_checkpoint_at',
+        ])
+        
+        for chunk_start, chunk in iter_cached_chunks(cache_path, start_row=upload_history.processed_rows):
+            with transaction.atomic():
+                # Parsing per kolom + COPY per batch (lihat data_management.ingestion)
+                result = ingest_lw321_dataframe(chunk, table_name=staging_table)
                 
-                # Pad with zeros if needed (18 digits for BRI account numbers)
-                if nomor_rekening.isdigit() and len(nomor_rekening) < 18:
-                    nomor_rekening = nomor_rekening.zfill(18)
-                
-                record['nomor_rekening'] = nomor_rekening
-
-                periode = record.get('periode') or ''
-                if not periode:
-                    if 'PERIODE' not in df.columns:
-                        raise ValueError('Kolom "PERIODE" tidak ditemukan di file Excel')
-                    else:
-                        raise ValueError(f'Periode tidak boleh kosong. Nilai: {row.get("PERIODE")}')
-
-                cif_no = record.get('cif_no') or ''
-                if not cif_no:
-                    if 'CIFNO' not in df.columns:
-                        raise ValueError('Kolom "CIFNO" tidak ditemukan di file Excel')
-                    else:
-                        raise ValueError(f'CIF tidak boleh kosong. Nilai: {row.get("CIFNO")}')
-
-                record['periode'] = periode
-                record['cif_no'] = cif_no
-
-                # Truncate VARCHAR fields to prevent "value too long" errors
-                # Based on model field max_length definitions
-                MAX_LENGTHS = {
-                    'periode': 20,
-                    'kanca': 100,
-                    'kode_uker': 10,
-                    'uker': 100,
-                    'ln_type': 10,
-                    'nomor_rekening': 100,
-                    'nama_debitur': 100,
-                    'next_pmt_date': 20,
-                    'next_int_pmt_date': 20,
-                    'tgl_menunggak': 20,
-                    'tgl_realisasi': 20,
-                    'tgl_jatuh_tempo': 20,
-                    'jangka_waktu': 10,
-                    'flag_restruk': 10,
-                    'cif_no': 100,
-                    'kolektibilitas_lancar': 100,
-                    'kolektibilitas_dpk': 100,
-                    'kolektibilitas_kurang_lancar': 100,
-                    'kolektibilitas_diragukan': 100,
-                    'kolektibilitas_macet': 100,
-                    'code': 100,
-                    'description': 255,
-                    'kol_adk': 10,
-                    'pn_rm': 20,
-                    'nama_rm': 100,
-                    'dub_nasabah': 10,
-                }
-                
-                for field_name, max_length in MAX_LENGTHS.items():
-                    if field_name in record and isinstance(record[field_name], str):
-                        if len(record[field_name]) > max_length:
-                            record[field_name] = record[field_name][:max_length]
-
-                LW321.objects.create(**record)
-                successful_rows += 1
-                
-            except Exception as e:
-                failed_rows += 1
-                error_messages.append(f"Row {index + 1}: {str(e)}")
-                continue
+                upload_history.processed_rows = chunk_start + len(chunk)
+                upload_history.successful_rows += result['successful_rows']
+                upload_history.failed_rows += result['failed_rows']
+                if result['errors']:
+                    previous_errors = upload_history.error_log or ''
+                    upload_history.error_log = '\n'.join(filter(None, [previous_errors] + result['errors']))
+                upload_history.last_checkpoint_at = timezone.now()
+                upload_history.save(update_fields=[
+                    'processed_rows', 'successful_rows', 'failed_rows',
+                    'error_log', 'last_checkpoint_at',
+                ])
+        
+        if staging_table:
+            # Swap data periode lama dengan isi staging secara atomik
+            publish_staging_tables([staging_table], replace_periode=True)
+        
+        # Bangun ulang fact table harian untuk tanggal-tanggal yang ada di file,
+        # lalu precompute tabel dashboard untuk tanggal tersebut di background
+        periode_dates = get_cached_periode_dates(cache_path)
+        if refresh_daily_aggregates_safely(periode_dates) is None:
+            mark_aggregates_pending(upload_history, periode_dates)
+        schedule_dashboard_warmup(periode_dates)
+        
+        # Cache hasil validasi tidak diperlukan lagi setelah semua chunk masuk
+        remove_cache(cache_path)
         
         return {
             'success': True,
-            'total_rows': total_rows,
-            'successful_rows': successful_rows,
-            'failed_rows': failed_rows,
-            'errors': error_messages,
+            'total_rows': upload_history.total_rows,
+            'successful_rows': upload_history.successful_rows,
+            'failed_rows': upload_history.failed_rows,
+            'errors': (upload_history.error_log or '').splitlines(),
         }
         
+    except SoftTimeLimitExceeded:
+        # Biarkan task yang menangani (retry dari checkpoint terakhir)
+        raise
     except Exception as e:
+        if staging_table:
+            # Upload gagal tidak pernah di-resume: buang salinan file di staging
+            try:
+                drop_staging_tables([staging_table])
+            except Exception:
+                pass
         return {
             'success': False,
             'error': str(e),
@@ -471,37 +291,147 @@ def process_uploaded_file(upload_history):
         }
 
 
-def process_data_for_dashboard(data_type, sub_type=None, date_range=None):
+# ==================== KOMITMEN UTILITIES ====================
+
+# Selisih di bawah ini dianggap sama (pembulatan Excel vs Decimal di database)
+KOMITMEN_DIFF_TOLERANCE = 0.01
+
+# Toleransi relatif saat menyimpan: hanya selisih konversi float <-> Decimal(20, 10) yang diabaikan
+KOMITMEN_SAVE_RTOL = 1e-9
+
+# Kolom identitas KomitmenData selain kode_uker
+KOMITMEN_IDENTITY_FIELDS = ['kode_kanca', 'nama_kanca', 'nama_uker']
+
+
+def _komitmen_frame(df):
+    """
+    DataFrame komitmen bersih dari sheet upload (index-based), vectorized:
+    kode_uker, kode_kanca (float, NaN jika tidak valid), nama_kanca, nama_uker + 20 metric (NaN = kosong / "-").
+
+    Baris tanpa kode_uker dan uker yang sudah ditutup dibuang; kode_uker duplikat diambil yang pertama.
+
+    Returns:
+        tuple: (DataFrame, jumlah baris uker ditutup yang di-skip)
     """
-    Olah data untuk dashboard
+    import numpy as np
+    import pandas as pd
+    from data_management.validators import (
+        COLUMN_INDICES, CLOSED_UKER_CODES, KOMITMEN_METRIC_FIELDS, clean_numeric_series,
+    )
     
-    Args:
-        data_type: Tipe dashboard (os, summary, grafik_harian)
-        sub_type: Sub tipe (medium_only, konsol, only)
-        date_range: Range tanggal
+    kode_kanca_raw = df[COLUMN_INDICES['kode_kanca']].astype(str).str.strip()
+    # Seperti int(float(x)), fallback ke digit saja (contoh: "KC 123")
+    kode_kanca = pd.to_numeric(kode_kanca_raw, errors='coerce').fillna(
+        pd.to_numeric(kode_kanca_raw.str.replace(r'\D', '', regex=True), errors='coerce')
+    )
+    
+    frame = pd.DataFrame({
+        'kode_uker': df[COLUMN_INDICES['kode_uker']].astype(str).str.strip(),
+        'kode_kanca': np.trunc(kode_kanca.astype(float)),
+        'nama_kanca': df[COLUMN_INDICES['nama_kanca']].astype(str).str.strip(),
+        'nama_uker': df[COLUMN_INDICES['nama_uker']].astype(str).str.strip(),
+    })
+    for field in KOMITMEN_METRIC_FIELDS:
+        frame[field] = clean_numeric_series(df[COLUMN_INDICES[field]])
+    
+    frame = frame[(frame['kode_uker'] != '') & (frame['kode_uker'] != 'nan')]
+    closed = frame['kode_uker'].isin(CLOSED_UKER_CODES)
+    frame = frame[~closed].drop_duplicates('kode_uker').reset_index(drop=True)
+    return frame, int(closed.sum())
+
+
+def _existing_komitmen_frame(periode):
+    """KomitmenData periode sebagai DataFrame dengan kolom yang sama seperti _komitmen_frame (+ id, upload_id)."""
+    import pandas as pd
+    from dashboard.models import KomitmenData
+    from data_management.validators import KOMITMEN_METRIC_FIELDS
     
+    columns = ['id', 'upload_id', 'kode_uker'] + KOMITMEN_IDENTITY_FIELDS + KOMITMEN_METRIC_FIELDS
+    frame = pd.DataFrame(
+        list(KomitmenData.objects.filter(periode=periode).order_by().values_list(*columns)),
+        columns=columns,
+    )
+    frame['kode_uker'] = frame['kode_uker'].astype(str)
+    frame['kode_kanca'] = frame['kode_kanca'].astype(float)
+    for field in KOMITMEN_METRIC_FIELDS:
+        frame[field] = pd.to_numeric(frame[field], errors='coerce').astype(float)
+    return frame
+
+
+def _diff_komitmen_frames(new_frame, old_frame, atol, rtol=0.0):
+    """
+    Merge data baru dan lama pada kode_uker, lalu bandingkan 20 kolom metric sekaligus.
+
+    Sel berubah jika berubah antara kosong dan terisi, atau |baru - lama| > atol + rtol * |lama|.
+
     Returns:
-        dict: Processed data
+        dict: added / removed (DataFrame baris baru / yang hilang), both (DataFrame uker di keduanya,
+        kolom *_new / *_old), new_values / old_values (matriks uker x metric, NaN = kosong),
+        delta (kosong dihitung 0), changed (matriks bool)
     """
-    # TODO: Implementasi logic pengolahan data sesuai kebutuhan dashboard
-    # Ini adalah placeholder
-    
-    processed_data = {
-        'data_type': data_type,
-        'sub_type': sub_type,
-        'date_range': date_range,
-        'data': {}
-    }
+    import numpy as np
+    from data_management.validators import KOMITMEN_METRIC_FIELDS
+    
+    merged = new_frame.merge(old_frame, on='kode_uker', how='outer', suffixes=('_new', '_old'), indicator=True)
+    merged = merged.sort_values('kode_uker', kind='stable').reset_index(drop=True)
+    both = merged[merged['_merge'] == 'both'].reset_index(drop=True)
+    
+    # Matriks (uker x kolom) untuk semua metric sekaligus
+    new_values = both[[f'{field}_new' for field in KOMITMEN_METRIC_FIELDS]].to_numpy(dtype=float)
+    old_values = both[[f'{field}_old' for field in KOMITMEN_METRIC_FIELDS]].to_numpy(dtype=float)
+    new_missing = np.isnan(new_values)
+    old_missing = np.isnan(old_values)
+    delta = np.where(new_missing, 0.0, new_values) - np.where(old_missing, 0.0, old_values)
+    threshold = atol + rtol * np.abs(np.where(old_missing, 0.0, old_values))
+    changed = (new_missing != old_missing) | (np.abs(delta) > threshold)
     
-    return processed_data
+    return {
+        'added': merged[merged['_merge'] == 'left_only'],
+        'removed': merged[merged['_merge'] == 'right_only'],
+        'both': both,
+        'new_values': new_values,
+        'old_values': old_values,
+        'delta': delta,
+        'changed': changed,
+    }
 
 
-# ==================== KOMITMEN UTILITIES ====================
+def _komitmen_cell_changes(diff):
+    """List semua sel yang berubah dari _diff_komitmen_frames, urut kode_uker lalu urutan kolom."""
+    import numpy as np
+    from data_management.validators import KOMITMEN_METRIC_FIELDS, KOMITMEN_METRIC_LABELS
+    
+    new_values, old_values = diff['new_values'], diff['old_values']
+    kode_ukers = diff['both']['kode_uker'].to_numpy()
+    nama_ukers = diff['both']['nama_uker_old'].to_numpy()
+    
+    def _value(matrix, row, column):
+        value = matrix[row, column]
+        return None if np.isnan(value) else float(value)
+    
+    row_index, column_index = np.nonzero(diff['changed'])
+    return [
+        {
+            'uker': nama_ukers[row],
+            'kode_uker': kode_ukers[row],
+            'column': KOMITMEN_METRIC_LABELS[KOMITMEN_METRIC_FIELDS[column]],
+            'field': KOMITMEN_METRIC_FIELDS[column],
+            'old_value': _value(old_values, row, column),
+            'new_value': _value(new_values, row, column),
+            'delta': float(diff['delta'][row, column]),
+        }
+        for row, column in zip(row_index.tolist(), column_index.tolist())
+    ]
+
 
 def compare_komitmen_data(new_df, periode):
     """
     Compare new upload with existing data to show preview of changes
     Uses INDEX-BASED reading from DataFrame
+
+    Data baru di-merge dengan KomitmenData periode yang sama berdasarkan kode_uker,
+    lalu selisih 20 kolom metric dihitung sekaligus (vectorized). Sel dianggap berubah
+    jika selisihnya > KOMITMEN_DIFF_TOLERANCE atau berubah antara kosong dan terisi.
     
     Args:
         new_df: pandas DataFrame with new data (index-based, no headers)
@@ -513,88 +443,83 @@ def compare_komitmen_data(new_df, periode):
         - new_rows: int (jumlah uker baru)
         - updated_rows: int (jumlah uker yang akan di-update)
         - deleted_rows: int (jumlah uker yang akan dihapus)
-        - changes: list of dict (sample changes untuk preview)
+        - changed_rows: int (jumlah uker yang minimal satu nilainya berubah)
+        - changed_cells: int (jumlah sel yang berubah)
+        - added_ukers / removed_ukers: list kode_uker baru / yang dihapus
+        - column_stats: list of dict per kolom metric (column, field, changed, total_delta)
+        - changes: list of dict SEMUA sel yang berubah (uker, kode_uker, column, field,
+          old_value, new_value, delta), urut kode_uker lalu urutan kolom
         - existing_upload: KomitmenUpload object or None
     """
-    from dashboard.models import KomitmenData, KomitmenUpload
-    from data_management.validators import COLUMN_INDICES, CLOSED_UKER_CODES, clean_numeric_value
+    import numpy as np
+    from dashboard.models import KomitmenUpload
+    from data_management.validators import KOMITMEN_METRIC_FIELDS, KOMITMEN_METRIC_LABELS
     
-    # Filter out closed uker codes from new data
-    new_df = new_df[~new_df[COLUMN_INDICES['kode_uker']].astype(str).str.strip().isin(CLOSED_UKER_CODES)].copy()
+    new_frame, _ = _komitmen_frame(new_df)
     
-    try:
-        existing_upload = KomitmenUpload.objects.get(periode=periode)
-        existing_qs = KomitmenData.objects.filter(periode=periode)
-        
-        if existing_qs.count() == 0:
-            return {
-                'is_new': True,
-                'new_rows': len(new_df),
-                'updated_rows': 0,
-                'deleted_rows': 0,
-                'changes': [],
-                'existing_upload': None
-            }
-        
-        # Convert existing data to dict for comparison
-        existing_dict = {}
-        for data in existing_qs:
-            existing_dict[str(data.kode_uker)] = {
-                'kur_os': float(data.kur_os) if data.kur_os else 0,
-                'kur_pl': float(data.kur_pl) if data.kur_pl else 0,
-                'small_deb': float(data.small_deb) if data.small_deb else 0,
-                'nama_uker': data.nama_uker,
-            }
-        
-        # Compare - using index-based reading
-        new_ukers = set(new_df[COLUMN_INDICES['kode_uker']].astype(str).str.strip())
-        old_ukers = set(existing_dict.keys())
-        
-        changes = []
-        for uker in new_ukers & old_ukers:  # Intersection
-            new_row = new_df[new_df[COLUMN_INDICES['kode_uker']].astype(str).str.strip() == uker].iloc[0]
-            old_data = existing_dict[uker]
-            
-            # Check sample columns
-            new_kur_os = clean_numeric_value(new_row[COLUMN_INDICES['kur_os']]) or 0
-            old_kur_os = old_data['kur_os']
-            
-            if abs(new_kur_os - old_kur_os) > 0.01:  # Changed
-                changes.append({
-                    'uker': old_data['nama_uker'],
-                    'kode_uker': uker,
-                    'column': 'KUR RITEL OS',
-                    'old_value': old_kur_os,
-                    'new_value': new_kur_os
-                })
-            
-            if len(changes) >= 10:  # Limit to 10 sample changes
-                break
-        
-        return {
-            'is_new': False,
-            'new_rows': len(new_ukers - old_ukers),
-            'updated_rows': len(new_ukers & old_ukers),
-            'deleted_rows': len(old_ukers - new_ukers),
-            'changes': changes,
-            'existing_upload': existing_upload
-        }
-        
-    except KomitmenUpload.DoesNotExist:
-        return {
-            'is_new': True,
-            'new_rows': len(new_df),
-            'updated_rows': 0,
-            'deleted_rows': 0,
-            'changes': [],
-            'existing_upload': None
+    result = {
+        'is_new': True,
+        'new_rows': len(new_frame),
+        'updated_rows': 0,
+        'deleted_rows': 0,
+        'changed_rows': 0,
+        'changed_cells': 0,
+        'added_ukers': new_frame['kode_uker'].tolist(),
+        'removed_ukers': [],
+        'column_stats': [],
+        'changes': [],
+        'existing_upload': None
+    }
+    
+    existing_upload = KomitmenUpload.objects.filter(periode=periode).first()
+    if existing_upload is None:
+        return result
+    
+    old_frame = _existing_komitmen_frame(periode)
+    if old_frame.empty:
+        return result
+    
+    diff = _diff_komitmen_frames(new_frame, old_frame, KOMITMEN_DIFF_TOLERANCE)
+    changed = diff['changed']
+    changes = _komitmen_cell_changes(diff)
+    
+    changed_per_column = changed.sum(axis=0)
+    delta_per_column = np.where(changed, diff['delta'], 0.0).sum(axis=0)
+    column_stats = [
+        {
+            'column': KOMITMEN_METRIC_LABELS[field],
+            'field': field,
+            'changed': int(changed_per_column[index]),
+            'total_delta': float(delta_per_column[index]),
         }
+        for index, field in enumerate(KOMITMEN_METRIC_FIELDS)
+    ]
+    
+    result.update({
+        'is_new': False,
+        'new_rows': len(diff['added']),
+        'updated_rows': len(diff['both']),
+        'deleted_rows': len(diff['removed']),
+        'changed_rows': int(changed.any(axis=1).sum()),
+        'changed_cells': len(changes),
+        'added_ukers': diff['added']['kode_uker'].tolist(),
+        'removed_ukers': diff['removed']['kode_uker'].tolist(),
+        'column_stats': column_stats,
+        'changes': changes,
+        'existing_upload': existing_upload
+    })
+    return result
 
 
 def save_komitmen_data(df, periode, upload_obj):
     """
     Save komitmen data from DataFrame to database
     Uses INDEX-BASED reading from DataFrame
+
+    Upsert: hanya uker baru dan uker yang nilainya berubah yang ditulis
+    (bulk_create ... ON CONFLICT (periode, kode_uker) DO UPDATE), uker yang
+    tidak ada lagi di file dihapus, dalam satu transaksi. Cache tabel dashboard
+    hanya diinvalidasi untuk KANCA yang terdampak.
     
     Args:
         df: pandas DataFrame (cleaned data without total rows, index-based)
@@ -602,87 +527,90 @@ def save_komitmen_data(df, periode, upload_obj):
         upload_obj: KomitmenUpload instance
     
     Returns:
-        int: Number of rows saved
+        dict audit:
+        - saved: int (jumlah baris komitmen periode ini setelah disimpan)
+        - inserted / updated / deleted: list kode_uker
+        - unchanged: int (jumlah uker yang tidak ditulis ulang)
+        - changes: list of dict sel yang berubah (format compare_komitmen_data)
+        - affected_kancas: list kode_kanca yang terdampak
+        - skipped_closed / skipped_invalid: int baris yang di-skip
     """
+    import pandas as pd
+    from django.db import transaction
     from dashboard.models import KomitmenData
-    from data_management.validators import COLUMN_INDICES, CLOSED_UKER_CODES, clean_numeric_value
+    from dashboard.table_cache import invalidate_komitmen_periode
+    from data_management.validators import KOMITMEN_METRIC_FIELDS
     
-    # Delete existing data for this periode
-    KomitmenData.objects.filter(periode=periode).delete()
+    new_frame, skipped_closed = _komitmen_frame(df)
     
-    # Prepare bulk create list
-    komitmen_list = []
-    skipped_closed = 0
+    # Skip baris yang kode_kanca-nya tidak valid
+    invalid_kanca = new_frame['kode_kanca'].isna()
+    skipped_invalid = int(invalid_kanca.sum())
+    new_frame = new_frame[~invalid_kanca].reset_index(drop=True)
     
-    for _, row in df.iterrows():
-        kode_uker = str(row[COLUMN_INDICES['kode_uker']]).strip()
-        
-        # Skip if kode_uker is empty
-        if not kode_uker or kode_uker == 'nan':
-            continue
-        
-        # Skip if kode_uker is closed
-        if kode_uker in CLOSED_UKER_CODES:
-            skipped_closed += 1
-            continue
-        
-        # Clean kode_kanca (convert to integer for IntegerField)
-        kode_kanca_raw = str(row[COLUMN_INDICES['kode_kanca']]).strip()
-        try:
-            kode_kanca = int(float(kode_kanca_raw))  # Convert to integer directly
-        except (ValueError, TypeError):
-            # Fallback: try to extract digits only
-            try:
-                kode_kanca = int(''.join(filter(str.isdigit, kode_kanca_raw)))
-            except (ValueError, TypeError):
-                # Skip row if kode_kanca is invalid
-                skipped_invalid += 1
-                continue
-        
-        komitmen_obj = KomitmenData(
+    old_frame = _existing_komitmen_frame(periode)
+    diff = _diff_komitmen_frames(new_frame, old_frame, 0.0, KOMITMEN_SAVE_RTOL)
+    both = diff['both']
+    
+    # Baris berubah: nilai metric, identitas (KANCA / nama), atau pindah ke upload lain
+    identity_changed = both['upload_id'] != upload_obj.pk
+    for field in KOMITMEN_IDENTITY_FIELDS:
+        identity_changed |= both[f'{field}_new'] != both[f'{field}_old']
+    row_changed = diff['changed'].any(axis=1) | identity_changed.to_numpy()
+    
+    updated = both[row_changed]
+    write_rows = [diff['added'][['kode_uker'] + [f'{field}_new' for field in KOMITMEN_IDENTITY_FIELDS + KOMITMEN_METRIC_FIELDS]]]
+    write_rows.append(updated[write_rows[0].columns])
+    write_frame = pd.concat(write_rows, ignore_index=True)
+    write_frame.columns = ['kode_uker'] + KOMITMEN_IDENTITY_FIELDS + KOMITMEN_METRIC_FIELDS
+    
+    metrics = write_frame[KOMITMEN_METRIC_FIELDS]
+    metrics = metrics.astype(object).where(metrics.notna(), None)
+    komitmen_list = [
+        KomitmenData(
             upload=upload_obj,
             periode=periode,
-            kode_kanca=kode_kanca,
             kode_uker=kode_uker,
-            nama_kanca=str(row[COLUMN_INDICES['nama_kanca']]).strip(),
-            nama_uker=str(row[COLUMN_INDICES['nama_uker']]).strip(),
-            
-            # KUR RITEL
-            kur_deb=clean_numeric_value(row[COLUMN_INDICES['kur_deb']]),
-            kur_os=clean_numeric_value(row[COLUMN_INDICES['kur_os']]),
-            kur_pl=clean_numeric_value(row[COLUMN_INDICES['kur_pl']]),
-            kur_npl=clean_numeric_value(row[COLUMN_INDICES['kur_npl']]),
-            kur_dpk=clean_numeric_value(row[COLUMN_INDICES['kur_dpk']]),
-            
-            # SMALL SD 5M
-            small_deb=clean_numeric_value(row[COLUMN_INDICES['small_deb']]),
-            small_os=clean_numeric_value(row[COLUMN_INDICES['small_os']]),
-            small_pl=clean_numeric_value(row[COLUMN_INDICES['small_pl']]),
-            small_npl=clean_numeric_value(row[COLUMN_INDICES['small_npl']]),
-            small_dpk=clean_numeric_value(row[COLUMN_INDICES['small_dpk']]),
-            
-            # KECIL NCC
-            kecil_ncc_deb=clean_numeric_value(row[COLUMN_INDICES['kecil_ncc_deb']]),
-            kecil_ncc_os=clean_numeric_value(row[COLUMN_INDICES['kecil_ncc_os']]),
-            kecil_ncc_pl=clean_numeric_value(row[COLUMN_INDICES['kecil_ncc_pl']]),
-            kecil_ncc_npl=clean_numeric_value(row[COLUMN_INDICES['kecil_ncc_npl']]),
-            kecil_ncc_dpk=clean_numeric_value(row[COLUMN_INDICES['kecil_ncc_dpk']]),
-            
-            # KECIL CC
-            kecil_cc_deb=clean_numeric_value(row[COLUMN_INDICES['kecil_cc_deb']]),
-            kecil_cc_os=clean_numeric_value(row[COLUMN_INDICES['kecil_cc_os']]),
-            kecil_cc_pl=clean_numeric_value(row[COLUMN_INDICES['kecil_cc_pl']]),
-            kecil_cc_npl=clean_numeric_value(row[COLUMN_INDICES['kecil_cc_npl']]),
-            kecil_cc_dpk=clean_numeric_value(row[COLUMN_INDICES['kecil_cc_dpk']]),
+            kode_kanca=int(kode_kanca),
+            nama_kanca=nama_kanca,
+            nama_uker=nama_uker,
+            **dict(zip(KOMITMEN_METRIC_FIELDS, values)),
         )
-        
-        komitmen_list.append(komitmen_obj)
+        for kode_uker, kode_kanca, nama_kanca, nama_uker, values in zip(
+            write_frame['kode_uker'], write_frame['kode_kanca'], write_frame['nama_kanca'],
+            write_frame['nama_uker'], metrics.itertuples(index=False, name=None),
+        )
+    ]
+    deleted = diff['removed']['kode_uker'].tolist()
     
-    # Bulk create
-    KomitmenData.objects.bulk_create(komitmen_list, batch_size=500)
+    with transaction.atomic():
+        if deleted:
+            KomitmenData.objects.filter(periode=periode, kode_uker__in=deleted).delete()
+        KomitmenData.objects.bulk_create(
+            komitmen_list,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=['periode', 'kode_uker'],
+            update_fields=['upload'] + KOMITMEN_IDENTITY_FIELDS + KOMITMEN_METRIC_FIELDS,
+        )
     
-    # Log skipped rows if any
-    if skipped_closed > 0:
-        print(f"ℹ️  Skipped {skipped_closed} rows from closed uker codes")
+    # KANCA lama dan baru dari setiap uker yang ditulis / dihapus
+    affected_kancas = set(write_frame['kode_kanca'].astype(int))
+    affected_kancas |= set(updated['kode_kanca_old'].astype(int))
+    affected_kancas |= set(diff['removed']['kode_kanca_old'].astype(int))
+    if komitmen_list or deleted:
+        # Tabel dashboard bulan ini harus dibangun ulang dengan komitmen baru
+        invalidate_komitmen_periode(periode, affected_kancas)
     
-    return len(komitmen_list)
+    audit = {
+        'saved': len(new_frame),
+        'inserted': diff['added']['kode_uker'].tolist(),
+        'updated': updated['kode_uker'].tolist(),
+        'deleted': deleted,
+        'unchanged': len(both) - len(updated),
+        'changes': _komitmen_cell_changes(diff),
+        'affected_kancas': sorted(affected_kancas),
+        'skipped_closed': skipped_closed,
+        'skipped_invalid': skipped_invalid,
+    }
+    return audit
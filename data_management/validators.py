@@ -5,7 +5,7 @@ import pandas as pd
 import re
 from datetime import datetime
 from dashboard.models import LW321
-from dashboard.formulas.uker_mapping import UKER_MASTER
+from dashboard.formulas.uker_mapping import get_uker_hierarchy
 
 
 # Daftar kode uker yang sudah ditutup (skip saat upload)
@@ -117,6 +117,34 @@ COLUMN_INDICES = {
     'kecil_cc_dpk': 23,   # Column X
 }
 
+# 20 kolom metric komitmen (E-X), urut sesuai file dan model KomitmenData
+KOMITMEN_METRIC_FIELDS = [field for field, index in COLUMN_INDICES.items() if index >= COLUMN_INDICES['kur_deb']]
+
+# Label kolom metric untuk tampilan, contoh: kur_os -> 'KUR RITEL OS'
+KOMITMEN_PRODUCT_LABELS = {
+    'kur': 'KUR RITEL',
+    'small': 'SMALL SD 5M',
+    'kecil_ncc': 'KECIL NCC',
+    'kecil_cc': 'KECIL CC',
+}
+KOMITMEN_METRIC_LABELS = {
+    field: f"{KOMITMEN_PRODUCT_LABELS[field.rsplit('_', 1)[0]]} {field.rsplit('_', 1)[1].upper()}"
+    for field in KOMITMEN_METRIC_FIELDS
+}
+
+
+def clean_numeric_series(series):
+    """
+    Versi vectorized clean_numeric_value untuk satu kolom DataFrame.
+    Nilai kosong, "-", atau bukan angka menjadi NaN (None di clean_numeric_value).
+    """
+    values = series.astype(object)
+    is_text = values.map(lambda value: isinstance(value, str))
+    if is_text.any():
+        text = values[is_text].str.strip().str.replace(',', '', regex=False).str.replace(' ', '', regex=False)
+        values = values.where(~is_text, text)
+    return pd.to_numeric(values, errors='coerce').astype(float)
+
 
 def validate_komitmen_excel(file_path, expected_periode=None):
     """
@@ -277,9 +305,9 @@ def validate_komitmen_excel(file_path, expected_periode=None):
             'preview_rows': []
         }
     
-    # 6. Check kode_uker exists in system (UKER_MASTER)
-    # Use UKER_MASTER as the source of truth for valid uker codes
-    valid_ukers = set(str(k) for k in UKER_MASTER.keys())
+    # 6. Check kode_uker exists in system (tabel uker_master)
+    # Use uker_master as the source of truth for valid uker codes
+    valid_ukers = get_uker_hierarchy().uker_code_strs
     
     # Get unique kode_uker from file (already cleaned in step 5)
     file_ukers = set(data_rows[COLUMN_INDICES['kode_uker']].unique())
@@ -289,7 +317,7 @@ def validate_komitmen_excel(file_path, expected_periode=None):
     if invalid_ukers:
         invalid_list = sorted(list(invalid_ukers))[:10]  # Show first 10
         warnings.append(
-            f"⚠️ {len(invalid_ukers)} Kode Uker tidak ditemukan di UKER_MASTER: "
+            f"⚠️ {len(invalid_ukers)} Kode Uker tidak ditemukan di uker_master: "
             f"{', '.join(invalid_list)}"
             f"{' ...' if len(invalid_ukers) > 10 else ''}"
         )
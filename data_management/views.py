@@ -8,6 +8,8 @@ from .models import UploadHistory
 from .forms import UploadDataForm
 from .utils import process_uploaded_file, validate_file_structure
 from dashboard.models import LW321
+from dashboard.partitions import delete_lw321_range, truncate_lw321
+from dashboard.table_cache import invalidate_komitmen_periode
 
 
 def admin_required(view_func):
@@ -82,6 +84,7 @@ def upload_data_view(request):
                 file_size=upload_file.size,
                 status='queued',  # Changed from 'pending' to 'queued'
                 notes=form.cleaned_data.get('notes', ''),
+                replace_periode=form.cleaned_data.get('replace_periode', False),
             )
             
             # Queue task untuk diproses di background
@@ -188,8 +191,8 @@ def delete_data_view(request):
                 date_obj = datetime.strptime(selected_date, '%Y-%m-%d')
                 periode_str = date_obj.strftime('%d/%m/%Y')
                 
-                # Hapus data dengan periode tersebut
-                deleted_count = LW321.objects.filter(periode=periode_str).delete()[0]
+                # Hapus data dengan periode tersebut (DROP partisi jika bulan itu hanya berisi tanggal ini)
+                deleted_count = delete_lw321_range(date_obj.date(), date_obj.date())
                 
                 if deleted_count > 0:
                     messages.success(request, f'Berhasil menghapus {deleted_count} record dengan tanggal {periode_str}.')
@@ -206,23 +209,13 @@ def delete_data_view(request):
                     return redirect('data_management:delete_data')
                 
                 from datetime import datetime
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
+                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
+                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
                 
-                # Get all unique periode dalam range
-                all_periods = LW321.objects.values_list('periode', flat=True).distinct()
-                periods_to_delete = []
+                # Bulan yang ter-cover penuh di-DROP per partisi, sisanya DELETE per partisi
+                deleted_count = delete_lw321_range(date_from_obj, date_to_obj)
                 
-                for periode in all_periods:
-                    try:
-                        periode_date = datetime.strptime(periode, '%d/%m/%Y')
-                        if date_from_obj <= periode_date <= date_to_obj:
-                            periods_to_delete.append(periode)
-                    except:
-                        continue
-                
-                if periods_to_delete:
-                    deleted_count = LW321.objects.filter(periode__in=periods_to_delete).delete()[0]
+                if deleted_count > 0:
                     messages.success(request, f'Berhasil menghapus {deleted_count} record dari tanggal {date_from} sampai {date_to}.')
                 else:
                     messages.warning(request, f'Tidak ada data dalam range tanggal tersebut.')
@@ -232,7 +225,7 @@ def delete_data_view(request):
                 confirm = request.POST.get('confirm_delete_all')
                 
                 if confirm == 'DELETE ALL DATA':
-                    deleted_count = LW321.objects.all().delete()[0]
+                    deleted_count = truncate_lw321()
                     messages.success(request, f'Berhasil menghapus semua data ({deleted_count} record).')
                 else:
                     messages.error(request, 'Konfirmasi tidak sesuai. Data tidak dihapus.')
@@ -367,24 +360,21 @@ def view_all_data_view(request):
 def validate_komitmen_ajax(request):
     """AJAX endpoint for komitmen file validation"""
     if request.method == 'POST' and request.FILES.get('file'):
-        from .validators import validate_komitmen_excel
-        import tempfile
-        import os
+        from .komitmen_files import (
+            cleanup_expired_komitmen_uploads, discard_komitmen_upload, load_validated_komitmen, store_komitmen_upload,
+        )
         
         upload_file = request.FILES['file']
-        temp_dir = tempfile.mkdtemp()
-        temp_path = os.path.join(temp_dir, upload_file.name)
+        temp_path = None
         
         try:
-            with open(temp_path, 'wb+') as destination:
-                for chunk in upload_file.chunks():
-                    destination.write(chunk)
+            cleanup_expired_komitmen_uploads()
             
-            validation_result = validate_komitmen_excel(temp_path)
-            
-            # Cleanup temp file
-            os.remove(temp_path)
-            os.rmdir(temp_dir)
+            # File dan hasil parse disimpan, dipakai ulang saat file yang sama di-submit (upload_komitmen)
+            temp_path = store_komitmen_upload(upload_file, request.session.session_key)
+            validation_result = load_validated_komitmen(temp_path)
+            if not validation_result['valid']:
+                discard_komitmen_upload(temp_path)
             
             # Format periode for display
             if validation_result['periode']:
@@ -418,10 +408,7 @@ def validate_komitmen_ajax(request):
             })
             
         except Exception as e:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-            if os.path.exists(temp_dir):
-                os.rmdir(temp_dir)
+            discard_komitmen_upload(temp_path)
             
             return JsonResponse({
                 'valid': False,
@@ -439,10 +426,9 @@ def validate_komitmen_ajax(request):
 def upload_komitmen(request):
     """Upload komitmen file - Step 1: Validate and show preview"""
     from .forms import KomitmenUploadForm
-    from .validators import validate_komitmen_excel
-    from .utils import compare_komitmen_data
-    import tempfile
-    import os
+    from .komitmen_files import (
+        cleanup_expired_komitmen_uploads, discard_komitmen_upload, load_validated_komitmen, store_komitmen_upload,
+    )
     
     if request.method == 'POST':
         form = KomitmenUploadForm(request.POST, request.FILES)
@@ -450,23 +436,20 @@ def upload_komitmen(request):
         if form.is_valid():
             upload_file = request.FILES['file']
             notes = form.cleaned_data.get('notes', '')
-            
-            # Save to temp file
-            temp_dir = tempfile.mkdtemp()
-            temp_path = os.path.join(temp_dir, upload_file.name)
+            temp_path = None
             
             try:
-                with open(temp_path, 'wb+') as destination:
-                    for chunk in upload_file.chunks():
-                        destination.write(chunk)
+                cleanup_expired_komitmen_uploads()
+                
+                # Save to temp file (hasil parse dari validasi AJAX dipakai ulang jika file sama)
+                temp_path = store_komitmen_upload(upload_file, request.session.session_key)
                 
                 # Validate
-                validation_result = validate_komitmen_excel(temp_path)
+                validation_result = load_validated_komitmen(temp_path)
                 
                 if not validation_result['valid']:
                     # Cleanup
-                    os.remove(temp_path)
-                    os.rmdir(temp_dir)
+                    discard_komitmen_upload(temp_path)
                     
                     for error in validation_result['errors']:
                         messages.error(request, error)
@@ -476,11 +459,10 @@ def upload_komitmen(request):
                         'form': form,
                     })
                 
-                # Compare with existing data
-                compare_result = compare_komitmen_data(
-                    validation_result['data_df'],
-                    validation_result['periode']
-                )
+                # Upload sebelumnya di session ini yang belum dikonfirmasi
+                previous_temp_file = request.session.get('komitmen_temp_file')
+                if previous_temp_file and previous_temp_file != temp_path:
+                    discard_komitmen_upload(previous_temp_file)
                 
                 # Save temp file path and validation result to session
                 request.session['komitmen_temp_file'] = temp_path
@@ -493,10 +475,7 @@ def upload_komitmen(request):
                 
             except Exception as e:
                 # Cleanup on error
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                if os.path.exists(temp_dir):
-                    os.rmdir(temp_dir)
+                discard_komitmen_upload(temp_path)
                 
                 messages.error(request, f'Error saat memproses file: {str(e)}')
                 return render(request, 'data_management/upload_komitmen.html', {
@@ -517,7 +496,8 @@ def upload_komitmen(request):
 @admin_required
 def preview_komitmen(request):
     """Preview komitmen upload - Step 2: Show validation results and changes"""
-    from .validators import validate_komitmen_excel, COLUMN_INDICES, clean_numeric_value
+    from .komitmen_files import load_validated_komitmen
+    from .validators import COLUMN_INDICES, clean_numeric_value
     from .utils import compare_komitmen_data
     from datetime import datetime
     import os
@@ -535,18 +515,19 @@ def preview_komitmen(request):
     try:
         periode = datetime.fromisoformat(periode_str).date()
         
-        # Re-validate (to get fresh data)
-        validation_result = validate_komitmen_excel(temp_file, periode)
+        # Hasil validasi dari langkah upload (cache, tanpa membaca ulang Excel)
+        validation_result = load_validated_komitmen(temp_file, periode)
         
         if not validation_result['valid']:
             messages.error(request, 'File tidak valid.')
             return redirect('data_management:upload_komitmen')
         
-        # Compare with existing data
+        # Compare with existing data (semua perubahan, ditampilkan per halaman)
         compare_result = compare_komitmen_data(
             validation_result['data_df'],
             periode
         )
+        changes_page = Paginator(compare_result['changes'], 50).get_page(request.GET.get('changes_page'))
         
         # Prepare ALL data for preview (not just 10 rows)
         from .validators import COLUMN_INDICES
@@ -597,6 +578,7 @@ def preview_komitmen(request):
             'periode': periode,
             'validation': validation_result,
             'compare': compare_result,
+            'changes_page': changes_page,
             'all_data': all_preview_data,  # ALL data untuk dicek
             'total_columns': 24,  # A-X
         }
@@ -610,7 +592,7 @@ def preview_komitmen(request):
 @admin_required
 def confirm_komitmen_upload(request):
     """Confirm and save komitmen data - Step 3: Final save"""
-    from .validators import validate_komitmen_excel
+    from .komitmen_files import discard_komitmen_upload, load_validated_komitmen
     from .utils import save_komitmen_data
     from dashboard.models import KomitmenUpload
     from datetime import datetime
@@ -631,8 +613,8 @@ def confirm_komitmen_upload(request):
     try:
         periode = datetime.fromisoformat(periode_str).date()
         
-        # Re-validate one more time
-        validation_result = validate_komitmen_excel(temp_file, periode)
+        # Hasil validasi dari langkah upload (cache, tanpa membaca ulang Excel)
+        validation_result = load_validated_komitmen(temp_file, periode)
         
         if not validation_result['valid']:
             messages.error(request, 'File tidak valid.')
@@ -650,21 +632,21 @@ def confirm_komitmen_upload(request):
             }
         )
         
-        # Save data
-        saved_count = save_komitmen_data(
+        # Save data (upsert, hanya uker yang berubah yang ditulis)
+        audit = save_komitmen_data(
             validation_result['data_df'],
             periode,
             upload_obj
         )
+        saved_count = audit['saved']
         
         # Update status
         upload_obj.status = 'completed'
         upload_obj.row_count = saved_count
         upload_obj.save()
         
-        # Cleanup temp file
-        os.remove(temp_file)
-        os.rmdir(os.path.dirname(temp_file))
+        # Cleanup temp file (beserta cache validasinya)
+        discard_komitmen_upload(temp_file)
         
         # Clear session
         del request.session['komitmen_temp_file']
@@ -676,7 +658,9 @@ def confirm_komitmen_upload(request):
         messages.success(
             request,
             f'✅ Komitmen {periode.strftime("%B %Y")} {action}! '
-            f'{saved_count} baris data tersimpan.'
+            f'{saved_count} baris data tersimpan '
+            f'({len(audit["inserted"])} baru, {len(audit["updated"])} diubah, '
+            f'{len(audit["deleted"])} dihapus, {audit["unchanged"]} tidak berubah).'
         )
         
         return redirect('data_management:komitmen_history')
@@ -723,6 +707,7 @@ def delete_komitmen(request, upload_id):
         
         # Delete (cascade akan otomatis delete KomitmenData)
         upload.delete()
+        invalidate_komitmen_periode(upload.periode)
         
         messages.success(
             request,
@@ -817,11 +802,71 @@ def view_komitmen(request):
     return render(request, 'data_management/view_komitmen.html', context)
 
 
+# Batas jumlah sel per request update_komitmen_cells
+KOMITMEN_BATCH_EDIT_MAX = 2000
+
+
+def _parse_komitmen_cell_value(field_name, value):
+    """
+    Nilai sel dari input user -> Decimal / None ('', '-', kosong). Raise ValueError jika
+    bukan angka atau tidak muat di kolom (max_digits / decimal_places DecimalField).
+    """
+    from decimal import Decimal, InvalidOperation
+    from django.core.exceptions import ValidationError
+    from dashboard.models import KomitmenData
+    
+    if value == '' or value is None or value == '-':
+        return None
+    # Remove formatting (commas, spaces)
+    clean_value = str(value).replace(',', '').replace(' ', '').strip()
+    if not clean_value:
+        return None
+    try:
+        decimal_value = Decimal(clean_value)
+    except InvalidOperation:
+        raise ValueError('Format angka tidak valid')
+    if not decimal_value.is_finite():
+        raise ValueError('Format angka tidak valid')
+    try:
+        KomitmenData._meta.get_field(field_name).run_validators(decimal_value)
+    except ValidationError as e:
+        raise ValueError(' '.join(e.messages))
+    return decimal_value
+
+
+def _komitmen_cell_display(field_name, decimal_value):
+    """Format tampilan sel komitmen (sama seperti tabel view_komitmen)."""
+    if decimal_value is None:
+        return '-'
+    if field_name.endswith('_pl') or field_name.endswith('_npl'):
+        return f"{decimal_value:.2f}"
+    return f"{decimal_value:,.0f}"
+
+
+def _komitmen_cell_result(row_id, field_name, old_value, decimal_value):
+    return {
+        'row_id': row_id,
+        'field_name': field_name,
+        'display_value': _komitmen_cell_display(field_name, decimal_value),
+        'old_value': str(old_value) if old_value else '-',
+        'new_value': str(decimal_value) if decimal_value else '-'
+    }
+
+
+def _invalidate_komitmen_rows(rows):
+    """Invalidasi cache tabel untuk periode + KANCA dari baris yang diedit lewat bulk_update."""
+    kancas_by_periode = {}
+    for row in rows:
+        kancas_by_periode.setdefault(row.periode, set()).add(row.kode_kanca)
+    for periode, kode_kancas in kancas_by_periode.items():
+        invalidate_komitmen_periode(periode, kode_kancas)
+
+
 @admin_required
 def update_komitmen_cell(request):
     """AJAX endpoint for updating single cell value"""
     from dashboard.models import KomitmenData
-    from decimal import Decimal, InvalidOperation
+    from .validators import KOMITMEN_METRIC_FIELDS
     
     if request.method == 'POST':
         import json
@@ -835,14 +880,7 @@ def update_komitmen_cell(request):
             komitmen_row = KomitmenData.objects.get(id=row_id)
             
             # Validate field name (prevent SQL injection)
-            allowed_fields = [
-                'kur_deb', 'kur_os', 'kur_pl', 'kur_npl', 'kur_dpk',
-                'small_deb', 'small_os', 'small_pl', 'small_npl', 'small_dpk',
-                'kecil_ncc_deb', 'kecil_ncc_os', 'kecil_ncc_pl', 'kecil_ncc_npl', 'kecil_ncc_dpk',
-                'kecil_cc_deb', 'kecil_cc_os', 'kecil_cc_pl', 'kecil_cc_npl', 'kecil_cc_dpk',
-            ]
-            
-            if field_name not in allowed_fields:
+            if field_name not in KOMITMEN_METRIC_FIELDS:
                 return JsonResponse({
                     'success': False,
                     'error': 'Field tidak valid'
@@ -850,36 +888,25 @@ def update_komitmen_cell(request):
             
             # Convert value to Decimal
             try:
-                if new_value == '' or new_value is None or new_value == '-':
-                    decimal_value = None
-                else:
-                    # Remove formatting (commas, spaces)
-                    clean_value = str(new_value).replace(',', '').replace(' ', '').strip()
-                    decimal_value = Decimal(clean_value) if clean_value else None
-            except (InvalidOperation, ValueError):
+                decimal_value = _parse_komitmen_cell_value(field_name, new_value)
+            except ValueError as e:
                 return JsonResponse({
                     'success': False,
-                    'error': 'Format angka tidak valid'
+                    'error': str(e)
                 }, status=400)
             
-            # Update the field
+            # Update the field (hanya kolom ini yang ditulis)
             old_value = getattr(komitmen_row, field_name)
             setattr(komitmen_row, field_name, decimal_value)
-            komitmen_row.save()
-            
-            # Format for display
-            if decimal_value is None:
-                display_value = '-'
-            elif field_name.endswith('_pl') or field_name.endswith('_npl'):
-                display_value = f"{decimal_value:.2f}"
-            else:
-                display_value = f"{decimal_value:,.0f}"
+            # Cache tabel di-invalidasi oleh signal post_save (dashboard.signals)
+            komitmen_row.save(update_fields=[field_name])
             
+            result = _komitmen_cell_result(komitmen_row.id, field_name, old_value, decimal_value)
             return JsonResponse({
                 'success': True,
-                'display_value': display_value,
-                'old_value': str(old_value) if old_value else '-',
-                'new_value': str(decimal_value) if decimal_value else '-'
+                'display_value': result['display_value'],
+                'old_value': result['old_value'],
+                'new_value': result['new_value']
             })
             
         except KomitmenData.DoesNotExist:
@@ -897,3 +924,102 @@ def update_komitmen_cell(request):
         'success': False,
         'error': 'Method not allowed'
     }, status=405)
+
+
+@admin_required
+def update_komitmen_cells(request):
+    """
+    AJAX endpoint untuk update banyak sel sekaligus.
+
+    Body JSON: {"edits": [{"row_id": .., "field_name": .., "value": ..}, ...]}
+    Semua edit divalidasi dulu (field, format angka, batas digit kolom, row_id);
+    jika ada yang tidak valid tidak ada yang disimpan.
+    Edit diterapkan dalam satu transaksi, satu bulk_update per kolom yang diedit
+    (hanya kolom tersebut yang ditulis). Edit ganda untuk sel yang sama: yang terakhir dipakai.
+    """
+    from django.db import transaction
+    from dashboard.models import KomitmenData
+    from .validators import KOMITMEN_METRIC_FIELDS
+    
+    if request.method != 'POST':
+        return JsonResponse({
+            'success': False,
+            'error': 'Method not allowed'
+        }, status=405)
+    
+    import json
+    try:
+        edits = json.loads(request.body).get('edits')
+    except (ValueError, AttributeError):
+        edits = None
+    if not isinstance(edits, list) or not edits:
+        return JsonResponse({
+            'success': False,
+            'error': 'Daftar edit tidak valid'
+        }, status=400)
+    if len(edits) > KOMITMEN_BATCH_EDIT_MAX:
+        return JsonResponse({
+            'success': False,
+            'error': f'Maksimal {KOMITMEN_BATCH_EDIT_MAX} sel per request'
+        }, status=400)
+    
+    # 1. Validasi semua edit (field, angka, row_id)
+    errors = []
+    parsed = {}
+    for index, edit in enumerate(edits):
+        edit = edit if isinstance(edit, dict) else {}
+        field_name = edit.get('field_name')
+        try:
+            row_id = int(edit.get('row_id'))
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'row_id': edit.get('row_id'), 'field_name': field_name, 'error': 'Row tidak valid'})
+            continue
+        if field_name not in KOMITMEN_METRIC_FIELDS:
+            errors.append({'index': index, 'row_id': row_id, 'field_name': field_name, 'error': 'Field tidak valid'})
+            continue
+        try:
+            parsed[(row_id, field_name)] = _parse_komitmen_cell_value(field_name, edit.get('value'))
+        except ValueError as e:
+            errors.append({'index': index, 'row_id': row_id, 'field_name': field_name, 'error': str(e)})
+    
+    try:
+        with transaction.atomic():
+            rows = KomitmenData.objects.select_for_update().in_bulk({row_id for row_id, _ in parsed})
+            errors += [
+                {'row_id': row_id, 'field_name': field_name, 'error': 'Data tidak ditemukan'}
+                for row_id, field_name in parsed
+                if row_id not in rows
+            ]
+            if errors:
+                return JsonResponse({
+                    'success': False,
+                    'error': f'{len(errors)} sel tidak valid, tidak ada yang disimpan',
+                    'errors': errors
+                }, status=400)
+            
+            # 2. Terapkan edit, kelompokkan per kolom
+            cells = []
+            rows_by_field = {}
+            for (row_id, field_name), decimal_value in parsed.items():
+                row = rows[row_id]
+                cells.append(_komitmen_cell_result(row_id, field_name, getattr(row, field_name), decimal_value))
+                setattr(row, field_name, decimal_value)
+                rows_by_field.setdefault(field_name, []).append(row)
+            
+            # 3. Satu UPDATE per kolom, hanya kolom yang diedit
+            for field_name, field_rows in rows_by_field.items():
+                KomitmenData.objects.bulk_update(field_rows, [field_name], batch_size=500)
+        
+        # bulk_update tidak mengirim signal post_save: invalidasi manual
+        _invalidate_komitmen_rows(rows.values())
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+    
+    return JsonResponse({
+        'success': True,
+        'updated': len(cells),
+        'cells': cells
+    })